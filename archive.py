@@ -0,0 +1,239 @@
+"""
+archive.py - Random-Access Archives of Generated Emails (JSON Lines + Offset Index)
+
+The "archive" output format writes each day as day_{day}_emails.jsonl (one
+result per line, as the jsonl format does) plus a fixed-width binary index,
+day_{day}_emails.idx. A reader memory-maps both files and fetches email N,
+or the email of a (recipient_id, event_id) pair, by slicing out and parsing
+that one line; nothing else in a multi-GB file is read or parsed.
+
+Index layout (little-endian):
+- header   magic "EMLIDX1\\0", record count N, data file size   (3 × 8 bytes)
+- offsets  N + 1 × uint64: byte offset of each line; the last is the data size
+- keys     N × (uint64 key hash, uint64 record number), sorted by hash
+
+The keys are sorted with one NumPy argsort (~24 bytes per record) when
+NumPy is installed, otherwise in runs of SORT_RUN records merged on
+write, so sorting never holds a Python object for every record at once.
+
+The key hash is an 8-byte BLAKE2b of "recipient_id\\0event_id"; lookups
+binary-search the keys and confirm the ids in the record, so collisions
+cost an extra parse, never a wrong answer. The data file size in the
+header detects an index left over from another run, and the index size one
+cut short.
+
+Usage:
+    with ArchiveReader("data/generated/day_5_emails.jsonl") as archive:
+        first = archive[0]
+        email = archive.find("r_002", "e_001")
+
+    archives = DayArchives("data/generated")
+    email = archives.get("r_002", "e_001", "5")
+"""
+
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Dict, Iterator, Optional, Tuple
+
+MAGIC = b"EMLIDX1\0"
+_HEADER = struct.Struct("<8sQQ")
+_U64 = struct.Struct("<Q")
+_SPAN = struct.Struct("<QQ")  # Offsets of record n and n + 1
+_KEY = struct.Struct("<QQ")
+SORT_RUN = 1 << 18  # Records sorted at once without NumPy
+
+
+def index_path_for(data_path: str) -> str:
+    """day_5_emails.jsonl → day_5_emails.idx"""
+    return os.path.splitext(data_path)[0] + ".idx"
+
+
+def key_hash(recipient_id: Optional[str], event_id: Optional[str]) -> int:
+    digest = hashlib.blake2b(f"{recipient_id}\0{event_id}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class IndexBuilder:
+    """Collects line lengths and keys while a data file is written; write() saves the index"""
+
+    def __init__(self):
+        self.offsets = array("Q", [0])
+        self.hashes = array("Q")
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def add(self, line_length: int, recipient_id: Optional[str], event_id: Optional[str]) -> None:
+        self.offsets.append(self.offsets[-1] + line_length)
+        self.hashes.append(key_hash(recipient_id, event_id))
+
+    def write(self, path: str) -> None:
+        """Write the index atomically (temp file + rename)"""
+        offsets = self.offsets
+        if sys.byteorder == "big":
+            offsets = array("Q", offsets)
+            offsets.byteswap()
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, len(self.hashes), self.offsets[-1]))
+            offsets.tofile(f)
+            self._write_keys(f)
+        os.replace(tmp_path, path)
+
+    def _write_keys(self, f) -> None:
+        """(hash, record) pairs sorted by hash, ties in record order"""
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+        if np is not None:
+            hashes = np.frombuffer(self.hashes, dtype=np.uint64)
+            order = np.argsort(hashes, kind="stable")
+            keys = np.empty((len(order), 2), dtype="<u8")
+            keys[:, 0] = hashes[order]
+            keys[:, 1] = order
+            keys.tofile(f)
+            return
+
+        runs = []
+        for start in range(0, len(self.hashes), SORT_RUN):
+            run = array("Q")
+            for record in sorted(range(start, min(start + SORT_RUN, len(self.hashes))), key=self.hashes.__getitem__):
+                run.append(self.hashes[record])
+                run.append(record)
+            runs.append(run)
+        block = array("Q")
+        for key in heapq.merge(*(_pairs(run) for run in runs)):
+            block.extend(key)
+            if len(block) >= 2 * SORT_RUN:
+                _write_block(f, block)
+                block = array("Q")
+        _write_block(f, block)
+
+
+def _pairs(run: array) -> Iterator[Tuple[int, int]]:
+    for i in range(0, len(run), 2):
+        yield run[i], run[i + 1]
+
+
+def _write_block(f, block: array) -> None:
+    if sys.byteorder == "big":
+        block.byteswap()
+    block.tofile(f)
+
+
+class ArchiveReader:
+    """Memory-mapped random access to one day's archive (data file + index)"""
+
+    def __init__(self, data_path: str, index_path: Optional[str] = None):
+        self.path = data_path
+        self.index_path = index_path or index_path_for(data_path)
+        self._data_file = open(data_path, 'rb')
+        try:
+            self._index_file = open(self.index_path, 'rb')
+            index_size = os.fstat(self._index_file.fileno()).st_size
+            if index_size < _HEADER.size:
+                raise ValueError(f"Not an email archive index: {self.index_path}")
+            self._index = mmap.mmap(self._index_file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, self.count, data_size = _HEADER.unpack_from(self._index, 0)
+            if magic != MAGIC:
+                raise ValueError(f"Not an email archive index: {self.index_path}")
+            expected = _HEADER.size + (self.count + 1) * _U64.size + self.count * _KEY.size
+            if index_size != expected:
+                raise ValueError(
+                    f"Index {self.index_path} has {index_size} bytes; {self.count} records need {expected}"
+                )
+            actual_size = os.fstat(self._data_file.fileno()).st_size
+            if data_size != actual_size:
+                raise ValueError(
+                    f"Index {self.index_path} is for a {data_size}-byte data file; "
+                    f"{data_path} has {actual_size} bytes (stale or interrupted run)"
+                )
+            # mmap rejects empty files; an empty archive has nothing to read anyway
+            self._data = mmap.mmap(self._data_file.fileno(), 0, access=mmap.ACCESS_READ) if data_size else b""
+        except BaseException:
+            self.close()
+            raise
+        self._offsets_at = _HEADER.size
+        self._keys_at = self._offsets_at + (self.count + 1) * _U64.size
+
+    def __len__(self) -> int:
+        return self.count
+
+    def raw(self, n: int) -> bytes:
+        """Bytes of record n (one JSON line, without the newline)"""
+        if n < 0:
+            n += self.count
+        if not 0 <= n < self.count:
+            raise IndexError(f"record {n} out of range ({self.count} records)")
+        start, end = _SPAN.unpack_from(self._index, self._offsets_at + n * _U64.size)
+        return self._data[start:end].rstrip(b"\n")
+
+    def __getitem__(self, n: int) -> Dict:
+        return json.loads(self.raw(n))
+
+    def __iter__(self) -> Iterator[Dict]:
+        for n in range(self.count):
+            yield self[n]
+
+    def find(self, recipient_id: str, event_id: str) -> Optional[Dict]:
+        """The result for a (recipient_id, event_id) pair, or None"""
+        target = key_hash(recipient_id, event_id)
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if _U64.unpack_from(self._index, self._keys_at + mid * _KEY.size)[0] < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        while lo < self.count:
+            found, record = _KEY.unpack_from(self._index, self._keys_at + lo * _KEY.size)
+            if found != target:
+                break
+            result = self[record]
+            meta = result.get("meta") or {}
+            if meta.get("recipient_id") == recipient_id and meta.get("event_id") == event_id:
+                return result
+            lo += 1
+        return None
+
+    def close(self) -> None:
+        for handle in ("_data", "_index", "_data_file", "_index_file"):
+            opened = getattr(self, handle, None)
+            if opened is not None and not isinstance(opened, bytes):
+                opened.close()
+
+    def __enter__(self) -> "ArchiveReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class DayArchives:
+    """The archives of an output directory, opened per day on first use"""
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        self.readers: Dict[str, ArchiveReader] = {}
+
+    def reader(self, day: str) -> ArchiveReader:
+        if day not in self.readers:
+            self.readers[day] = ArchiveReader(os.path.join(self.output_dir, f"day_{day}_emails.jsonl"))
+        return self.readers[day]
+
+    def get(self, recipient_id: str, event_id: str, day: str) -> Optional[Dict]:
+        """The result for (recipient_id, event_id) on a day, or None"""
+        return self.reader(day).find(recipient_id, event_id)
+
+    def close(self) -> None:
+        for reader in self.readers.values():
+            reader.close()
+        self.readers = {}
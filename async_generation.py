@@ -0,0 +1,194 @@
+"""
+async_generation.py - Concurrent Groq Generation with Rate Limiting
+
+Runs GroqEmailGenerator.generate_email_content() for many recipient-event-day
+jobs on an asyncio worker pool. Every request first takes capacity from two
+token buckets (requests/minute and tokens/minute) so bursts stay within the
+Groq account limits. Results come back in job order, regardless of which
+request finished first.
+
+generate_batched_contents() does the same for multi-recipient requests
+(one prompt per group of recipients sharing an event and day).
+
+Usage:
+    limiter = RateLimiter(requests_per_minute=30, tokens_per_minute=12000)
+    results = asyncio.run(generate_contents(ai_gen, jobs, concurrency=8, limiter=limiter))
+"""
+
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from templates import SYSTEM_PROMPT
+
+# Rough chars-per-token ratio used to budget prompts before sending them
+CHARS_PER_TOKEN = 4
+# Expected completion size; a full email JSON is well under max_tokens
+EXPECTED_COMPLETION_TOKENS = 1024
+
+
+def estimate_tokens(*texts: str) -> int:
+    """Cheap token estimate for rate limiting (no tokenizer dependency)"""
+    return sum(len(t) for t in texts) // CHARS_PER_TOKEN + 1
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at `rate_per_minute`"""
+
+    def __init__(
+        self,
+        rate_per_minute: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        if rate_per_minute <= 0:
+            raise ValueError("rate_per_minute must be positive")
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _get_lock(self) -> asyncio.Lock:
+        # The bucket outlives a single asyncio.run(); locks are per event loop
+        loop = asyncio.get_running_loop()
+        if self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        """Wait until `amount` tokens are available, then take them"""
+        amount = min(amount, self.capacity)
+        async with self._get_lock():
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+class RateLimiter:
+    """Requests/minute + tokens/minute limiter matching Groq's per-model limits"""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    async def acquire(self, tokens: int) -> None:
+        await self.requests.acquire(1)
+        await self.tokens.acquire(tokens)
+
+
+async def generate_contents(
+    ai_generator: Any,
+    jobs: Sequence[Tuple[Dict, Dict, str]],
+    concurrency: int = 4,
+    limiter: Optional[RateLimiter] = None,
+    on_result: Optional[Callable[[int, Dict], None]] = None
+) -> List[Dict]:
+    """
+    Generate email content for (recipient, event, day) jobs concurrently
+
+    The (blocking) Groq client runs in worker threads; at most `concurrency`
+    requests are in flight. `on_result(job_index, content)` is called as
+    each job finishes (e.g. to checkpoint it). Returns results in the same
+    order as `jobs`.
+    """
+    results: List[Optional[Dict]] = [None] * len(jobs)
+
+    async def run_job(idx: int) -> None:
+        recipient, event, day = jobs[idx]
+        try:
+            prompt = ai_generator.build_user_prompt(recipient, event, day)
+            # Cache hits are free: no rate-limit budget, no thread hop
+            cached = ai_generator.cached_content(prompt)
+            if cached is not None:
+                results[idx] = cached
+            elif ai_generator.resilience.is_open:
+                # Breaker open: deterministic fallback right away, no rate-limit wait
+                results[idx] = ai_generator.generate_email_content(recipient, event, day, False)
+            else:
+                if limiter:
+                    await limiter.acquire(estimate_tokens(SYSTEM_PROMPT, prompt) + EXPECTED_COMPLETION_TOKENS)
+                results[idx] = await asyncio.to_thread(
+                    ai_generator.generate_email_content, recipient, event, day, False
+                )
+        except Exception as e:
+            print(f"⚠️  AI generation failed: {e}, using fallback")
+            results[idx] = ai_generator._fallback_email(recipient, event, day, str(e))
+        if on_result:
+            on_result(idx, results[idx])
+
+    await _run_pool(len(jobs), concurrency, run_job)
+    return results
+
+
+async def generate_batched_contents(
+    ai_generator: Any,
+    groups: Sequence[Tuple[List[Dict], Dict, str]],
+    concurrency: int = 4,
+    limiter: Optional[RateLimiter] = None,
+    on_result: Optional[Callable[[int, Dict[str, Dict]], None]] = None
+) -> List[Dict[str, Dict]]:
+    """
+    Generate content for (recipients, event, day) groups, one request per group
+
+    Cached recipients are served without a request; the rest of a group is
+    sent as one multi-recipient prompt (GroqEmailGenerator.generate_batch_contents).
+    Each result maps recipient_id → content for the items that came back
+    valid; `on_result(group_index, contents)` is called as groups finish.
+    """
+    results: List[Dict[str, Dict]] = [{} for _ in groups]
+
+    async def run_group(idx: int) -> None:
+        recipients, event, day = groups[idx]
+        contents: Dict[str, Dict] = {}
+        to_send = []
+        for recipient in recipients:
+            cached = ai_generator.cached_content(ai_generator.build_user_prompt(recipient, event, day))
+            if cached is not None:
+                contents[recipient["recipient_id"]] = cached
+            else:
+                to_send.append(recipient)
+        if to_send and not ai_generator.resilience.is_open:
+            if limiter:
+                prompt = ai_generator.build_batch_prompt(to_send, event, day)
+                await limiter.acquire(
+                    estimate_tokens(SYSTEM_PROMPT, prompt) + EXPECTED_COMPLETION_TOKENS * len(to_send)
+                )
+            contents.update(await asyncio.to_thread(
+                ai_generator.generate_batch_contents, to_send, event, day, False
+            ))
+        results[idx] = contents
+        if on_result:
+            on_result(idx, contents)
+
+    await _run_pool(len(groups), concurrency, run_group)
+    return results
+
+
+async def _run_pool(n_jobs: int, concurrency: int, run_job: Callable[[int], Any]) -> None:
+    """Run run_job(0..n_jobs-1) with at most `concurrency` in flight"""
+    queue: asyncio.Queue = asyncio.Queue()
+    for idx in range(n_jobs):
+        queue.put_nowait(idx)
+
+    async def worker() -> None:
+        while True:
+            try:
+                idx = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await run_job(idx)
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, min(concurrency, n_jobs)))]
+    await asyncio.gather(*workers)
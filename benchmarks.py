@@ -0,0 +1,450 @@
+"""
+benchmarks.py - Micro-benchmarks for the email generation pipeline
+
+Usage:
+    python benchmarks.py fallback              # emails/sec, per-email client vs shared renderer
+    python benchmarks.py fallback -n 20000     # more iterations
+    python benchmarks.py workers -n 20000      # generate_batch scaling over --workers (n recipients)
+    python benchmarks.py overlap -n 20000      # all-pairs overlap counts: topic_overlap vs NumPy matrix
+    python benchmarks.py tokens                # estimated tokens per email by AI batch size
+    python benchmarks.py serve -n 5000         # /render latency percentiles against the warm daemon
+    python benchmarks.py query -n 5000         # one recipient's Day 5 results: day file reparse vs results store
+    python benchmarks.py archive -n 5000       # fetch one email: json.load of the day file vs mmap archive reader
+    python benchmarks.py startup -n 20       # `import brain` time beyond the stdlib it needs; exits 1 over budget
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from typing import Callable, Dict, List, Tuple
+
+from renderer import FallbackRenderer
+
+DAYS = ["0", "1", "3", "5", "6", "7a", "7b"]
+RECIPIENTS_FILE = "./data/recipients.json"
+EVENTS_FILE = "./data/grant_events.json"
+BASELINE_CAP = 2000
+# Median `import brain` time beyond STARTUP_FLOOR, the stdlib modules it cannot
+# do without (~45 ms alone on a 3.11 dev box, so a 50 ms total is out of reach).
+# Both are timed in the same run, which keeps the check stable on busy machines
+STARTUP_BUDGET_MS = 40.0
+STARTUP_FLOOR = ("json", "dataclasses", "typing", "argparse", "datetime")
+# Only loaded on the code paths that need them (AI, workers, numpy matcher,
+# non-ISO dates, cache/store/journal/manifest/archive runs)
+LAZY_MODULES = (
+    "groq", "numpy", "asyncio", "concurrent.futures", "dateutil", "pytz",
+    "sqlite3", "orjson", "mmap", "hashlib", "archive", "response_cache", "results_store",
+    "run_journal", "manifest", "llm_metrics",
+)
+
+
+# =============================
+# Helpers
+# =============================
+def load_pairs() -> List[Tuple[Dict, Dict]]:
+    """All recipient-event pairs from the sample data"""
+    with open(RECIPIENTS_FILE, 'r', encoding='utf-8') as f:
+        recipients = json.load(f)
+    with open(EVENTS_FILE, 'r', encoding='utf-8') as f:
+        events = json.load(f)
+    return [(r, e) for r in recipients for e in events]
+
+
+def emails_per_sec(render: Callable[[Dict, Dict, str], Dict], pairs: List[Tuple[Dict, Dict]], n: int) -> float:
+    """Render n emails cycling through pairs and days; returns throughput"""
+    jobs = [(pairs[i % len(pairs)], DAYS[i % len(DAYS)]) for i in range(n)]
+    start = time.perf_counter()
+    for (recipient, event), day in jobs:
+        render(recipient, event, day)
+    return n / (time.perf_counter() - start)
+
+
+def report(label: str, rate: float, baseline: float = None) -> None:
+    speedup = f"  ({rate / baseline:.1f}× baseline)" if baseline else ""
+    print(f"   {label:<32} {rate:>12,.0f} emails/sec  {rate * 60:>14,.0f} emails/min{speedup}")
+
+
+# =============================
+# Benchmarks
+# =============================
+def bench_fallback(n: int) -> None:
+    """Deterministic rendering: Groq client per email (old no-AI path) vs one shared compiled renderer"""
+    pairs = load_pairs()
+    print(f"\n⏱️  Fallback rendering ({n:,} emails)")
+
+    import brain
+
+    # Without groq installed the generator needs an injected client; it still
+    # pays for the per-email generator (renderer, metrics, breaker), minus the SDK
+    label, client = "GroqEmailGenerator per email", None
+    try:
+        with redirect_stdout(io.StringIO()):
+            brain.GroqEmailGenerator(api_key="dummy")
+    except ValueError:
+        label, client = "GroqEmailGenerator (stub client)", object()
+
+    def per_email_client(recipient, event, day):
+        return brain.GroqEmailGenerator(api_key="dummy", client=client)._fallback_email(
+            recipient, event, day, "AI disabled"
+        )
+
+    # The init banner is part of the old cost, but keep it off the terminal;
+    # the baseline is slow enough that a capped sample is representative
+    with redirect_stdout(io.StringIO()):
+        baseline = emails_per_sec(per_email_client, pairs, min(n, BASELINE_CAP))
+    report(label, baseline)
+
+    renderer = FallbackRenderer()
+    rate = emails_per_sec(
+        lambda r, e, d: renderer.render(r, e, d, "AI disabled"), pairs, n
+    )
+    report("Shared compiled FallbackRenderer", rate, baseline)
+
+
+def write_synthetic_data(directory: str, n_recipients: int, n_events: int = 50) -> Tuple[str, str]:
+    """Synthetic recipients (JSON Lines) and events with future deadlines"""
+    rng = random.Random(42)
+    topics = [f"topic_{i}" for i in range(40)]
+    recipients_file = os.path.join(directory, "recipients.jsonl")
+    events_file = os.path.join(directory, "events.json")
+
+    with open(recipients_file, 'w', encoding='utf-8') as f:
+        for i in range(n_recipients):
+            f.write(json.dumps({
+                "recipient_id": f"r_{i:07d}",
+                "email": f"user{i}@example.org",
+                "name": f"Recipient {i}",
+                "organization": f"Org {i % 997}",
+                "topics": rng.sample(topics, 3),
+                "engagement_score": rng.random(),
+                "opt_out": rng.random() < 0.05
+            }) + "\n")
+
+    with open(events_file, 'w', encoding='utf-8') as f:
+        json.dump([{
+            "event_id": f"e_{i:04d}",
+            "title": f"Grant Programme {i}",
+            "start_date": "2099-06-01T10:00:00Z",
+            "tags": rng.sample(topics, 4),
+            "organizer": f"Foundation {i}",
+            "metadata": {"amount_range": "$5,000 - $50,000", "application_deadline": "2099-05-01"}
+        } for i in range(n_events)], f)
+
+    return recipients_file, events_file
+
+
+def bench_workers(n: int) -> None:
+    """Deterministic generate_batch over n recipients × 50 events × 7 days, by worker count"""
+    import brain
+
+    print(f"\n⏱️  generate_batch --no-ai --format jsonl ({n:,} recipients × 50 events × 7 days)")
+    with tempfile.TemporaryDirectory() as tmp:
+        recipients_file, events_file = write_synthetic_data(tmp, n)
+        baseline = None
+        for workers in (1, 2, 4, 8, 16, 32):
+            if workers > (os.cpu_count() or 1):
+                break
+            start = time.perf_counter()
+            with redirect_stdout(io.StringIO()):
+                stats = brain.generate_batch(
+                    recipients_file, events_file, DAYS, os.path.join(tmp, "out"),
+                    use_ai=False, output_format="jsonl", workers=workers, store_results=False
+                )
+            rate = stats["generated"] / (time.perf_counter() - start)
+            baseline = baseline or rate
+            report(f"{workers} worker(s)", rate, baseline if workers > 1 else None)
+
+
+def bench_overlap(n: int) -> None:
+    """Overlap count for every pair of n recipients × 50 events: per-pair topic_overlap vs one matrix product"""
+    import brain
+    from bulk_matching import HAS_NUMPY, BulkMatcher
+    from ingest import iter_records
+
+    print(f"\n⏱️  All-pairs topic overlap ({n:,} recipients × 50 events)")
+    with tempfile.TemporaryDirectory() as tmp:
+        recipients_file, events_file = write_synthetic_data(tmp, n)
+        recipients = list(iter_records(recipients_file))
+        events = list(iter_records(events_file))
+
+    def pairs_per_sec(count_all: Callable[[], None], n_recipients: int) -> float:
+        start = time.perf_counter()
+        count_all()
+        return n_recipients * len(events) / (time.perf_counter() - start)
+
+    def per_pair():
+        for r in recipients[:BASELINE_CAP]:
+            for e in events:
+                len(brain.topic_overlap(r["topics"], e["tags"]))
+
+    baseline = pairs_per_sec(per_pair, min(n, BASELINE_CAP))
+    print(f"   {'topic_overlap per pair':<32} {baseline:>12,.0f} pairs/sec")
+
+    if not HAS_NUMPY:
+        print("   ⚠️  Skipping NumPy matcher: numpy is not installed")
+        return
+    matcher = BulkMatcher(events)
+    rate = pairs_per_sec(lambda: matcher.bucket_totals(recipients), n)
+    print(f"   {'BulkMatcher overlap matrix':<32} {rate:>12,.0f} pairs/sec  ({rate / baseline:.1f}× baseline)")
+    print(f"   Buckets: {matcher.bucket_totals(recipients)}")
+
+
+def bench_tokens(n: int) -> None:
+    """Estimated prompt + completion tokens per email for batch sizes 1..32 (no API calls)"""
+    import brain
+    from async_generation import EXPECTED_COMPLETION_TOKENS, estimate_tokens
+
+    with open(RECIPIENTS_FILE, 'r', encoding='utf-8') as f:
+        recipients = json.load(f)
+    with open(EVENTS_FILE, 'r', encoding='utf-8') as f:
+        event = json.load(f)[0]
+    generator = brain.GroqEmailGenerator(client=object())
+    rpm, tpm = brain.Config.GROQ_RPM, brain.Config.GROQ_TPM
+
+    print(f"\n⏱️  Tokens per email by batch size (GROQ_RPM={rpm}, GROQ_TPM={tpm:,})")
+    baseline = None
+    for k in (1, 2, 4, 8, 16, 32):
+        batch = [recipients[i % len(recipients)] for i in range(k)]
+        prompt = (
+            generator.build_user_prompt(batch[0], event, "1") if k == 1
+            else generator.build_batch_prompt(batch, event, "1")
+        )
+        per_email = (estimate_tokens(brain.SYSTEM_PROMPT, prompt) + EXPECTED_COMPLETION_TOKENS * k) / k
+        per_min = min(tpm / per_email, rpm * k)
+        baseline = baseline or per_min
+        print(f"   batch {k:<3} {per_email:>10,.0f} tokens/email  {per_min:>10,.1f} emails/min"
+              f"  ({per_min / baseline:.1f}× batch 1)")
+
+
+def bench_serve(n: int) -> None:
+    """Single-pair /render latency against the warm daemon (deterministic, keep-alive HTTP)"""
+    import http.client
+    import socket
+    import threading
+    from llm_metrics import percentile
+    from server import GenerationService, make_server
+
+    with open(RECIPIENTS_FILE, 'r', encoding='utf-8') as f:
+        recipients = json.load(f)
+    with open(EVENTS_FILE, 'r', encoding='utf-8') as f:
+        event_ids = [event["event_id"] for event in json.load(f)]
+    with redirect_stdout(io.StringIO()):
+        service = GenerationService(EVENTS_FILE, use_ai=False)
+    server = make_server(service, "127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+    conn.connect()
+    conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    bodies = [
+        json.dumps({
+            "recipient": recipients[i % len(recipients)],
+            "event_id": event_ids[i % len(event_ids)],
+            "day": DAYS[i % len(DAYS)]
+        })
+        for i in range(n)
+    ]
+    latencies = []
+    for body in bodies:
+        start = time.perf_counter()
+        conn.request("POST", "/render", body, {"Content-Type": "application/json"})
+        response = conn.getresponse()
+        response.read()
+        latencies.append((time.perf_counter() - start) * 1000)
+    conn.close()
+    server.shutdown()
+
+    print(f"\n⏱️  POST /render, {n} requests over one keep-alive connection")
+    for q in (50, 95, 99):
+        print(f"   p{q:<3} {percentile(latencies, q):>8.3f} ms")
+    print(f"   max  {max(latencies):>8.3f} ms")
+
+
+def bench_query(n: int) -> None:
+    """Look up one recipient's Day 5 results: reparse the day file vs query the results store"""
+    import brain
+    from results_store import STORE_FILENAME, ResultsStore
+
+    lookups = 20
+    print(f"\n⏱️  {lookups} lookups of one recipient's Day 5 results ({n:,} recipients × 50 events)")
+    with tempfile.TemporaryDirectory() as tmp:
+        recipients_file, events_file = write_synthetic_data(tmp, n)
+        out = os.path.join(tmp, "out")
+        with redirect_stdout(io.StringIO()):
+            brain.generate_batch(recipients_file, events_file, ["5"], out, use_ai=False, store_results=True)
+        recipient_ids = [f"r_{(i * 7919) % n:07d}" for i in range(lookups)]
+
+        start = time.perf_counter()
+        for recipient_id in recipient_ids:
+            with open(os.path.join(out, "day_5_emails.json"), 'r', encoding='utf-8') as f:
+                scanned = [r for r in json.load(f)["emails"] if r["meta"]["recipient_id"] == recipient_id]
+        reparse = (time.perf_counter() - start) / lookups
+
+        store = ResultsStore(os.path.join(out, STORE_FILENAME))
+        start = time.perf_counter()
+        for recipient_id in recipient_ids:
+            found = store.query(recipient_id=recipient_id, day="5")
+        indexed = (time.perf_counter() - start) / lookups
+        store.close()
+        assert found == scanned and found
+
+    print(f"   Day file reparse    {reparse * 1000:>10.2f} ms/lookup")
+    print(f"   Results store       {indexed * 1000:>10.2f} ms/lookup  ({reparse / indexed:,.0f}× faster)")
+
+
+def bench_archive(n: int) -> None:
+    """Fetch single Day 5 emails: json.load of the day file vs the memory-mapped archive (format "archive")"""
+    import brain
+    from archive import ArchiveReader
+
+    lookups = 1000
+    print(f"\n⏱️  Single-email fetches from Day 5 ({n:,} recipients × 50 events)")
+    with tempfile.TemporaryDirectory() as tmp:
+        recipients_file, events_file = write_synthetic_data(tmp, n)
+        for fmt in ("json", "archive"):
+            start = time.perf_counter()
+            with redirect_stdout(io.StringIO()):
+                brain.generate_batch(
+                    recipients_file, events_file, ["5"], os.path.join(tmp, fmt),
+                    use_ai=False, output_format=fmt, store_results=False
+                )
+            print(f"   Write --format {fmt:<8} {time.perf_counter() - start:>10.2f} s")
+
+        start = time.perf_counter()
+        with open(os.path.join(tmp, "json", "day_5_emails.json"), 'r', encoding='utf-8') as f:
+            emails = json.load(f)["emails"]
+        load = time.perf_counter() - start
+        rng = random.Random(0)
+        picks = [rng.randrange(len(emails)) for _ in range(lookups)]
+
+        start = time.perf_counter()
+        with ArchiveReader(os.path.join(tmp, "archive", "day_5_emails.jsonl")) as archive:
+            opened = time.perf_counter() - start
+            start = time.perf_counter()
+            by_number = [archive[i] for i in picks]
+            per_number = (time.perf_counter() - start) / lookups
+            start = time.perf_counter()
+            by_key = [archive.find(emails[i]["meta"]["recipient_id"], emails[i]["meta"]["event_id"]) for i in picks]
+            per_key = (time.perf_counter() - start) / lookups
+        assert by_number == by_key
+
+    print(f"   json.load day file    {load * 1000:>10.1f} ms  ({len(emails):,} emails)")
+    print(f"   Archive open          {opened * 1000:>10.3f} ms")
+    print(f"   Archive email N       {per_number * 1e6:>10.1f} µs/fetch")
+    print(f"   Archive (r, e) key    {per_key * 1e6:>10.1f} µs/fetch")
+
+
+def import_profile(modules: Tuple[str, ...] = ("brain",)) -> Tuple[float, List[Tuple[float, str]]]:
+    """
+    One fresh interpreter importing `modules` under -X importtime
+
+    Returns the total ms of those imports and (ms, module) of brain's direct imports.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {', '.join(modules)}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True
+    )
+    total, children, brain_children = 0.0, [], []
+    for line in result.stderr.splitlines():
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # Header
+        depth = len(name) - len(name.lstrip())
+        if depth == 1:
+            # A top-level import finished; the lines before it were its children
+            if name.strip() in modules:
+                total += int(cumulative) / 1000
+            if name.strip() == "brain":
+                brain_children = children
+            children = []
+        elif depth == 3:
+            children.append((int(cumulative) / 1000, name.strip()))
+    return total, sorted(brain_children, reverse=True)
+
+
+def bench_startup(n: int, budget_ms: float = STARTUP_BUDGET_MS) -> int:
+    """
+    Median `import brain` time over n fresh interpreters, beyond STARTUP_FLOOR
+
+    Returns 1 if over budget or a lazy module loads.
+    """
+    from llm_metrics import percentile
+
+    # Refresh __pycache__ (even under PYTHONDONTWRITEBYTECODE) so the runs measure a warm install
+    env = {k: v for k, v in os.environ.items() if k != "PYTHONDONTWRITEBYTECODE"}
+    subprocess.run(
+        [sys.executable, "-c", "import brain"], cwd=os.path.dirname(os.path.abspath(__file__)), env=env, check=True
+    )
+    runs, overheads = [], []
+    for _ in range(n):
+        # Interleaved, so both see the same machine load
+        run = import_profile()
+        floor, _ = import_profile(STARTUP_FLOOR)
+        runs.append(run)
+        overheads.append(run[0] - floor)
+    totals = [total for total, _ in runs]
+    median = percentile(totals, 50)
+    overhead = percentile(overheads, 50)
+    _, children = min(runs, key=lambda run: abs(run[0] - median))
+
+    loaded = subprocess.run(
+        [sys.executable, "-c", f"import sys, brain; print(' '.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"],
+        cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True
+    ).stdout.split()
+
+    print(f"\n🚀 import brain, {n} fresh interpreters (python -X importtime)")
+    print(f"   p50  {median:>8.1f} ms")
+    print(f"   max  {max(totals):>8.1f} ms")
+    print(f"   p50  {overhead:>8.1f} ms beyond {', '.join(STARTUP_FLOOR)}   (budget {budget_ms:.0f} ms)")
+    print("   Heaviest imports (p50 run):")
+    for ms, name in children[:5]:
+        print(f"      {name:<28} {ms:>6.1f} ms")
+
+    failed = False
+    if overhead > budget_ms:
+        print(f"❌ Over budget by {overhead - budget_ms:.1f} ms")
+        failed = True
+    if loaded:
+        print(f"❌ Imported eagerly: {', '.join(loaded)}")
+        failed = True
+    if not failed:
+        print("✅ Within budget; no lazy module imported")
+    return 1 if failed else 0
+
+
+BENCHMARKS = {
+    "fallback": bench_fallback,
+    "workers": bench_workers,
+    "overlap": bench_overlap,
+    "tokens": bench_tokens,
+    "serve": bench_serve,
+    "query": bench_query,
+    "archive": bench_archive,
+    "startup": bench_startup,
+}
+DEFAULT_ITERATIONS = {"startup": 20}  # Fresh interpreters, not loop iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Email generator micro-benchmarks")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS), help="Benchmark to run")
+    parser.add_argument("-n", type=int, help="Iterations (default 5000; startup: 20 runs)")
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS, help="startup: import time budget beyond the stdlib floor")
+    args = parser.parse_args()
+
+    n = args.n or DEFAULT_ITERATIONS.get(args.benchmark, 5000)
+    if args.benchmark == "startup":
+        return bench_startup(n, args.budget_ms)
+    BENCHMARKS[args.benchmark](n)
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -11,36 +11,68 @@ Usage:
     python brain.py                    # Generate Day 1 emails (demo)
     python brain.py --all              # Generate all 7 days
     python brain.py --day 3            # Generate specific day
+    python brain.py --full-matrix      # Evaluate every pair (no tag index)
+    python brain.py --concurrency 8    # Parallel AI requests (rate-limited)
+    python brain.py --batch-size 8     # 8 recipients per AI request (same event/day)
+    python brain.py --format jsonl     # Stream day files as JSON Lines
+    python brain.py --format archive   # JSON Lines + offset index for random access (see archive.py)
+    python brain.py --no-ai --workers 8  # Shard deterministic runs across cores
+    python brain.py --keep-invalid     # Pair invalid records too (validation_failed)
+    python brain.py --matcher numpy    # Vectorized overlap matrix (needs numpy)
+    python brain.py --resume <run-id>  # Continue an interrupted (journaled) run
+    python brain.py --all --incremental  # Only regenerate changed recipients/events
+    python brain.py --due --window 1   # Only what goes out in the next hour (from start_date)
+    python brain.py serve --no-ai      # Warm daemon: /render, /batches (see server.py)
+    python brain.py query --recipient r_002 --day 5  # Look up results (see results_store.py)
 """
 
 import json
 import os
 import argparse
-from datetime import datetime, timezone
-from typing import Dict, List, Optional, Tuple, Any
-from dateutil import parser as dateparse
-import pytz
-from groq import Groq
+import re
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+from matching import MatchingEngine
+from bulk_matching import HAS_NUMPY, MATCHERS, BulkMatcher
+from records import normalize_topic
+from renderer import FallbackRenderer
+from output_writers import FORMATS, DayWriter, open_day_writer
+from ingest import iter_records
+from resilience import CircuitOpenError, ResilientCaller
+from response_parsing import (
+    REJECTED, REPAIRED, VALID, ResponseRejected, check_email, parse_batch_response, parse_email_response
+)
+from scheduler import IST, SCHEDULE_STATE, SendScheduler, load_window_end, parse_start, save_window_end, slots_by_day
+from validation import (
+    merge_reports,
+    new_report,
+    record_result,
+    validate_event_fields,
+    validate_recipient_fields,
+)
 
 # Import your templates
 try:
     from templates import (
         SYSTEM_PROMPT,
         USER_PROMPT_TEMPLATE,
+        BATCH_USER_PROMPT_TEMPLATE,
         EMAIL_TYPES,
         VALIDATION_RULES
     )
 except ImportError:
     print("⚠️  Warning: templates.py not found. Using embedded validation rules.")
-    VALIDATION_RULES = {
-        "required_recipient_fields": ["recipient_id", "name", "email", "organization", "topics", "engagement_score", "opt_out"],
-        "required_event_fields": ["event_id", "title", "start_date", "tags", "organizer", "metadata"],
-        "required_metadata_fields": ["amount_range", "application_deadline"],
-        "topic_match_threshold": {"high": 2, "medium": 1, "none": 0},
-        "engagement_thresholds": {"high": 0.7, "low": 0.5}
-    }
+    from validation import VALIDATION_RULES
 
-IST = pytz.timezone("Asia/Kolkata")
+if TYPE_CHECKING:
+    from async_generation import RateLimiter
+    from manifest import IncrementalState
+    from response_cache import ResponseCache
+    from run_journal import RunJournal
 
 
 # =============================
@@ -54,6 +86,27 @@ class Config:
     RECIPIENTS_FILE = "./data/recipients.json"
     EVENTS_FILE = "./data/grant_events.json"
     OUTPUT_DIR = "./data/generated"
+    OUTPUT_FORMAT = os.getenv("OUTPUT_FORMAT", "json")  # "json" | "jsonl" (streaming) | "archive" (indexed jsonl)
+    CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))   # Recipients decided/rendered together
+    WORKERS = int(os.getenv("WORKERS", "1"))            # Processes for deterministic runs
+    MATCHER = os.getenv("MATCHER", "index")             # Candidate pairs: "index" or "numpy"
+    GROQ_RPM = int(os.getenv("GROQ_RPM", "30"))        # Requests per minute (Groq free tier)
+    GROQ_TPM = int(os.getenv("GROQ_TPM", "12000"))     # Tokens per minute (Groq free tier)
+    CONCURRENCY = int(os.getenv("CONCURRENCY", "1"))   # Parallel AI requests
+    BATCH_SIZE = int(os.getenv("BATCH_SIZE", "1"))     # Recipients per AI request (same event/day)
+    CACHE_PATH = os.getenv("CACHE_PATH", "./data/cache/responses.sqlite3")
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "100000"))
+    CACHE_MAX_AGE_DAYS = float(os.getenv("CACHE_MAX_AGE_DAYS", "30"))
+    RUNS_DIR = os.getenv("RUNS_DIR", "./data/runs")                     # Run journals (--resume)
+    JOURNAL_FLUSH_EVERY = int(os.getenv("JOURNAL_FLUSH_EVERY", "100"))  # Results per checkpoint
+    LLM_METRICS_FILE = os.getenv("LLM_METRICS_FILE", "")                # Default: <output_dir>/llm_metrics.json
+    BREAKER_THRESHOLD = int(os.getenv("BREAKER_THRESHOLD", "5"))       # Consecutive failed requests; 0 = never trip
+    STORE_RESULTS = os.getenv("STORE_RESULTS", "true").lower() == "true"  # <output_dir>/results.sqlite3
+    SERVE_HOST = os.getenv("SERVE_HOST", "127.0.0.1")                    # brain.py serve
+    SERVE_PORT = int(os.getenv("SERVE_PORT", "8765"))
+    SERVE_REFRESH_SECONDS = float(os.getenv("SERVE_REFRESH_SECONDS", "60"))  # Deadline clock / events reload
+    SERVE_DATA_DIR = os.getenv("SERVE_DATA_DIR", "./data")               # Batch recipients_file must be inside
+    SERVE_BREAKER_COOLDOWN = float(os.getenv("SERVE_BREAKER_COOLDOWN", "30"))  # Seconds before an open breaker probes
 
 
 # =============================
@@ -62,9 +115,30 @@ class Config:
 class GroqEmailGenerator:
     """Handles AI-powered email generation using Groq"""
     
-    def __init__(self, api_key: Optional[str] = None, model: str = None):
+    MAX_TOKENS = 4096
+    MAX_BATCH_TOKENS = 32768  # Completion cap for one multi-recipient request
+    TEMPERATURE = 0.7
+    
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: str = None,
+        client: Any = None,
+        cache: Optional["ResponseCache"] = None
+    ):
+        from llm_metrics import LLMMetrics
+
         self.api_key = api_key or Config.GROQ_API_KEY
         self.model = model or Config.GROQ_MODEL
+        self.cache = cache
+        self.renderer = FallbackRenderer()
+        self.metrics = LLMMetrics()
+        self.resilience = ResilientCaller(Config.BREAKER_THRESHOLD)
+        
+        if client is not None:
+            # Injected client (e.g. a local stub for tests/benchmarks)
+            self.client = client
+            return
         
         if not self.api_key:
             raise ValueError(
@@ -73,352 +147,364 @@ class GroqEmailGenerator:
                 "Then set: export GROQ_API_KEY='your-key-here'"
             )
         
-        self.client = Groq(api_key=self.api_key)
+        # Imported here so deterministic runs never pay for the SDK
+        try:
+            from groq import Groq
+        except ImportError:
+            raise ValueError("groq package required for AI generation (pip install groq)") from None
+        
+        # Retries are handled by self.resilience, not the SDK
+        self.client = Groq(api_key=self.api_key, max_retries=0)
         print(f"🤖 Groq AI initialized with model: {self.model}")
     
-    def generate_email_content(self, recipient: Dict, event: Dict, day_number: str) -> Dict:
+    def fork(self) -> "GroqEmailGenerator":
+        """Same client, model and cache, with its own metrics and circuit breaker (one per batch run)"""
+        return GroqEmailGenerator(self.api_key, self.model, self.client, self.cache)
+    
+    @staticmethod
+    def _strategy_fields(day_number: str) -> Dict[str, Any]:
+        """EMAIL_TYPES entry for a day, as prompt template fields"""
+        email_config = EMAIL_TYPES.get(day_number, EMAIL_TYPES.get(int(day_number) if day_number.isdigit() else None, {}))
+        return {
+            "day_number": day_number,
+            "email_type": email_config.get("type", "Custom"),
+            "purpose": email_config.get("purpose", "Engage recipient"),
+            "principle": email_config.get("principle", "Personalized outreach"),
+            "subject_formula": email_config.get("subject_formula", "Custom subject"),
+            "structure": "\n".join(f"- {item}" for item in email_config.get("structure", ["Standard email structure"]))
+        }
+    
+    def build_user_prompt(self, recipient: Dict, event: Dict, day_number: str) -> str:
+        """Render USER_PROMPT_TEMPLATE for one recipient-event-day"""
+        return USER_PROMPT_TEMPLATE.format(
+            **self._strategy_fields(day_number),
+            recipient_json=json.dumps(recipient, indent=2),
+            event_json=json.dumps(event, indent=2)
+        )
+    
+    def build_batch_prompt(self, recipients: List[Dict], event: Dict, day_number: str) -> str:
+        """Render BATCH_USER_PROMPT_TEMPLATE for several recipients of one event-day"""
+        return BATCH_USER_PROMPT_TEMPLATE.format(
+            **self._strategy_fields(day_number),
+            count=len(recipients),
+            recipients_json=json.dumps(recipients, indent=2),
+            event_json=json.dumps(event, indent=2)
+        )
+    
+    def _parse_email(self, response_text: Any, call: Dict) -> Dict:
+        """Parse a single-email completion (see response_parsing.py); raises ResponseRejected"""
+        parsed = parse_email_response(response_text)
+        self.metrics.count_response(parsed.status)
+        call["parse"] = parsed.status
+        if parsed.repairs:
+            call["repairs"] = parsed.repairs
+        if parsed.status == REJECTED:
+            raise ResponseRejected(parsed.error)
+        return parsed.data
+    
+    def cached_content(self, user_prompt: str) -> Optional[Dict]:
+        """Look up a previously generated response for this exact request (recorded as a cached call)"""
+        if self.cache is None:
+            return None
+        cached = self.cache.get(
+            self.cache.make_key(SYSTEM_PROMPT, user_prompt, self.model, self.TEMPERATURE)
+        )
+        if cached is not None:
+            call = self.metrics.new_call(self.model)
+            call["cached"] = True
+            self.metrics.record(call)
+            cached["_llm"] = call
+        return cached
+    
+    def generate_email_content(
+        self,
+        recipient: Dict,
+        event: Dict,
+        day_number: str,
+        check_cache: bool = True
+    ) -> Dict:
         """Generate email using Groq API with your templates"""
         
+        call = self.metrics.new_call(self.model)
         try:
-            # Get email configuration from templates
-            email_config = EMAIL_TYPES.get(day_number, EMAIL_TYPES.get(int(day_number), {}))
+            user_prompt = self.build_user_prompt(recipient, event, day_number)
             
-            # Build user prompt
-            user_prompt = USER_PROMPT_TEMPLATE.format(
-                day_number=day_number,
-                email_type=email_config.get("type", "Custom"),
-                purpose=email_config.get("purpose", "Engage recipient"),
-                principle=email_config.get("principle", "Personalized outreach"),
-                subject_formula=email_config.get("subject_formula", "Custom subject"),
-                structure="\n".join(f"- {item}" for item in email_config.get("structure", ["Standard email structure"])),
-                recipient_json=json.dumps(recipient, indent=2),
-                event_json=json.dumps(event, indent=2)
-            )
+            if check_cache:
+                cached = self.cached_content(user_prompt)
+                if cached is not None:
+                    return cached
             
-            # Call Groq API
-            chat_completion = self.client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": user_prompt}
-                ],
-                model=self.model,
-                temperature=0.7,
-                max_tokens=4096,
-                response_format={"type": "json_object"},  # Force JSON
-            )
+            # Call Groq API (retried per error class, see resilience.py)
+            started = time.perf_counter()
             
-            response_text = chat_completion.choices[0].message.content
+            def attempt() -> Any:
+                try:
+                    chat_completion = self.client.chat.completions.create(
+                        messages=[
+                            {"role": "system", "content": SYSTEM_PROMPT},
+                            {"role": "user", "content": user_prompt}
+                        ],
+                        model=self.model,
+                        temperature=self.TEMPERATURE,
+                        max_tokens=self.MAX_TOKENS,
+                        response_format={"type": "json_object"},  # Force JSON
+                    )
+                except Exception as e:
+                    self.metrics.failed(call, started, e)
+                    raise
+                self.metrics.observe(call, chat_completion, started, SYSTEM_PROMPT + user_prompt)
+                return self._parse_email(chat_completion.choices[0].message.content, call)
             
-            # Clean and parse JSON
-            if response_text.strip().startswith("```"):
-                response_text = response_text.strip().split("```")[1]
-                if response_text.startswith("json"):
-                    response_text = response_text[4:]
+            result = self.resilience.call(attempt, call)
             
-            return json.loads(response_text.strip())
+            if self.cache is not None:
+                self.cache.put(
+                    self.cache.make_key(SYSTEM_PROMPT, user_prompt, self.model, self.TEMPERATURE),
+                    result
+                )
+            self.metrics.record(call)
+            result["_llm"] = call
+            return result
             
+        except CircuitOpenError as e:
+            return self._fallback_email(recipient, event, day_number, f"Circuit open: {e}", call)
+        except ResponseRejected as e:
+            print(f"⚠️  Rejected response: {e}")
+            return self._fallback_email(recipient, event, day_number, f"Rejected response: {e}", call)
         except json.JSONDecodeError as e:
             print(f"⚠️  JSON parse error: {e}")
-            return self._fallback_email(recipient, event, day_number, f"JSON parse error: {e}")
+            return self._fallback_email(recipient, event, day_number, f"JSON parse error: {e}", call)
         except Exception as e:
             print(f"⚠️  API error: {e}")
-            return self._fallback_email(recipient, event, day_number, f"API error: {e}")
+            return self._fallback_email(recipient, event, day_number, f"API error: {e}", call)
     
-    def _fallback_email(self, recipient: Dict, event: Dict, day_number: str, error: str) -> Dict:
-        """Fallback to deterministic, day-specific email using Russell Brunson framework"""
-        email_config = EMAIL_TYPES.get(day_number, EMAIL_TYPES.get(int(day_number) if day_number.isdigit() else None, {}))
+    def generate_batch_contents(
+        self,
+        recipients: List[Dict],
+        event: Dict,
+        day_number: str,
+        check_cache: bool = True
+    ) -> Dict[str, Dict]:
+        """
+        Generate emails for several recipients of one event-day in one request
         
-        subject = self._generate_subject(recipient, event, day_number, email_config)
-        body = self._generate_body_by_day(recipient, event, day_number, email_config)
-        
-        return {
-            "internal_reasoning": {
-                "email_type": email_config.get("type", "Custom"),
-                "error": error,
-                "match_decision": "send",
-                "principle": email_config.get("principle", "Personalized outreach")
-            },
-            "email": {
-                "subject": subject,
-                "body": body
-            },
-            "verification": {
-                "all_data_from_json": True,
-                "fallback_used": True
-            },
-            "warnings": [f"Used fallback due to: {error}"]
-        }
-    
-    def _generate_subject(self, recipient: Dict, event: Dict, day_number: str, email_config: Dict) -> str:
-        """Generate day-specific subject line"""
-        name = recipient.get("name", "")
-        org = recipient.get("organization", "")
-        title = event.get("title", "")
-        topics = recipient.get("topics", [])
-        
-        day_subjects = {
-            "0": f"You're in! Here's what to expect - {title}",
-            "1": f"The #1 mistake that kills 97% of {topics[0].replace('_', ' ').title()} applications",
-            "3": f"Proof: Real organizations getting real grant money - {title}",
-            "5": f"I get it... you're skeptical (but read this about {title})",
-            "6": f"⏰ Tomorrow: Your {topics[0].replace('_', ' ').title()} funding breakthrough",
-            "7a": f"🔴 Going LIVE in 6 hours - {title}",
-            "7b": f"⏰ Starting in 60 minutes (join now)"
-        }
+        Recipients already in the cache are not sent (unless check_cache=False). The response must be
+        {"emails": [...]} with a "recipient_id" per entry; each entry is
+        checked on its own and valid ones are cached under the single-pair
+        prompt. Returns: {recipient_id: content} for the valid items only;
+        callers fall back to generate_email_content() for the rest.
+        """
+        contents: Dict[str, Dict] = {}
+        to_send = []
+        for recipient in recipients:
+            cached = None
+            if check_cache:
+                cached = self.cached_content(self.build_user_prompt(recipient, event, day_number))
+            if cached is not None:
+                contents[recipient["recipient_id"]] = cached
+            else:
+                to_send.append(recipient)
+        if not to_send:
+            return contents
+        if len(to_send) == 1:
+            recipient = to_send[0]
+            contents[recipient["recipient_id"]] = self.generate_email_content(recipient, event, day_number, False)
+            return contents
         
-        return day_subjects.get(str(day_number), f"{title} - Opportunity for {org}")
-    
-    def _generate_body_by_day(self, recipient: Dict, event: Dict, day_number: str, email_config: Dict) -> str:
-        """Generate day-specific email body using Russell Brunson framework"""
-        name = recipient.get("name", "there")
-        org = recipient.get("organization", "your organization")
-        title = event.get("title", "this opportunity")
-        organizer = event.get("organizer", "the organizer")
-        amount = event.get("metadata", {}).get("amount_range", "grants available")
-        deadline = event.get("metadata", {}).get("application_deadline", "the deadline")
-        topics = recipient.get("topics", ["funding"])
-        topic_str = topics[0].replace("_", " ").title()
+        call = self.metrics.new_call(self.model, emails=len(to_send))
+        try:
+            batch_prompt = self.build_batch_prompt(to_send, event, day_number)
+            started = time.perf_counter()
+            
+            def attempt() -> Any:
+                try:
+                    chat_completion = self.client.chat.completions.create(
+                        messages=[
+                            {"role": "system", "content": SYSTEM_PROMPT},
+                            {"role": "user", "content": batch_prompt}
+                        ],
+                        model=self.model,
+                        temperature=self.TEMPERATURE,
+                        max_tokens=min(self.MAX_TOKENS * len(to_send), self.MAX_BATCH_TOKENS),
+                        response_format={"type": "json_object"},
+                    )
+                except Exception as e:
+                    self.metrics.failed(call, started, e)
+                    raise
+                self.metrics.observe(call, chat_completion, started, SYSTEM_PROMPT + batch_prompt)
+                parsed = parse_batch_response(chat_completion.choices[0].message.content)
+                if parsed.status == REJECTED:
+                    self.metrics.count_response(REJECTED)
+                    raise ResponseRejected(parsed.error)
+                return parsed
+            
+            parsed = self.resilience.call(attempt, call)
+        except CircuitOpenError:
+            # Breaker is open: callers render these recipients deterministically
+            # (attempts made before it opened still count, against no emails)
+            call["emails"] = 0
+            self.metrics.record(call)
+            return contents
+        except Exception as e:
+            print(f"⚠️  Batched request failed ({len(to_send)} recipients): {e}")
+            # Tokens spent on an unusable response still count, against no emails
+            call["emails"] = 0
+            self.metrics.record(call)
+            return contents
         
-        day_number = str(day_number)
+        wanted = {recipient["recipient_id"]: recipient for recipient in to_send}
+        item_repairs: Dict[str, List[str]] = {}
+        for item in parsed.data:
+            recipient_id = item.pop("recipient_id", None) if isinstance(item, dict) else None
+            if recipient_id not in wanted or recipient_id in contents:
+                # Unknown or repeated ids are matched to no one; their recipients fall back
+                self.metrics.count_response(REJECTED)
+                continue
+            error, repairs = check_email(item)
+            repairs = parsed.repairs + repairs
+            self.metrics.count_response(REJECTED if error else REPAIRED if repairs else VALID)
+            if error:
+                continue
+            item_repairs[recipient_id] = repairs
+            if self.cache is not None:
+                prompt = self.build_user_prompt(wanted[recipient_id], event, day_number)
+                self.cache.put(
+                    self.cache.make_key(SYSTEM_PROMPT, prompt, self.model, self.TEMPERATURE), item
+                )
+            contents[recipient_id] = item
         
-        if day_number == "0":
-            # Registration Confirmation
-            return f"""Hi {name},
-
-You're officially in! 🎉
-
-I'm excited to welcome you to {title}, happening with {organizer}.
-
-Here's what you can expect:
-• A deep dive into {topic_str.lower()} funding opportunities
-• Real grant amounts: {amount}
-• Application deadline: {deadline}
-• Expert insights and strategies to succeed
-
-Mark your calendar and get ready to take your {org}'s funding efforts to the next level.
-
-More details coming your way tomorrow!
-
-Best regards,
-
-Priya Singh
-Grants Coordinator
-Funding Forward"""
-
-        elif day_number == "1":
-            # Indoctrination - The Big Problem
-            return f"""Hi {name},
-
-In my work with {org}-like organizations, I see the same pattern over and over.
-
-The #1 mistake that kills 97% of {topic_str.lower()} applications isn't lack of merit. It's not even lack of funding sources.
-
-It's applying to opportunities without understanding what funders actually want to see.
-
-Most organizations scramble at the last minute, missing the nuances that make their application stand out. They don't realize that {title} — happening soon — is specifically designed to teach exactly this.
-
-That's why I wanted to personally reach out.
-
-{title} is happening with {organizer}, and they're revealing insider strategies funders use to evaluate applications. Grant amounts: {amount}. Application deadline: {deadline}.
-
-This could be the turning point for your next funding cycle.
-
-Mark your calendar. More details tomorrow.
-
-Best regards,
-
-Priya Singh
-Grants Coordinator
-Funding Forward"""
-
-        elif day_number == "3":
-            # Social Proof
-            return f"""Hi {name},
-
-Proof: Real organizations getting real grant money.
-
-{organizer} has been supporting {topic_str.lower()} initiatives like {org} for years. The numbers speak for themselves: organizations in your space have secured grants ranging from {amount}.
-
-Why? Because they understand what funders look for.
-
-{title} is where that knowledge is shared, and where the next batch of successful applicants get their edge.
-
-Application deadline: {deadline}
-
-Your organization could be next.
-
-Best regards,
-
-Priya Singh
-Grants Coordinator
-Funding Forward"""
-
-        elif day_number == "5":
-            # Objection Handling
-            return f"""Hi {name},
-
-I get it. You're probably thinking: "Another funding opportunity... is it really worth our time?"
-
-Fair question. Here's the honest answer:
-
-Most {topic_str.lower()} funding programs are generic. But {title}? It's different. {organizer} specifically designed this for organizations like {org}.
-
-Common objection: "We don't have time." Reality: The insights from {title} will save you weeks on future applications.
-
-Common objection: "We're not competitive enough." Reality: Grant amounts of {amount} go to organizations that know how to present their work. That's taught here.
-
-Application deadline: {deadline}
-
-The real question isn't whether you have time. It's whether you can afford not to attend.
-
-Best regards,
-
-Priya Singh
-Grants Coordinator
-Funding Forward"""
-
-        elif day_number == "6":
-            # Final Push - Tomorrow
-            return f"""Hi {name},
-
-Tomorrow is the day.
-
-{title} goes live tomorrow, and I wanted to make sure you're ready.
-
-Here's what to prepare:
-✅ Your project details and impact metrics
-✅ Questions about the application process
-✅ A notepad — you'll want to capture the strategies shared
-
-Grants up to {amount}. Application deadline: {deadline}.
-
-This is happening tomorrow with {organizer}.
-
-Set a reminder right now. This could be the breakthrough {org} has been waiting for.
-
-Best regards,
-
-Priya Singh
-Grants Coordinator
-Funding Forward
-
-P.S. – Tomorrow morning, you'll get one final reminder with exact timing and access details. Don't miss it."""
-
-        elif day_number == "7a":
-            # Morning Reminder - Event Day
-            return f"""Hi {name},
-
-🔴 Going LIVE in 6 hours - {title}
-
-{organizer} is about to share insider strategies for securing {amount} in grants.
-
-Have ready:
-✅ Your laptop/phone and a quiet space
-✅ Your organization's current funding challenges
-✅ A notebook for notes
-
-Application deadline: {deadline}
-
-See you in 6 hours!
-
-Best regards,
+        # The request's tokens are spread over the emails it actually delivered
+        delivered = [rid for rid in contents if rid in wanted]
+        call["emails"] = len(delivered)
+        self.metrics.record(call)
+        for recipient_id in delivered:
+            share = contents[recipient_id]["_llm"] = self.metrics.share(call)
+            share["parse"] = REPAIRED if item_repairs[recipient_id] else VALID
+            if item_repairs[recipient_id]:
+                share["repairs"] = item_repairs[recipient_id]
+        return contents
+    
+    def _fallback_email(
+        self,
+        recipient: Dict,
+        event: Dict,
+        day_number: str,
+        error: str,
+        call: Optional[Dict] = None
+    ) -> Dict:
+        """Fallback to deterministic, day-specific email using Russell Brunson framework"""
+        result = self.renderer.render(recipient, event, day_number, error)
+        call = call or self.metrics.new_call(self.model)
+        call["fallback_reason"] = error
+        self.metrics.record(call)
+        result["_llm"] = call
+        return result
 
-Priya Singh
-Grants Coordinator
-Funding Forward"""
 
-        elif day_number == "7b":
-            # Final Warning - Last Hour
-            return f"""Hi {name},
+# =============================
+# Validation Functions
+# =============================
+def validate_recipient(recipient: Dict) -> List[str]:
+    """Validate recipient data"""
+    return [message for _, message in validate_recipient_fields(recipient)]
 
-⏰ Starting in 60 minutes!
 
-{title} is about to start. {organizer} is revealing exactly how to get grants up to {amount}.
+def validate_event(event: Dict) -> List[str]:
+    """Validate event data"""
+    return [message for _, message in validate_event_fields(event)]
 
-Application deadline: {deadline}
 
-Join now. This is it.
+# Strict ISO 8601 subset handled by datetime.fromisoformat (no dateutil)
+_ISO_DEADLINE = re.compile(
+    r"\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d{3}|\.\d{6})?)?)?(?:Z|[+-]\d{2}:\d{2})?"
+)
 
-Priya Singh
-Grants Coordinator
-Funding Forward"""
 
-        else:
-            # Generic fallback for unknown days
-            return f"""Hi {name},
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
 
-I wanted to share {title} organised by {organizer}.
 
-Grant amount: {amount}
-Application deadline: {deadline}
+def parse_deadline(deadline_str: str) -> datetime:
+    """Parse a deadline to an aware UTC datetime (naive values are IST)"""
+    dt = None
+    if isinstance(deadline_str, str) and _ISO_DEADLINE.fullmatch(deadline_str):
+        try:
+            dt = datetime.fromisoformat(deadline_str.replace("Z", "+00:00"))
+        except ValueError:
+            pass  # e.g. day out of range; let dateutil report it
+    if dt is None:
+        from dateutil import parser as dateparse
+        dt = dateparse.parse(deadline_str)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=IST)
+    return dt.astimezone(timezone.utc)
 
-This may be relevant for your work at {org}.
 
-Best regards,
+def is_deadline_passed(deadline_str: str, now: Optional[datetime] = None) -> Tuple[bool, Optional[str]]:
+    """Check if application deadline has passed"""
+    try:
+        dt = parse_deadline(deadline_str)
+        return (now or utc_now()) > dt, None
+    except Exception as e:
+        return False, f"Invalid deadline format: {e}"
 
-Priya Singh
-Grants Coordinator
-Funding Forward"""
 
+class DeadlineCache:
+    """
+    Memoized deadline checks against a single run-level "now"
 
-# =============================
-# Validation Functions
-# =============================
-def validate_recipient(recipient: Dict) -> List[str]:
-    """Validate recipient data"""
-    errors = []
-    for field in VALIDATION_RULES["required_recipient_fields"]:
-        if field not in recipient:
-            errors.append(f"Missing recipient field: {field}")
-    if "topics" in recipient and not isinstance(recipient["topics"], list):
-        errors.append("recipient.topics must be a list")
-    return errors
+    Each distinct application_deadline is parsed once per run; `clock`
+    (returning an aware datetime) can be injected for reproducible runs.
+    """
+    
+    def __init__(self, now: Optional[datetime] = None, clock: Callable[[], datetime] = utc_now):
+        self.now = now or clock()
+        self._results: Dict[str, Tuple[bool, Optional[str]]] = {}
+    
+    def is_passed(self, deadline_str: str) -> Tuple[bool, Optional[str]]:
+        try:
+            return self._results[deadline_str]
+        except KeyError:
+            result = self._results[deadline_str] = is_deadline_passed(deadline_str, self.now)
+            return result
+        except TypeError:
+            # Unhashable value; is_deadline_passed reports it as invalid
+            return is_deadline_passed(deadline_str, self.now)
 
 
-def validate_event(event: Dict) -> List[str]:
-    """Validate event data"""
-    errors = []
-    for field in VALIDATION_RULES["required_event_fields"]:
-        if field not in event:
-            errors.append(f"Missing event field: {field}")
-    if "metadata" in event:
-        for m in VALIDATION_RULES["required_metadata_fields"]:
-            if m not in event["metadata"]:
-                errors.append(f"Missing event.metadata field: {m}")
-    if "tags" in event and not isinstance(event["tags"], list):
-        errors.append("event.tags must be a list")
-    return errors
-
-
-def is_deadline_passed(deadline_str: str) -> Tuple[bool, Optional[str]]:
-    """Check if application deadline has passed"""
-    try:
-        dt = dateparse.parse(deadline_str)
-        if dt.tzinfo is None:
-            dt = IST.localize(dt)
-        dt = dt.astimezone(timezone.utc)
-        return datetime.now(timezone.utc) > dt, None
-    except Exception as e:
-        return False, f"Invalid deadline format: {e}"
+def _check_deadline(deadline_str: str, deadlines: Optional[DeadlineCache]) -> Tuple[bool, Optional[str]]:
+    if deadlines is None:
+        return is_deadline_passed(deadline_str)
+    return deadlines.is_passed(deadline_str)
 
 
 def topic_overlap(recipient_topics: List[str], event_tags: List[str]) -> List[str]:
     """Find overlapping topics (case-insensitive)"""
-    r_lower = {t.strip().lower() for t in recipient_topics}
-    e_lower = {t.strip().lower() for t in event_tags}
-    return sorted([t for t in recipient_topics if t.strip().lower() in e_lower])
+    e_lower = {normalize_topic(t) for t in event_tags}
+    return sorted([t for t in recipient_topics if normalize_topic(t) in e_lower])
 
 
-def should_send_email(recipient: Dict, event: Dict) -> Tuple[bool, str, List[str]]:
+def should_send_email(
+    recipient: Dict,
+    event: Dict,
+    deadlines: Optional[DeadlineCache] = None,
+    validation: Optional[Tuple[List[str], List[str]]] = None,
+    overlap: Optional[List[str]] = None
+) -> Tuple[bool, str, List[str]]:
     """
     Determine if email should be sent
+    
+    `validation` takes precomputed (recipient_errors, event_errors) and
+    `overlap` a precomputed topic_overlap() (e.g. from the tag index).
     Returns: (should_send, reason, warnings)
     """
     warnings = []
     
     # Validate
-    r_errors = validate_recipient(recipient)
-    e_errors = validate_event(event)
+    if validation is None:
+        r_errors, e_errors = validate_recipient(recipient), validate_event(event)
+    else:
+        r_errors, e_errors = validation
     warnings.extend(r_errors + e_errors)
     
     if r_errors or e_errors:
@@ -431,14 +517,15 @@ def should_send_email(recipient: Dict, event: Dict) -> Tuple[bool, str, List[str
     # Check deadline
     deadline = event.get("metadata", {}).get("application_deadline")
     if deadline:
-        passed, err = is_deadline_passed(deadline)
+        passed, err = _check_deadline(deadline, deadlines)
         if err:
             warnings.append(err)
         elif passed:
             return False, "deadline_passed", ["Application deadline has passed - DO NOT SEND"]
     
     # Check topic match
-    overlap = topic_overlap(recipient.get("topics", []), event.get("tags", []))
+    if overlap is None:
+        overlap = topic_overlap(recipient.get("topics", []), event.get("tags", []))
     min_match = VALIDATION_RULES["topic_match_threshold"]["medium"]
     
     if len(overlap) < min_match:
@@ -452,6 +539,31 @@ def should_send_email(recipient: Dict, event: Dict) -> Tuple[bool, str, List[str
     return True, "approved", warnings
 
 
+def recipient_block_reason(recipient: Dict, errors: Optional[List[str]] = None) -> Optional[str]:
+    """Pair-independent block reason for a recipient (validation, opt-out)"""
+    if validate_recipient(recipient) if errors is None else errors:
+        return "validation_failed"
+    if recipient.get("opt_out", False):
+        return "opted_out"
+    return None
+
+
+def event_block_reason(
+    event: Dict,
+    deadlines: Optional[DeadlineCache] = None,
+    errors: Optional[List[str]] = None
+) -> Optional[str]:
+    """Pair-independent block reason for an event (validation, deadline)"""
+    if validate_event(event) if errors is None else errors:
+        return "validation_failed"
+    deadline = event.get("metadata", {}).get("application_deadline")
+    if deadline:
+        passed, err = _check_deadline(deadline, deadlines)
+        if passed and not err:
+            return "deadline_passed"
+    return None
+
+
 def tone_from_engagement(score: float) -> str:
     """Select tone based on engagement score"""
     if score >= VALIDATION_RULES["engagement_thresholds"]["high"]:
@@ -461,6 +573,169 @@ def tone_from_engagement(score: float) -> str:
     return "gentle"
 
 
+# =============================
+# Eligibility Decisions
+# =============================
+@dataclass(frozen=True)
+class PairDecision:
+    """Immutable pre-flight decision for one recipient-event pair, shared by every day"""
+    recipient_idx: int
+    event_idx: int
+    status: str                      # "approved" | "blocked"
+    reason: str
+    overlap: Tuple[str, ...]
+    tone: Optional[str]
+    warnings: Tuple[str, ...]
+
+    @property
+    def approved(self) -> bool:
+        return self.status == "approved"
+
+
+def decide_pair(
+    recipient: Dict,
+    event: Dict,
+    recipient_idx: int = 0,
+    event_idx: int = 0,
+    deadlines: Optional[DeadlineCache] = None,
+    validation: Optional[Tuple[List[str], List[str]]] = None,
+    overlap: Optional[List[str]] = None
+) -> PairDecision:
+    """Run the pair-independent pre-flight checks once"""
+    if overlap is None:
+        overlap = topic_overlap(recipient.get("topics", []), event.get("tags", []))
+    should_send, reason, warnings = should_send_email(recipient, event, deadlines, validation, overlap)
+    return PairDecision(
+        recipient_idx=recipient_idx,
+        event_idx=event_idx,
+        status="approved" if should_send else "blocked",
+        reason=reason,
+        overlap=tuple(overlap),
+        tone=tone_from_engagement(recipient.get("engagement_score", 0.5)) if should_send else None,
+        warnings=tuple(warnings)
+    )
+
+
+class EligibilityPlanner:
+    """
+    Decides pairs one recipient at a time against a fixed event list
+
+    Every event is validated once here and its errors cached by position;
+    with exclude_invalid, invalid events are dropped before pairing and
+    `events_report` records per-field failures. matcher="numpy" picks each
+    chunk's candidate pairs from one vectorized overlap matrix (see
+    bulk_matching.py) instead of per-recipient tag index lookups.
+    """
+    
+    def __init__(
+        self,
+        events: List[Dict],
+        skip_unmatched: bool = True,
+        now: Optional[datetime] = None,
+        exclude_invalid: bool = False,
+        matcher: str = "index"
+    ):
+        self.exclude_invalid = exclude_invalid
+        self.events_report = new_report()
+        checked = []
+        for event in events:
+            field_errors = validate_event_fields(event)
+            record_result(self.events_report, field_errors)
+            if not (exclude_invalid and field_errors):
+                checked.append((event, [message for _, message in field_errors]))
+        
+        self.events = [event for event, _ in checked]
+        self.event_errors = [errors for _, errors in checked]
+        self.deadlines = DeadlineCache(now)
+        self.skip_unmatched = skip_unmatched
+        # Encodes topic bitsets in both modes; also the tag index when skipping
+        self.engine = MatchingEngine(self.events)
+        self.bulk = None
+        self.event_reasons = None
+        if skip_unmatched and matcher == "numpy":
+            self.bulk = BulkMatcher(self.events)
+        if skip_unmatched:
+            self.event_reasons = [
+                event_block_reason(event, self.deadlines, errors) for event, errors in checked
+            ]
+    
+    def candidate_lists(self, recipients: List[Dict]) -> Optional[List[List[int]]]:
+        """Eligible event indices per recipient from the bulk matcher (None without one)"""
+        if self.bulk is None or not recipients:
+            return None
+        # At most rows_per_chunk recipients' overlap rows are held at a time
+        lists: List[List[int]] = []
+        for _, counts in self.bulk.iter_overlap_chunks(recipients):
+            lists.extend(self.bulk.eligible(counts))
+        return lists
+    
+    def decide_recipient(
+        self,
+        recipient: Dict,
+        recipient_idx: int,
+        errors: Optional[List[str]] = None,
+        candidate_idxs: Optional[List[int]] = None
+    ) -> Tuple[List[PairDecision], Dict[str, int]]:
+        """
+        Decisions for one recipient, in event order
+        
+        `errors` are the recipient's validation errors and `candidate_idxs`
+        its matching events (see candidate_lists()), if already known.
+        Returns: (decisions, skipped block counts from the tag index)
+        """
+        if errors is None:
+            errors = validate_recipient(recipient)
+        
+        if not self.skip_unmatched:
+            record = self.engine.encode(recipient)
+            candidates = [
+                (e_idx, record.overlap(event_record.tag_mask))
+                for e_idx, event_record in enumerate(self.engine.records)
+            ]
+        elif candidate_idxs is not None:
+            record = self.engine.encode(recipient)
+            candidates = [
+                (e_idx, record.overlap(self.engine.records[e_idx].tag_mask))
+                for e_idx in candidate_idxs
+            ]
+        else:
+            candidates = self.engine.candidates_for(self.engine.encode(recipient))
+        
+        decisions = [
+            decide_pair(
+                recipient, self.events[e_idx], recipient_idx, e_idx, self.deadlines,
+                (errors, self.event_errors[e_idx]), overlap
+            )
+            for e_idx, overlap in candidates
+        ]
+        if not self.skip_unmatched:
+            return decisions, {}
+        
+        skipped = self.engine.skipped_counts(
+            [e_idx for e_idx, _ in candidates], recipient_block_reason(recipient, errors), self.event_reasons
+        )
+        return decisions, skipped
+
+
+def decide_pairs(
+    recipients: List[Dict],
+    events: List[Dict],
+    now: Optional[datetime] = None
+) -> List[PairDecision]:
+    """
+    Pre-flight decision for every recipient-event pair, recipient by recipient
+
+    The same decisions generate_batch makes once per pair and reuses for
+    every day, for inspecting a run before it happens; pairs the tag index
+    would skip get their decision too.
+    """
+    planner = EligibilityPlanner(events, skip_unmatched=False, now=now)
+    decisions: List[PairDecision] = []
+    for r_idx, recipient in enumerate(recipients):
+        decisions.extend(planner.decide_recipient(recipient, r_idx)[0])
+    return decisions
+
+
 # =============================
 # Main Generation Logic
 # =============================
@@ -469,40 +744,49 @@ def generate_email_for_pair(
     event: Dict,
     day_number: str,
     ai_generator: Optional[GroqEmailGenerator] = None,
-    use_ai: bool = True
+    use_ai: bool = True,
+    decision: Optional[PairDecision] = None,
+    content: Optional[Dict] = None,
+    renderer: Optional[FallbackRenderer] = None
 ) -> Dict:
     """
     Generate email for a recipient-event pair
     
+    Pass a precomputed `decision` to reuse the pre-flight checks across days,
+    `content` when the email was already generated (e.g. concurrently), and a
+    shared `renderer` for deterministic runs.
     Returns complete email data structure
     """
     
     # Pre-flight checks
-    should_send, reason, warnings = should_send_email(recipient, event)
+    if decision is None:
+        decision = decide_pair(recipient, event)
     
-    if not should_send:
+    if not decision.approved:
         return {
             "meta": {
                 "recipient_id": recipient.get("recipient_id"),
                 "event_id": event.get("event_id"),
                 "day": day_number,
                 "status": "blocked",
-                "reason": reason
+                "reason": decision.reason
             },
             "internal_reasoning": {
                 "email_type": "N/A",
-                "match_decision": reason,
+                "match_decision": decision.reason,
                 "recipient_topics": recipient.get("topics", []),
                 "event_tags": event.get("tags", []),
-                "topic_overlap": topic_overlap(recipient.get("topics", []), event.get("tags", []))
+                "topic_overlap": list(decision.overlap)
             },
             "email": None,
             "verification": None,
-            "warnings": warnings
+            "warnings": list(decision.warnings)
         }
     
     # Generate email content
-    if use_ai and ai_generator:
+    if content is not None:
+        result = content
+    elif use_ai and ai_generator:
         try:
             result = ai_generator.generate_email_content(recipient, event, day_number)
         except Exception as e:
@@ -510,7 +794,9 @@ def generate_email_for_pair(
             result = ai_generator._fallback_email(recipient, event, day_number, str(e))
     else:
         # Use fallback (deterministic)
-        result = GroqEmailGenerator(api_key="dummy")._fallback_email(recipient, event, day_number, "AI disabled")
+        result = (renderer or FallbackRenderer()).render(recipient, event, day_number, "AI disabled")
+    
+    llm = result.pop("_llm", None)
     
     # Add metadata
     result["meta"] = {
@@ -519,11 +805,13 @@ def generate_email_for_pair(
         "day": day_number,
         "status": "generated",
         "generated_at": datetime.now(IST).isoformat(),
-        "tone": tone_from_engagement(recipient.get("engagement_score", 0.5)),
-        "topic_overlap": topic_overlap(recipient.get("topics", []), event.get("tags", []))
+        "tone": decision.tone,
+        "topic_overlap": list(decision.overlap)
     }
+    if llm is not None:
+        result["meta"]["llm"] = llm
     
-    result["warnings"] = warnings + result.get("warnings", [])
+    result["warnings"] = list(decision.warnings) + result.get("warnings", [])
     
     return result
 
@@ -531,34 +819,393 @@ def generate_email_for_pair(
 # =============================
 # Batch Processing
 # =============================
+def _chunked(items: Iterable, size: int) -> Iterator[List]:
+    """Group an iterable into lists of at most `size` items"""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _new_stats(days: List[str]) -> Dict[str, Any]:
+    return {
+        "total": 0,
+        "generated": 0,
+        "blocked": 0,
+        "skipped": 0,
+        "recipients": 0,
+        "by_reason": {},
+        "validation": {"recipients": new_report(), "events": new_report()},
+        "days": {day: {"total": 0, "generated": 0, "blocked": 0, "skipped": 0} for day in days}
+    }
+
+
+def _merge_stats(stats: Dict[str, Any], delta: Dict[str, Any]) -> None:
+    for key in ("total", "generated", "blocked", "skipped", "recipients"):
+        stats[key] += delta[key]
+    for reason, count in delta["by_reason"].items():
+        stats["by_reason"][reason] = stats["by_reason"].get(reason, 0) + count
+    for day, counts in delta["days"].items():
+        for key, value in counts.items():
+            stats["days"][day][key] += value
+    for kind, report in delta["validation"].items():
+        merge_reports(stats["validation"][kind], report)
+
+
+def _render_chunk(
+    planner: EligibilityPlanner,
+    chunk: List[Dict],
+    first_idx: int,
+    days: List[str],
+    renderer: FallbackRenderer,
+    ai_gen: Optional[GroqEmailGenerator] = None,
+    use_ai: bool = False,
+    concurrency: int = 1,
+    limiter: Optional["RateLimiter"] = None,
+    verbose: bool = True,
+    journal: Optional["RunJournal"] = None,
+    incremental: Optional["IncrementalState"] = None,
+    batch_size: int = 1,
+    slots: Optional[Dict[str, FrozenSet[int]]] = None
+) -> Tuple[Dict[str, List[Dict]], Dict[str, Any]]:
+    """
+    Decide and render one chunk of recipients for every day
+    
+    With a `journal`, generated results already recorded there are reused
+    and new ones are recorded as they complete. With `incremental`, results
+    of unchanged pairs are taken from the previous day files. With
+    batch_size > 1, AI content is requested for up to batch_size recipients
+    of the same event and day at once. With `slots` (day → event indices due,
+    see scheduler.py), each day only renders pairs of its due events, and
+    pairs skipped by the tag index are not counted.
+    Returns: (results per day in pair order, statistics for the chunk)
+    """
+    events = planner.events
+    stats = _new_stats(days)
+    outputs = {day: [] for day in days}
+    
+    # Decide every pair once; each day only re-renders content
+    # Validate once; invalid recipients never reach the pairing loop
+    kept = []
+    for offset, recipient in enumerate(chunk):
+        field_errors = validate_recipient_fields(recipient)
+        record_result(stats["validation"]["recipients"], field_errors)
+        if field_errors and planner.exclude_invalid:
+            continue
+        kept.append((first_idx + offset, recipient, [message for _, message in field_errors]))
+        if incremental is not None:
+            incremental.track(recipient)
+    
+    candidate_lists = planner.candidate_lists([recipient for _, recipient, _ in kept])
+    planned = []
+    for pos, (recipient_idx, recipient, errors) in enumerate(kept):
+        decisions, skipped = planner.decide_recipient(
+            recipient, recipient_idx, errors,
+            candidate_lists[pos] if candidate_lists is not None else None
+        )
+        stats["recipients"] += 1
+        planned.append((recipient, decisions))
+        
+        if slots is not None:
+            continue
+        n_skipped = sum(skipped.values())
+        for reason, count in skipped.items():
+            stats["by_reason"][reason] = stats["by_reason"].get(reason, 0) + count * len(days)
+        for key in ("total", "blocked", "skipped"):
+            stats[key] += n_skipped * len(days)
+            for day in days:
+                stats["days"][day][key] += n_skipped
+    
+    def scheduled(day: str, decisions: List[PairDecision]) -> Iterator[Tuple[int, PairDecision]]:
+        """(position, decision) of the pairs to render for a day"""
+        if slots is None:
+            return enumerate(decisions)
+        due = slots.get(day, frozenset())
+        return ((d_pos, decision) for d_pos, decision in enumerate(decisions) if decision.event_idx in due)
+    
+    def finish(day: str, recipient: Dict, decision: PairDecision, content: Optional[Dict] = None) -> Dict:
+        result = generate_email_for_pair(
+            recipient, events[decision.event_idx], day, ai_gen, use_ai, decision, content, renderer
+        )
+        if journal is not None and decision.approved:
+            journal.record(day, decision.recipient_idx, decision.event_idx, result)
+        return result
+    
+    def previous(day: str, recipient: Dict, decision: PairDecision) -> Optional[Dict]:
+        result = None
+        if journal is not None:
+            result = journal.get(day, decision.recipient_idx, decision.event_idx)
+        if result is None and incremental is not None:
+            result = incremental.reuse(day, recipient, events[decision.event_idx])
+        return result
+    
+    # Results carried over from the journal or the previous run
+    finished = {}
+    if journal is not None or incremental is not None:
+        for day in days:
+            for r_pos, (recipient, decisions) in enumerate(planned):
+                for d_pos, decision in scheduled(day, decisions):
+                    if decision.approved:
+                        result = previous(day, recipient, decision)
+                        if result is not None:
+                            finished[(day, r_pos, d_pos)] = result
+    
+    if use_ai and ai_gen and batch_size > 1:
+        # One request per up to batch_size recipients of the same event and
+        # day; items missing or invalid in the response fall through to the
+        # single-pair path below
+        groups: Dict[Tuple[str, int], List[List[Tuple[int, int]]]] = {}
+        for day in days:
+            for r_pos, (recipient, decisions) in enumerate(planned):
+                if recipient.get("recipient_id") is None:
+                    continue
+                for d_pos, decision in scheduled(day, decisions):
+                    if not decision.approved or (day, r_pos, d_pos) in finished:
+                        continue
+                    batches = groups.setdefault((day, decision.event_idx), [[]])
+                    batch = batches[-1]
+                    if len(batch) >= batch_size or any(
+                        planned[other][0]["recipient_id"] == recipient["recipient_id"] for other, _ in batch
+                    ):
+                        batch = []
+                        batches.append(batch)
+                    batch.append((r_pos, d_pos))
+        batch_keys = []
+        batch_jobs = []
+        for (day, e_idx), batches in groups.items():
+            for batch in batches:
+                batch_keys.append((day, batch))
+                batch_jobs.append(([planned[r_pos][0] for r_pos, _ in batch], events[e_idx], day))
+        
+        def on_batch(group_idx: int, contents: Dict[str, Dict]) -> None:
+            day, batch = batch_keys[group_idx]
+            for r_pos, d_pos in batch:
+                recipient, decisions = planned[r_pos]
+                content = contents.get(recipient["recipient_id"])
+                if content is not None:
+                    finished[(day, r_pos, d_pos)] = finish(day, recipient, decisions[d_pos], content)
+        
+        if batch_jobs:
+            n_items = sum(len(batch) for _, batch in batch_keys)
+            if verbose:
+                print(f"   📦 {n_items} emails in {len(batch_jobs)} batched AI requests (up to {batch_size} each)")
+            import asyncio
+            from async_generation import generate_batched_contents
+            asyncio.run(generate_batched_contents(ai_gen, batch_jobs, concurrency, limiter, on_batch))
+            n_fallback = sum(
+                1 for day, batch in batch_keys for r_pos, d_pos in batch if (day, r_pos, d_pos) not in finished
+            )
+            if n_fallback and verbose:
+                print(f"   ↩️  {n_fallback} batched items invalid or missing; retrying individually")
+    
+    if use_ai and ai_gen and concurrency > 1:
+        keys = [
+            (day, r_pos, d_pos)
+            for day in days
+            for r_pos, (_, decisions) in enumerate(planned)
+            for d_pos, decision in scheduled(day, decisions)
+            if decision.approved and (day, r_pos, d_pos) not in finished
+        ]
+        jobs = [
+            (planned[r_pos][0], events[planned[r_pos][1][d_pos].event_idx], day)
+            for day, r_pos, d_pos in keys
+        ]
+        
+        def on_result(job_idx: int, content: Dict) -> None:
+            day, r_pos, d_pos = keys[job_idx]
+            recipient, decisions = planned[r_pos]
+            finished[keys[job_idx]] = finish(day, recipient, decisions[d_pos], content)
+        
+        if jobs:
+            if verbose:
+                print(f"   ⚡ {len(jobs)} AI requests, concurrency {concurrency}")
+            import asyncio
+            from async_generation import generate_contents
+            asyncio.run(generate_contents(ai_gen, jobs, concurrency, limiter, on_result))
+    
+    for day in days:
+        day_stats = stats["days"][day]
+        for r_pos, (recipient, decisions) in enumerate(planned):
+            for d_pos, decision in scheduled(day, decisions):
+                event = events[decision.event_idx]
+                result = finished.get((day, r_pos, d_pos))
+                if result is None:
+                    result = finish(day, recipient, decision)
+                
+                # Update stats
+                status = result["meta"]["status"]
+                stats["total"] += 1
+                day_stats["total"] += 1
+                if status == "generated":
+                    stats["generated"] += 1
+                    day_stats["generated"] += 1
+                    if verbose:
+                        print(f"   ✅ [Day {day}] {recipient.get('name')} → {event.get('title')}")
+                else:
+                    stats["blocked"] += 1
+                    day_stats["blocked"] += 1
+                    reason = result["meta"]["reason"]
+                    stats["by_reason"][reason] = stats["by_reason"].get(reason, 0) + 1
+                    if verbose:
+                        print(f"   ⛔ [Day {day}] {recipient.get('name')} → {event.get('title')} ({reason})")
+                
+                outputs[day].append(result)
+    
+    # Recipient fields are only reused within a chunk; events stay cached for the run
+    renderer.clear_recipients()
+    if ai_gen is not None:
+        ai_gen.renderer.clear_recipients()
+    return outputs, stats
+
+
+# =============================
+# Worker Processes (--workers)
+# =============================
+# Per-process state: events, planner and renderer are built once by the
+# pool initializer instead of being pickled with every task
+_worker_state: Dict[str, Any] = {}
+
+
+def _init_worker(
+    events_file: str,
+    skip_unmatched: bool,
+    now: datetime,
+    exclude_invalid: bool,
+    matcher: str
+) -> None:
+    events = list(iter_records(events_file))
+    _worker_state["planner"] = EligibilityPlanner(events, skip_unmatched, now, exclude_invalid, matcher)
+    _worker_state["renderer"] = FallbackRenderer()
+
+
+def _render_chunk_in_worker(
+    chunk: List[Dict],
+    first_idx: int,
+    days: List[str],
+    slots: Optional[Dict[str, FrozenSet[int]]] = None
+):
+    return _render_chunk(
+        _worker_state["planner"], chunk, first_idx, days, _worker_state["renderer"], verbose=False,
+        slots=slots
+    )
+
+
 def generate_batch(
     recipients_file: str = None,
     events_file: str = None,
     days: List[str] = ["1"],
     output_dir: str = None,
-    use_ai: bool = True
+    use_ai: bool = True,
+    skip_unmatched: bool = True,
+    concurrency: int = None,
+    ai_generator: Optional[GroqEmailGenerator] = None,
+    use_cache: bool = True,
+    output_format: str = None,
+    workers: int = None,
+    collect_results: bool = False,
+    clock: Callable[[], datetime] = utc_now,
+    exclude_invalid: bool = True,
+    matcher: Optional[str] = None,
+    checkpoint: Optional[bool] = None,
+    resume: Optional[str] = None,
+    incremental: bool = False,
+    batch_size: Optional[int] = None,
+    slots: Optional[Dict[str, Iterable[str]]] = None,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    store_results: Optional[bool] = None,
+    verbose: bool = True
 ) -> Dict[str, Any]:
     """
     Generate emails for all recipient-event pairs across specified days
+
+    Recipients are streamed (JSON array or JSON Lines, see ingest.py) in
+    chunks of Config.CHUNK_SIZE; each chunk is decided once per pair (see
+    EligibilityPlanner) and rendered for every day, so generation starts
+    before the whole file is read. Pairs skipped by the tag index are counted
+    in the statistics but not written out. With concurrency > 1, AI content
+    for a chunk is generated on a rate-limited worker pool and written in
+    pair order. AI responses are cached on disk (Config.CACHE_PATH) unless
+    use_cache=False. output_format="jsonl" streams each result to disk;
+    "archive" also writes an offset index for random access (archive.py).
+    With workers > 1 (deterministic mode only), chunks are decided and
+    rendered in a process pool and merged into the day files in order.
+    collect_results=True also returns every result in stats["results"][day]
+    so callers don't have to re-read the day files.
+    Deadlines are compared with one `clock()` snapshot taken at start (shared
+    by all workers); inject a fixed clock for reproducible runs.
+    Each recipient and event is validated once; with exclude_invalid, bad
+    records are dropped before pairing and reported in stats["validation"].
+    matcher="numpy" selects candidate pairs with the vectorized overlap matrix
+    (falls back to the tag index when NumPy is missing).
+    With checkpoint (default: AI runs), generated results are journaled under
+    Config.RUNS_DIR/<run_id>; resume=<run_id> re-runs with that run's inputs,
+    options and clock snapshot, reusing every journaled result.
+    With incremental, emails whose recipient and event are unchanged since the
+    previous run (per output_dir/manifest.json, see manifest.py) are carried
+    over instead of regenerated.
+    batch_size > 1 (default Config.BATCH_SIZE) sends one AI request per group
+    of recipients sharing an event and day, so the system prompt is paid once
+    per group; invalid items are regenerated one by one.
+    slots (day → event ids, see generate_due()) replaces `days`: each day only
+    renders pairs of the events due on it.
+    progress(stats) is called after each chunk is written (e.g. to report
+    batch progress from the serve daemon).
+    Results are also stored in <output_dir>/results.sqlite3 (see
+    results_store.py) unless store_results=False (default Config.STORE_RESULTS).
+    verbose=False drops the per-pair progress lines.
     """
     
+    # Journal, manifest, cache and store are imported only by the runs that use them
+    from run_journal import RunJournal, input_fingerprint, new_run_id
+
+    journal = None
+    if resume:
+        journal = RunJournal.open(Config.RUNS_DIR, resume, Config.JOURNAL_FLUSH_EVERY)
+        params = journal.header["params"]
+        if input_fingerprint([params["recipients_file"], params["events_file"]]) != params["inputs"]:
+            journal.close()
+            raise ValueError(f"Inputs of run {resume} changed since it started; cannot resume")
+        recipients_file, events_file = params["recipients_file"], params["events_file"]
+        days, output_dir, output_format = params["days"], params["output_dir"], params["output_format"]
+        use_ai, skip_unmatched = params["use_ai"], params["skip_unmatched"]
+        exclude_invalid, matcher = params["exclude_invalid"], params["matcher"]
+        slots = params.get("slots")
+        clock = lambda: datetime.fromisoformat(params["now"])
+        print(f"\n📒 Resuming run {resume}: {journal.resumed} results already generated")
+    
+    concurrency = concurrency or Config.CONCURRENCY
+    batch_size = batch_size or Config.BATCH_SIZE
+    output_format = output_format or Config.OUTPUT_FORMAT
     recipients_file = recipients_file or Config.RECIPIENTS_FILE
     events_file = events_file or Config.EVENTS_FILE
     output_dir = output_dir or Config.OUTPUT_DIR
+    workers = workers or Config.WORKERS
+    matcher = matcher or Config.MATCHER
+    if slots is not None:
+        slots = {day: sorted(event_ids) for day, event_ids in slots.items()}
+        days = list(slots)
+        if incremental:
+            raise ValueError("Incremental runs need whole day files; they cannot be limited to due slots")
+    if matcher not in MATCHERS:
+        raise ValueError(f"Unknown matcher: {matcher} (expected one of {', '.join(MATCHERS)})")
+    if matcher == "numpy" and not HAS_NUMPY:
+        print("⚠️  numpy is not installed; using the tag index matcher")
+        matcher = "index"
+    now = clock()
     
-    # Load data
+    # Load events; recipients are streamed below
     print(f"\n📂 Loading data...")
-    with open(recipients_file, 'r', encoding='utf-8') as f:
-        recipients = json.load(f)
-    with open(events_file, 'r', encoding='utf-8') as f:
-        events = json.load(f)
-    
-    print(f"   ✅ {len(recipients)} recipients")
+    events = list(iter_records(events_file))
     print(f"   ✅ {len(events)} events")
+    print(f"   📥 Streaming recipients from {recipients_file}")
     
     # Initialize AI generator if needed
-    ai_gen = None
-    if use_ai:
+    ai_gen = ai_generator
+    if use_ai and ai_gen is None:
         try:
             ai_gen = GroqEmailGenerator()
         except ValueError as e:
@@ -566,82 +1213,405 @@ def generate_batch(
             print("   Falling back to deterministic generation")
             use_ai = False
     
-    # Statistics
-    stats = {
-        "total": 0,
-        "generated": 0,
-        "blocked": 0,
-        "by_reason": {}
-    }
+    if use_ai and workers > 1:
+        print("⚠️  --workers applies to deterministic runs; use --concurrency for AI generation")
+        workers = 1
     
-    # Generate for each day
-    for day in days:
-        print(f"\n📧 Generating Day {day} emails...")
-        day_outputs = []
+    if checkpoint is None:
+        checkpoint = use_ai
+    if checkpoint and journal is None:
+        journal = RunJournal.create(Config.RUNS_DIR, new_run_id(), {
+            "recipients_file": recipients_file,
+            "events_file": events_file,
+            "inputs": input_fingerprint([recipients_file, events_file]),
+            "days": list(days),
+            "output_dir": output_dir,
+            "output_format": output_format,
+            "use_ai": use_ai,
+            "skip_unmatched": skip_unmatched,
+            "exclude_invalid": exclude_invalid,
+            "matcher": matcher,
+            "slots": slots,
+            "now": now.isoformat()
+        }, Config.JOURNAL_FLUSH_EVERY)
+        print(f"   📒 Run journal: {journal.run_dir} (resume with --resume {journal.run_id})")
+    if (journal is not None or incremental) and workers > 1:
+        print("⚠️  --workers is not used for journaled or incremental runs")
+        workers = 1
+    
+    state = None
+    if incremental:
+        from manifest import IncrementalState
+        state = IncrementalState(output_dir, days, {
+            "use_ai": use_ai,
+            "model": ai_gen.model if use_ai and ai_gen else None
+        }, output_format)
+        state.track_events(events)
+        if state.reason:
+            print(f"   ♻️  Incremental: full regeneration ({state.reason})")
+    else:
+        # The day files are about to change without the manifest tracking them
+        from manifest import remove_manifest
+        remove_manifest(output_dir)
+    
+    if use_ai and ai_gen:
+        ai_gen.metrics.reset()
+        ai_gen.resilience.reset()
+    
+    cache = None
+    if use_ai and ai_gen and use_cache and ai_gen.cache is None:
+        from response_cache import ResponseCache
+        cache = ai_gen.cache = ResponseCache(
+            Config.CACHE_PATH, Config.CACHE_MAX_ENTRIES, Config.CACHE_MAX_AGE_DAYS
+        )
+    
+    # Events are validated once here (and once per worker process)
+    planner = EligibilityPlanner(events, skip_unmatched, now, exclude_invalid, matcher)
+    stats = _new_stats(days)
+    stats["validation"]["events"] = planner.events_report
+    slot_idxs = None
+    if slots is not None:
+        slot_idxs = {}
+        for day, event_ids in slots.items():
+            due = set(event_ids)
+            slot_idxs[day] = frozenset(
+                e_idx for e_idx, event in enumerate(planner.events) if event.get("event_id") in due
+            )
+    if collect_results:
+        stats["results"] = {day: [] for day in days}
+    
+    # One open writer per day; every chunk appends to all of them
+    print(f"\n📧 Generating Day {', '.join(days)} emails...")
+    started_at = datetime.now(IST).isoformat()
+    writers: Dict[str, DayWriter] = {}
+    store = None
+    try:
+        for day in days:
+            writers[day] = open_day_writer(output_format, output_dir, day, started_at)
+        if Config.STORE_RESULTS if store_results is None else store_results:
+            from results_store import STORE_FILENAME, ResultsStore
+            store_run_id = journal.run_id if journal is not None else new_run_id()
+            store = ResultsStore(os.path.join(output_dir, STORE_FILENAME))
+            store.begin_run(store_run_id)
         
-        for recipient in recipients:
-            for event in events:
-                stats["total"] += 1
-                
-                result = generate_email_for_pair(recipient, event, day, ai_gen, use_ai)
-                
-                # Update stats
-                status = result["meta"]["status"]
-                if status == "generated":
-                    stats["generated"] += 1
-                    print(f"   ✅ {recipient.get('name')} → {event.get('title')}")
-                else:
-                    stats["blocked"] += 1
-                    reason = result["meta"]["reason"]
-                    stats["by_reason"][reason] = stats["by_reason"].get(reason, 0) + 1
-                    print(f"   ⛔ {recipient.get('name')} → {event.get('title')} ({reason})")
-                
-                day_outputs.append(result)
+        def write_chunk(outputs: Dict[str, List[Dict]], delta: Dict[str, Any]) -> None:
+            for day in days:
+                for result in outputs[day]:
+                    writers[day].write(result)
+                if collect_results:
+                    stats["results"][day].extend(outputs[day])
+            if store is not None:
+                store.add(store_run_id, outputs)
+            _merge_stats(stats, delta)
+            if progress is not None:
+                progress(stats)
         
-        # Save day's output
-        os.makedirs(output_dir, exist_ok=True)
-        output_file = os.path.join(output_dir, f"day_{day}_emails.json")
+        chunks = _chunked(iter_records(recipients_file), Config.CHUNK_SIZE)
         
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump({
-                "day": day,
-                "generated_at": datetime.now(IST).isoformat(),
-                "statistics": {
-                    "total": len(day_outputs),
-                    "generated": sum(1 for e in day_outputs if e["meta"]["status"] == "generated"),
-                    "blocked": sum(1 for e in day_outputs if e["meta"]["status"] == "blocked")
-                },
-                "emails": day_outputs
-            }, f, indent=2, ensure_ascii=False)
+        if workers > 1:
+            # Shards run out of process; results are merged strictly in chunk
+            # order, with at most 2 × workers shards in flight
+            print(f"   🧵 {workers} worker processes, {Config.CHUNK_SIZE} recipients per shard")
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(events_file, skip_unmatched, now, exclude_invalid, matcher)
+            ) as pool:
+                pending = deque()
+                first_idx = 0
+                for shard_no, chunk in enumerate(chunks):
+                    pending.append((shard_no, pool.submit(_render_chunk_in_worker, chunk, first_idx, days, slot_idxs)))
+                    first_idx += len(chunk)
+                    if len(pending) >= 2 * workers:
+                        done_no, future = pending.popleft()
+                        write_chunk(*future.result())
+                        print(f"   ✅ Shard {done_no} merged ({stats['recipients']} recipients)")
+                while pending:
+                    done_no, future = pending.popleft()
+                    write_chunk(*future.result())
+                    print(f"   ✅ Shard {done_no} merged ({stats['recipients']} recipients)")
+        else:
+            renderer = FallbackRenderer()
+            limiter = None
+            if use_ai and concurrency > 1:
+                from async_generation import RateLimiter
+                limiter = RateLimiter(Config.GROQ_RPM, Config.GROQ_TPM)
+            first_idx = 0
+            for chunk in chunks:
+                write_chunk(*_render_chunk(
+                    planner, chunk, first_idx, days, renderer, ai_gen, use_ai, concurrency, limiter,
+                    verbose=verbose, journal=journal, incremental=state, batch_size=batch_size,
+                    slots=slot_idxs
+                ))
+                first_idx += len(chunk)
         
-        print(f"   💾 Saved to: {output_file}")
+        # Finish day outputs
+        finished_at = datetime.now(IST).isoformat()
+        for day in days:
+            output_file = writers[day].close(stats["days"][day], finished_at)
+            print(f"   💾 Saved to: {output_file}")
+        if store is not None:
+            store.finish_run(store_run_id, days, finished_at)
+            store.close()
+            print(f"   🗄️  Results store: {store.path}")
+        if state is not None:
+            stats["incremental"] = state.finish()
+        # Last: nothing can fail after the journal is marked completed
+        if journal is not None:
+            journal.close(completed=True)
+            stats["run_id"] = journal.run_id
+    except BaseException:
+        # Release every output without marking it complete
+        for writer in writers.values():
+            writer.abort()
+        if store is not None:
+            store.abort_run(store_run_id)
+            store.close()
+        if state is not None:
+            state.abort()
+        if cache is not None:
+            cache.close()
+            ai_gen.cache = None
+        # Keep everything generated so far for --resume
+        if journal is not None:
+            journal.close(completed=False)
+            print(f"\n📒 Progress saved; resume with --resume {journal.run_id}")
+        raise
+    
+    if use_ai and ai_gen and ai_gen.cache is not None:
+        stats["cache"] = ai_gen.cache.stats()
+        if cache is not None:
+            cache.close()
+            ai_gen.cache = None
+    if use_ai and ai_gen:
+        stats["llm"] = ai_gen.metrics.summary()
+        stats["resilience"] = ai_gen.resilience.summary()
+        metrics_file = Config.LLM_METRICS_FILE or os.path.join(output_dir, "llm_metrics.json")
+        ai_gen.metrics.write(metrics_file, {
+            "run_id": stats.get("run_id"),
+            "started_at": started_at,
+            "finished_at": finished_at,
+            "resilience": stats["resilience"]
+        })
     
     # Final summary
     print(f"\n📊 SUMMARY")
+    print(f"   Recipients: {stats['recipients']}")
     print(f"   Total pairs: {stats['total']}")
     print(f"   Generated: {stats['generated']}")
     print(f"   Blocked: {stats['blocked']}")
+    if stats['skipped']:
+        print(f"   Skipped by tag index: {stats['skipped']}")
+    for kind, report in stats["validation"].items():
+        if report["invalid"]:
+            action = "excluded" if exclude_invalid else "invalid"
+            fields = ", ".join(f"{field}: {count}" for field, count in report["fields"].items())
+            print(f"   Invalid {kind} ({action}): {report['invalid']}/{report['checked']} ({fields})")
     if stats['by_reason']:
         print(f"   Block reasons:")
         for reason, count in stats['by_reason'].items():
             print(f"      • {reason}: {count}")
+    if "incremental" in stats:
+        inc = stats["incremental"]
+        print(f"   Incremental: {inc['reused']} reused, {inc['regenerated']} regenerated "
+              f"({inc['changed_recipients']} recipients / {inc['changed_events']} events changed, "
+              f"{inc['removed_recipients']} / {inc['removed_events']} removed)")
+    if "cache" in stats:
+        print(f"   Cache: {stats['cache']['hits']} hits, {stats['cache']['misses']} misses, "
+              f"{stats['cache']['evictions']} evicted")
+    if "llm" in stats:
+        llm = stats["llm"]
+        latency = llm["latency_ms"]
+        print(f"   LLM: {llm['requests']} requests ({llm['errors']} failed), {llm['cached']} cached, "
+              f"{sum(llm['fallbacks'].values())} fallbacks, {llm['retries']} retries")
+        responses = llm["responses"]
+        if any(responses.values()):
+            print(f"   LLM responses: {responses['valid']} valid, {responses['repaired']} repaired, "
+                  f"{responses['rejected']} rejected")
+        if llm["requests"]:
+            cost = "n/a" if llm["cost_usd"] is None else f"${llm['cost_usd']:.4f}"
+            per_email = llm["tokens_per_email"]["mean"]
+            print(f"   LLM latency p50/p95/p99: {latency['p50']:.0f}/{latency['p95']:.0f}/{latency['p99']:.0f} ms, "
+                  f"{'n/a' if per_email is None else per_email} tokens/email, est. cost {cost}")
+    if "resilience" in stats:
+        res = stats["resilience"]
+        if res["retries"] or res["failed"] or res["short_circuited"]:
+            failures = ", ".join(f"{kind}: {count}" for kind, count in res["failures_by_class"].items())
+            print(f"   Resilience: {res['retries']} retries, {res['recovered']} recovered, "
+                  f"{res['failed']} failed ({failures or 'none'}), {res['short_circuited']} short-circuited"
+                  f"{', breaker OPEN' if res['breaker_open'] else ''}")
     
     return stats
 
 
+def generate_due(
+    window_start: Optional[datetime] = None,
+    window: timedelta = timedelta(hours=1),
+    events_file: str = None,
+    output_dir: str = None,
+    clock: Callable[[], datetime] = utc_now,
+    **kwargs
+) -> Dict[str, Any]:
+    """
+    Generate only the (event, day) slots whose send time falls in a window
+    
+    Send times come from each event's start_date (see scheduler.py). Without
+    an explicit window_start, the window runs from the end of the last
+    processed window for this events file (or clock() on the first run) up
+    to clock() + window, so delayed runs catch up; otherwise it is
+    [window_start, window_start + window). Slots already covered by an
+    earlier window are skipped, and the window end is recorded in
+    Config.RUNS_DIR/schedule.json once generation succeeds. Output goes to
+    <output_dir>/due_<window start, IST> so every window keeps its own day
+    files and results store; `brain.py query` reads those stores too. Other
+    kwargs are passed to generate_batch().
+    """
+    events_file = events_file or Config.EVENTS_FILE
+    state_path = os.path.join(Config.RUNS_DIR, SCHEDULE_STATE)
+    processed_until = load_window_end(state_path, events_file)
+    if window_start is None:
+        now = clock()
+        window_start = processed_until or now
+        window_end = max(window_start, now) + window
+    else:
+        if window_start.tzinfo is None:
+            window_start = window_start.replace(tzinfo=IST)
+        window_end = window_start + window
+    
+    scheduler = SendScheduler(list(iter_records(events_file)))
+    slots = scheduler.pop_due(window_start, window_end, processed_until)
+    print(f"\n🗓️  Send window {window_start.astimezone(IST):%Y-%m-%d %H:%M} → "
+          f"{window_end.astimezone(IST):%Y-%m-%d %H:%M} IST: {len(slots)} slots due")
+    if scheduler.late:
+        print(f"   {scheduler.late} slots past their send time are sent late (event not started yet)")
+    if scheduler.expired:
+        print(f"⚠️  {scheduler.expired} slots expired unsent (event already started)")
+    for event_id, error in scheduler.unschedulable:
+        print(f"⚠️  Event {event_id} has no usable start_date ({error}); not scheduled")
+    schedule = {
+        "window_start": window_start.isoformat(),
+        "window_end": window_end.isoformat(),
+        "slots": [
+            {"event_id": slot.event_id, "day": slot.day, "send_at": slot.send_at.isoformat()}
+            for slot in slots
+        ],
+        "unschedulable": len(scheduler.unschedulable),
+        "late": scheduler.late,
+        "expired": scheduler.expired
+    }
+    by_day = slots_by_day(slots)
+    if not by_day:
+        nxt = scheduler.peek()
+        if nxt is not None:
+            print(f"   Next send: Day {nxt.day} of {nxt.event_id} at {nxt.send_at:%Y-%m-%d %H:%M} IST")
+        save_window_end(state_path, events_file, window_end)
+        stats = _new_stats([])
+        stats["schedule"] = schedule
+        return stats
+    for day, event_ids in by_day.items():
+        print(f"   • Day {day}: {', '.join(sorted(event_ids))}")
+    
+    output_dir = os.path.join(
+        output_dir or Config.OUTPUT_DIR, f"due_{window_start.astimezone(IST):%Y%m%d_%H%M}"
+    )
+    stats = generate_batch(
+        events_file=events_file, output_dir=output_dir, clock=clock, slots=by_day, **kwargs
+    )
+    save_window_end(state_path, events_file, window_end)
+    stats["schedule"] = schedule
+    return stats
+
+
 # =============================
 # CLI Interface
 # =============================
+def query_results(args: argparse.Namespace) -> int:
+    """`brain.py query`: look up stored results, or per-day counts without filters"""
+    from results_store import STORE_FILENAME, ResultsStore, find_stores
+
+    paths = [args.db] if args.db else find_stores(Config.OUTPUT_DIR)
+    if not paths or not os.path.exists(paths[0]):
+        print(f"❌ No results store at {args.db or os.path.join(Config.OUTPUT_DIR, STORE_FILENAME)} "
+              f"(run a generation first)")
+        return 1
+    filtered = any((args.recipient, args.event, args.day, args.status))
+    counts: Dict[str, Dict[str, int]] = {}
+    results: List[Dict] = []
+    for path in paths:
+        store = ResultsStore(path)
+        try:
+            if not filtered:
+                for day, by_status in store.counts().items():
+                    day_counts = counts.setdefault(day, {})
+                    for status, n in by_status.items():
+                        day_counts[status] = day_counts.get(status, 0) + n
+            else:
+                results.extend(store.query(args.recipient, args.event, args.day, args.status, args.limit))
+        finally:
+            store.close()
+    if not filtered:
+        for day, by_status in sorted(counts.items()):
+            print(f"   Day {day}: " + ", ".join(f"{n} {status}" for status, n in sorted(by_status.items())))
+        return 0
+    # Each store is ordered by day already; keep that across stores
+    results.sort(key=lambda result: result["meta"]["day"])
+    results = results[:args.limit]
+    for result in results:
+        if args.json:
+            print(json.dumps(result, ensure_ascii=False))
+            continue
+        meta = result["meta"]
+        detail = (result.get("email") or {}).get("subject") or meta.get("reason", "")
+        print(f"   Day {meta['day']:<3} {meta['recipient_id']} → {meta['event_id']}  [{meta['status']}]  {detail}")
+    if not args.json:
+        print(f"   {len(results)} result(s)")
+    return 0
+
+
 def main():
     parser = argparse.ArgumentParser(description="Generate grant emails using Groq AI")
+    parser.add_argument("command", nargs="?", choices=["generate", "serve", "query"], default="generate",
+                        help="generate (default), serve (long-running daemon, see server.py) or query (results store)")
     parser.add_argument("--day", type=str, help="Generate specific day (0, 1, 3, 5, 6, 7a, 7b)")
     parser.add_argument("--all", action="store_true", help="Generate all 7 days")
     parser.add_argument("--no-ai", action="store_true", help="Use deterministic fallback (no API)")
-    parser.add_argument("--recipients", type=str, help="Path to recipients.json")
+    parser.add_argument("--recipients", type=str, help="Path to recipients (.json array or .jsonl/.ndjson)")
     parser.add_argument("--events", type=str, help="Path to grant_events.json")
+    parser.add_argument("--concurrency", type=int, help="Parallel AI requests (rate-limited by GROQ_RPM/GROQ_TPM)")
+    parser.add_argument("--workers", type=int, help="Worker processes for deterministic (--no-ai) runs")
+    parser.add_argument("--batch-size", type=int, help="Recipients per AI request for the same event/day (default 1)")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the on-disk AI response cache")
+    parser.add_argument("--format", choices=FORMATS, help="Day file format: json (default), jsonl (streaming) or archive (jsonl + random-access index)")
+    parser.add_argument("--keep-invalid", action="store_true", help="Pair invalid records too (reported as validation_failed)")
+    parser.add_argument("--matcher", choices=MATCHERS, help="Candidate pair selection: index (default) or numpy")
+    parser.add_argument("--resume", type=str, metavar="RUN_ID", help="Resume a journaled run, skipping completed pairs")
+    parser.add_argument("--checkpoint", action="store_true", help="Journal deterministic runs too (AI runs always are)")
+    parser.add_argument("--incremental", action="store_true", help="Only regenerate emails whose recipient/event changed")
+    parser.add_argument("--no-store", action="store_true", help="Skip the SQLite results store (day files only)")
+    parser.add_argument("--full-matrix", action="store_true", help="Evaluate every recipient-event pair (no tag index)")
+    parser.add_argument("--due", action="store_true", help="Only generate emails whose send time (from start_date) is in the window")
+    parser.add_argument("--window", type=float, default=1.0, help="--due window length in hours (default 1)")
+    parser.add_argument("--window-start", type=str, help="--due window start, ISO 8601 (default: end of the last window, or now; naive = IST)")
+    parser.add_argument("--host", type=str, help="serve: bind address (default SERVE_HOST, 127.0.0.1)")
+    parser.add_argument("--port", type=int, help="serve: port (default SERVE_PORT, 8765)")
+    parser.add_argument("--socket", type=str, help="serve: listen on this Unix socket instead of TCP")
+    parser.add_argument("--recipient", type=str, help="query: recipient_id")
+    parser.add_argument("--event", type=str, help="query: event_id")
+    parser.add_argument("--status", type=str, help="query: generated or blocked")
+    parser.add_argument("--limit", type=int, help="query: at most this many results")
+    parser.add_argument("--db", type=str, help="query: results store (default <OUTPUT_DIR>/results.sqlite3 plus every due_*/ window's)")
+    parser.add_argument("--json", action="store_true", help="query: print full results as JSON Lines")
     
     args = parser.parse_args()
     
+    if args.command == "serve":
+        from server import serve
+        serve(args.host, args.port, args.socket, events_file=args.events, use_ai=not args.no_ai)
+        return 0
+    if args.command == "query":
+        return query_results(args)
+    
     # Determine which days to generate
     if args.all:
         days = ["0", "1", "3", "5", "6", "7a", "7b"]
@@ -652,12 +1622,31 @@ def main():
     
     # Run generation
     try:
-        generate_batch(
+        options = dict(
             recipients_file=args.recipients,
             events_file=args.events,
-            days=days,
-            use_ai=not args.no_ai
+            use_ai=not args.no_ai,
+            skip_unmatched=not args.full_matrix,
+            concurrency=args.concurrency,
+            use_cache=not args.no_cache,
+            output_format=args.format,
+            workers=args.workers,
+            exclude_invalid=not args.keep_invalid,
+            matcher=args.matcher,
+            checkpoint=True if args.checkpoint else None,
+            resume=args.resume,
+            incremental=args.incremental,
+            batch_size=args.batch_size,
+            store_results=False if args.no_store else None
         )
+        if args.due and not args.resume:
+            generate_due(
+                window_start=parse_start(args.window_start) if args.window_start else None,
+                window=timedelta(hours=args.window),
+                **options
+            )
+        else:
+            generate_batch(days=days, **options)
         print("\n✅ Generation complete!")
     except Exception as e:
         print(f"\n❌ Error: {e}")
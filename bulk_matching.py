@@ -0,0 +1,118 @@
+"""
+bulk_matching.py - Vectorized Topic-Overlap Matrix (NumPy)
+
+Computes the overlap count of every (recipient, event) pair at once:
+recipients and events are encoded as topic-incidence matrices over the
+interned topic vocabulary (see records.py) and multiplied, a chunk of
+recipients at a time so memory stays bounded.
+
+Counts equal len(topic_overlap(...)) for each pair (a recipient topic
+listed twice counts twice, as it does there). Buckets follow
+VALIDATION_RULES["topic_match_threshold"]: high, medium, none.
+
+NumPy is optional; check `HAS_NUMPY` before constructing a BulkMatcher.
+It is imported by the first BulkMatcher, not with this module.
+
+Usage:
+    matcher = BulkMatcher(events)
+    for first_idx, counts in matcher.iter_overlap_chunks(recipients):
+        buckets = matcher.bucketize(counts)     # codes into BUCKETS
+    totals = matcher.bucket_totals(recipients)  # {"high": n, "medium": n, "none": n}
+"""
+
+import importlib.util
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from records import TopicVocabulary
+from validation import VALIDATION_RULES
+
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+np = None  # Set by _load_numpy()
+
+MATCHERS = ("index", "numpy")         # generate_batch candidate pair selection
+BUCKETS = ("none", "medium", "high")  # bucket code → name
+MAX_CELLS = 4_000_000                 # overlap-matrix cells per chunk (~16 MB as float32)
+
+
+def _load_numpy() -> None:
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+
+
+class BulkMatcher:
+    """Event topic-incidence matrix plus chunked recipient × event overlap counts"""
+
+    def __init__(self, events: Sequence[Dict], max_cells: int = MAX_CELLS):
+        if not HAS_NUMPY:
+            raise ImportError("numpy is required for bulk matching (pip install numpy)")
+        _load_numpy()
+        thresholds = VALIDATION_RULES["topic_match_threshold"]
+        self.high = thresholds["high"]
+        self.medium = thresholds["medium"]
+        self.n_events = len(events)
+        self.rows_per_chunk = max(1, max_cells // max(1, self.n_events))
+
+        self.vocab = TopicVocabulary()
+        tag_ids = []
+        for event in events:
+            tags = event.get("tags", [])
+            if not isinstance(tags, list):
+                tag_ids.append(())
+                continue
+            tag_ids.append({self.vocab.topic_id(t) for t in tags if isinstance(t, str)})
+
+        # topics × events, 0/1; float32 so the product runs through BLAS
+        self.event_matrix = np.zeros((max(1, len(self.vocab)), self.n_events), dtype=np.float32)
+        for idx, ids in enumerate(tag_ids):
+            for topic_id in ids:
+                self.event_matrix[topic_id, idx] = 1.0
+
+    def incidence(self, recipients: Sequence[Dict]) -> "np.ndarray":
+        """recipients × topics occurrence counts (topics no event carries are dropped)"""
+        matrix = np.zeros((len(recipients), self.event_matrix.shape[0]), dtype=np.float32)
+        for row, recipient in enumerate(recipients):
+            topics = recipient.get("topics", [])
+            if not isinstance(topics, list):
+                continue
+            for topic in topics:
+                topic_id = self.vocab.topic_id(topic, grow=False)
+                if topic_id is not None:
+                    matrix[row, topic_id] += 1.0
+        return matrix
+
+    def overlap_counts(self, recipients: Sequence[Dict]) -> "np.ndarray":
+        """recipients × events overlap counts (int32) for one chunk"""
+        return (self.incidence(recipients) @ self.event_matrix).astype(np.int32)
+
+    def iter_overlap_chunks(self, recipients: Iterable[Dict]) -> Iterator[Tuple[int, "np.ndarray"]]:
+        """Yield (first recipient index, counts) over `rows_per_chunk` recipients at a time"""
+        chunk: List[Dict] = []
+        first_idx = 0
+        for recipient in recipients:
+            chunk.append(recipient)
+            if len(chunk) >= self.rows_per_chunk:
+                yield first_idx, self.overlap_counts(chunk)
+                first_idx += len(chunk)
+                chunk = []
+        if chunk:
+            yield first_idx, self.overlap_counts(chunk)
+
+    def bucketize(self, counts: "np.ndarray") -> "np.ndarray":
+        """Bucket code per pair: 0 = none, 1 = medium, 2 = high (see BUCKETS)"""
+        codes = (counts >= self.medium).astype(np.int8)
+        codes[counts >= self.high] = 2
+        return codes
+
+    def eligible(self, counts: "np.ndarray") -> List[List[int]]:
+        """Per recipient row, the event indices meeting the medium threshold"""
+        mask = counts >= self.medium
+        return [np.flatnonzero(row).tolist() for row in mask]
+
+    def bucket_totals(self, recipients: Iterable[Dict]) -> Dict[str, int]:
+        """Number of pairs in each bucket across all recipients"""
+        totals = np.zeros(len(BUCKETS), dtype=np.int64)
+        for _, counts in self.iter_overlap_chunks(recipients):
+            totals += np.bincount(self.bucketize(counts).ravel(), minlength=len(BUCKETS))
+        return {name: int(totals[code]) for code, name in enumerate(BUCKETS)}
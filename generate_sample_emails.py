@@ -9,27 +9,12 @@ This script:
 5. Generates a summary report
 """
 
-import sys
-import types
 import os
 import json
 from datetime import datetime
 
-# Inject a dummy 'groq' module to avoid import errors
-mod = types.ModuleType("groq")
-class Groq:
-    def __init__(self, api_key=None, *a, **k):
-        self.api_key = api_key
-        class Chat:
-            class completions:
-                @staticmethod
-                def create(*a, **k):
-                    raise RuntimeError("Dummy Groq client called in offline mode")
-        self.chat = Chat()
-mod.Groq = Groq
-sys.modules["groq"] = mod
-
 import brain
+from results_store import STORE_FILENAME, ResultsStore
 
 # =============================
 # Configuration
@@ -104,17 +89,26 @@ def save_email_as_json(day, email_data):
     
     return filepath
 
+def load_name_index():
+    """Load recipients and events once, indexed by ID"""
+    with open(brain.Config.RECIPIENTS_FILE, 'r', encoding='utf-8') as f:
+        recipients = {r.get("recipient_id"): r for r in json.load(f)}
+    with open(brain.Config.EVENTS_FILE, 'r', encoding='utf-8') as f:
+        events = {e.get("event_id"): e for e in json.load(f)}
+    return recipients, events
+
 def generate_all_emails():
     """Generate emails for all days"""
     print("\n" + "="*80)
     print("🚀 GENERATING SAMPLE EMAILS FOR ALL DAYS")
     print("="*80)
     
-    # Generate emails using brain.py
+    # Generate emails using brain.py, then read them back from its results store
     print("\n📧 Running email generation (AI disabled)...")
-    brain.generate_batch(days=DAYS, use_ai=False)
+    brain.generate_batch(days=DAYS, use_ai=False, store_results=True)
+    recipients, events = load_name_index()
+    store = ResultsStore(os.path.join(brain.Config.OUTPUT_DIR, STORE_FILENAME))
     
-    # Load generated JSON files and process them
     generated_data = {}
     generated_count = 0
     
@@ -127,73 +121,50 @@ def generate_all_emails():
             "emails": []
         }
         
-        json_file = os.path.join("data", "generated", f"day_{day}_emails.json")
-        
-        if not os.path.exists(json_file):
-            print(f"⚠️  No file found for day {day}")
-            continue
-        
-        with open(json_file, 'r', encoding='utf-8') as f:
-            day_data = json.load(f)
-        
-        emails = day_data.get("emails", [])
+        emails = store.query(day=day, status="generated")
         day_generated = 0
         
         for item in emails:
-            if item.get("meta", {}).get("status") == "generated":
-                email_obj = item.get("email", {})
-                subject = email_obj.get("subject", "")
-                body = email_obj.get("body", "")
-                recipient_id = item.get("meta", {}).get("recipient_id", "")
-                event_id = item.get("meta", {}).get("event_id", "")
-                
-                # Get recipient and event names from the data
-                recipient_name = ""
-                event_title = ""
-                
-                # Load recipient data to get name
-                with open("data/recipients.json", 'r', encoding='utf-8') as f:
-                    recipients = json.load(f)
-                    for r in recipients:
-                        if r.get("recipient_id") == recipient_id:
-                            recipient_name = r.get("name", "Unknown")
-                            break
-                
-                # Load event data to get title
-                with open("data/grant_events.json", 'r', encoding='utf-8') as f:
-                    events = json.load(f)
-                    for e in events:
-                        if e.get("event_id") == event_id:
-                            event_title = e.get("title", "Unknown")
-                            break
-                
-                # Save as individual text file
-                filepath = save_email_as_text(
-                    day, recipient_name, event_title, subject, body, recipient_id, event_id
-                )
-                
-                # Store in data structure
-                generated_data[day]["emails"].append({
-                    "recipient": recipient_name,
-                    "recipient_id": recipient_id,
-                    "event": event_title,
-                    "event_id": event_id,
-                    "subject": subject,
-                    "body": body,
-                    "file": filepath
-                })
-                
-                day_generated += 1
-                generated_count += 1
-                
-                print(f"✅ Day {day}: {recipient_name} → {event_title}")
-        
+            email_obj = item.get("email", {})
+            subject = email_obj.get("subject", "")
+            body = email_obj.get("body", "")
+            recipient_id = item.get("meta", {}).get("recipient_id", "")
+            event_id = item.get("meta", {}).get("event_id", "")
+            
+            # Get recipient and event names from the index
+            recipient = recipients.get(recipient_id)
+            event = events.get(event_id)
+            recipient_name = recipient.get("name", "Unknown") if recipient else ""
+            event_title = event.get("title", "Unknown") if event else ""
+            
+            # Save as individual text file
+            filepath = save_email_as_text(
+                day, recipient_name, event_title, subject, body, recipient_id, event_id
+            )
+            
+            # Store in data structure
+            generated_data[day]["emails"].append({
+                "recipient": recipient_name,
+                "recipient_id": recipient_id,
+                "event": event_title,
+                "event_id": event_id,
+                "subject": subject,
+                "body": body,
+                "file": filepath
+            })
+            
+            day_generated += 1
+            generated_count += 1
+            
+            print(f"✅ Day {day}: {recipient_name} → {event_title}")
+    
         # Save day's emails as JSON
         save_email_as_json(day, generated_data[day])
         
         if day_generated == 0:
             print(f"⛔ Day {day}: No emails generated")
     
+    store.close()
     return generated_data, generated_count
 
 def create_master_index(generated_data, total_count):
@@ -0,0 +1,142 @@
+"""
+ingest.py - Streaming Ingestion for Large Recipient Files
+
+Yields recipient records one at a time so generation can start before a
+multi-GB file has been read. Supported inputs:
+
+- JSON Lines / NDJSON (.jsonl, .ndjson): one object per line
+- JSON arrays (.json): parsed incrementally with JSONDecoder.raw_decode
+  over a sliding buffer, never materializing the whole list
+
+The format is picked from the extension, falling back to sniffing the
+first non-whitespace character ("[" → array, "{" → JSON Lines).
+
+Usage:
+    for recipient in iter_records("./data/recipients.jsonl"):
+        ...
+"""
+
+import json
+from typing import Dict, Iterator, TextIO
+
+CHUNK_SIZE = 1 << 20  # 1 MiB read window
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+# Longest token the decoder may fail on for lack of input ("\ud83d\ude00")
+_LOOKAHEAD = 12
+
+
+class IngestError(ValueError):
+    """Malformed input record (with location)"""
+
+
+def _require_object(record, where: str) -> Dict:
+    if not isinstance(record, dict):
+        raise IngestError(f"{where}: expected a JSON object, got {type(record).__name__}")
+    return record
+
+
+def iter_jsonl(f: TextIO, source: str = "<stream>") -> Iterator[Dict]:
+    """Yield one object per non-blank line"""
+    for line_no, line in enumerate(f, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise IngestError(f"{source}:{line_no}: invalid JSON ({e.msg})") from e
+        yield _require_object(record, f"{source}:{line_no}")
+
+
+def _may_be_truncated(error: json.JSONDecodeError, buffered: int) -> bool:
+    """Whether more input could still make the failed element decode"""
+    return error.msg.startswith("Unterminated string") or error.pos >= buffered - _LOOKAHEAD
+
+
+def iter_json_array(f: TextIO, source: str = "<stream>", chunk_size: int = CHUNK_SIZE) -> Iterator[Dict]:
+    """
+    Yield the elements of a top-level JSON array without loading it whole
+
+    A malformed element raises IngestError as soon as the decoder fails
+    inside the buffered input, with the byte offset of the failure.
+    """
+    encoding = getattr(f, "encoding", None) or "utf-8"
+    buf = ""
+    pos = 0
+    eof = False
+    index = 0
+    offset = 0  # bytes of input before buf
+
+    def fill() -> bool:
+        nonlocal buf, pos, eof, offset
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+            return False
+        offset += len(buf[:pos].encode(encoding))
+        buf = buf[pos:] + chunk
+        pos = 0
+        return True
+
+    def at(i: int) -> str:
+        return f"{source}: byte {offset + len(buf[:i].encode(encoding))}"
+
+    def skip_ws() -> None:
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buf) or not fill():
+                return
+
+    skip_ws()
+    if pos >= len(buf) or buf[pos] != "[":
+        raise IngestError(f"{at(pos)}: expected a JSON array")
+    pos += 1
+
+    while True:
+        skip_ws()
+        if pos >= len(buf):
+            raise IngestError(f"{at(pos)}: unexpected end of input in array")
+        if buf[pos] == "]":
+            return
+        if index > 0:
+            if buf[pos] != ",":
+                raise IngestError(f"{at(pos)}: expected ',' after element {index - 1}")
+            pos += 1
+            skip_ws()
+
+        # Decode the next element, reading more if it spans the buffer end
+        while True:
+            try:
+                record, end = _decoder.raw_decode(buf, pos)
+                # A number at the buffer edge may still be incomplete
+                if end == len(buf) and not eof and fill():
+                    continue
+                break
+            except json.JSONDecodeError as e:
+                # Read on only if the element may just be cut off by the buffer end
+                if eof or not _may_be_truncated(e, len(buf)) or not fill():
+                    raise IngestError(f"{at(e.pos)}: invalid JSON in element {index} ({e.msg})") from e
+        pos = end
+        yield _require_object(record, f"{source}[{index}]")
+        index += 1
+
+
+def iter_records(path: str) -> Iterator[Dict]:
+    """Stream records from a JSON array or JSON Lines file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            yield from iter_jsonl(f, path)
+            return
+
+        head = f.read(1)
+        while head and head in _WHITESPACE:
+            head = f.read(1)
+        f.seek(0)
+        if head == "[":
+            yield from iter_json_array(f, path)
+        else:
+            yield from iter_jsonl(f, path)
@@ -0,0 +1,252 @@
+"""
+llm_metrics.py - Token and Latency Accounting for LLM Calls
+
+Every call GroqEmailGenerator makes (or serves from the response cache)
+produces a call record: prompt/completion tokens from the completion's
+`usage` field, latency, retries, the error of a request that failed, and
+the fallback reason if the email had to be rendered deterministically.
+Failed requests are timed too (failed()), so every request sent counts. The record is attached to the result's
+meta, and LLMMetrics aggregates all of them for the SUMMARY and a
+machine-readable metrics file.
+
+Latency and tokens/email percentiles are computed over a uniform reservoir
+sample of at most SAMPLE_SIZE calls (exact below that), so a long-lived
+serve daemon's metrics stay bounded.
+
+Completions without `usage` (e.g. a minimal local stub) get estimated
+token counts and "usage_estimated": true.
+
+Usage:
+    metrics = LLMMetrics()
+    call = metrics.new_call(model)
+    start = time.perf_counter()
+    try:
+        completion = client.chat.completions.create(...)
+    except Exception as e:
+        metrics.failed(call, start, e)
+        raise
+    metrics.observe(call, completion, start, prompt_text)
+    metrics.record(call)
+    summary = metrics.summary()
+"""
+
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from output_writers import atomic_write_json
+
+# USD per 1M tokens (input, output), from Groq's public pricing
+MODEL_PRICING = {
+    "llama-3.3-70b-versatile": (0.59, 0.79),
+    "llama-3.1-8b-instant": (0.05, 0.08),
+    "llama3-70b-8192": (0.59, 0.79),
+    "llama3-8b-8192": (0.05, 0.08),
+    "gemma2-9b-it": (0.20, 0.20),
+}
+
+CHARS_PER_TOKEN = 4
+SAMPLE_SIZE = 10_000  # Per-call values kept for percentiles
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile (q in 0..100); None for no values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))  # ceil
+    return ordered[int(rank) - 1]
+
+
+def call_cost(model: str, prompt_tokens: float, completion_tokens: float) -> Optional[float]:
+    """Estimated USD cost of a call, or None for models without a price"""
+    pricing = MODEL_PRICING.get(model)
+    if pricing is None:
+        return None
+    return (prompt_tokens * pricing[0] + completion_tokens * pricing[1]) / 1_000_000
+
+
+class Reservoir:
+    """Uniform random sample of at most `size` values (all of them until it fills)"""
+
+    def __init__(self, size: int = SAMPLE_SIZE):
+        self.size = size
+        self.seen = 0
+        self.values: List[float] = []
+        self._rng = random.Random(0)
+
+    def add(self, value: float) -> None:
+        self.seen += 1
+        if len(self.values) < self.size:
+            self.values.append(value)
+            return
+        slot = self._rng.randrange(self.seen)
+        if slot < self.size:
+            self.values[slot] = value
+
+
+class LLMMetrics:
+    """Thread-safe aggregator of call records (latency and tokens/email are sampled per call)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.latencies = Reservoir()
+        self.email_tokens = Reservoir()
+        self.max_latency: Optional[float] = None
+        self.requests = 0
+        self.errors = 0
+        self.cached = 0
+        self.emails = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.fallbacks: Dict[str, int] = {}
+        self.responses = {"valid": 0, "repaired": 0, "rejected": 0}
+        self.by_model: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def new_call(model: str, emails: int = 1) -> Dict[str, Any]:
+        return {
+            "model": model,
+            "emails": emails,
+            "cached": False,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "latency_ms": None,
+            "attempts": 0,
+            "retries": 0,
+            "error": None,
+            "fallback_reason": None
+        }
+
+    @staticmethod
+    def observe(call: Dict[str, Any], completion: Any, started: float, prompt_text: str = "") -> None:
+        """
+        Add a completion's token usage and set latency since `started`
+
+        Called once per attempt, so retried calls sum the tokens of every
+        attempt and their latency includes backoff.
+        """
+        call["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        call["attempts"] += 1
+        call["error"] = None
+        usage = getattr(completion, "usage", None)
+        if usage is not None and getattr(usage, "prompt_tokens", None) is not None:
+            call["prompt_tokens"] += usage.prompt_tokens
+            call["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+        else:
+            try:
+                text = completion.choices[0].message.content or ""
+            except (AttributeError, IndexError, TypeError):
+                text = ""
+            call["prompt_tokens"] += len(prompt_text) // CHARS_PER_TOKEN + 1
+            call["completion_tokens"] += len(text) // CHARS_PER_TOKEN + 1
+            call["usage_estimated"] = True
+
+    @staticmethod
+    def failed(call: Dict[str, Any], started: float, error: Exception) -> None:
+        """Set latency since `started` and the error of a request that raised"""
+        call["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        call["attempts"] += 1
+        call["error"] = type(error).__name__
+
+    def count_response(self, status: str, n: int = 1) -> None:
+        """Count parsed responses (or batched items) by status: valid, repaired, rejected"""
+        with self._lock:
+            self.responses[status] = self.responses.get(status, 0) + n
+
+    def record(self, call: Dict[str, Any]) -> None:
+        with self._lock:
+            self.retries += call["retries"]
+            if call["fallback_reason"]:
+                # Group by error class, not the full message
+                reason = call["fallback_reason"].split(":")[0]
+                self.fallbacks[reason] = self.fallbacks.get(reason, 0) + call["emails"]
+            if call["cached"]:
+                self.cached += call["emails"]
+                return
+            if not call["attempts"]:
+                return
+            # Every attempt is a request; latency covers all of them
+            attempts = call["attempts"]
+            self.requests += attempts
+            if call["error"]:
+                self.errors += 1
+            # A call that fell back delivered no AI email; its tokens still count
+            emails = 0 if call["fallback_reason"] else call["emails"]
+            self.emails += emails
+            self.latencies.add(call["latency_ms"])
+            if self.max_latency is None or call["latency_ms"] > self.max_latency:
+                self.max_latency = call["latency_ms"]
+            if emails:
+                self.email_tokens.add(
+                    (call["prompt_tokens"] + call["completion_tokens"]) / emails
+                )
+            self.prompt_tokens += call["prompt_tokens"]
+            self.completion_tokens += call["completion_tokens"]
+            model = self.by_model.setdefault(call["model"], {
+                "requests": 0, "errors": 0, "emails": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0
+            })
+            model["requests"] += attempts
+            if call["error"]:
+                model["errors"] += 1
+            model["emails"] += emails
+            model["prompt_tokens"] += call["prompt_tokens"]
+            model["completion_tokens"] += call["completion_tokens"]
+            cost = call_cost(call["model"], call["prompt_tokens"], call["completion_tokens"])
+            model["cost_usd"] = None if cost is None or model["cost_usd"] is None else model["cost_usd"] + cost
+
+    @staticmethod
+    def share(call: Dict[str, Any]) -> Dict[str, Any]:
+        """Per-email view of a multi-email call (tokens split evenly)"""
+        n = max(1, call["emails"])
+        if n == 1:
+            return dict(call)
+        return dict(
+            call,
+            prompt_tokens=round(call["prompt_tokens"] / n, 1),
+            completion_tokens=round(call["completion_tokens"] / n, 1)
+        )
+
+    def summary(self) -> Dict[str, Any]:
+        """Aggregates: call counts, latency percentiles, tokens per email, cost by model"""
+        with self._lock:
+            latencies = list(self.latencies.values)
+            email_tokens = list(self.email_tokens.values)
+            by_model = {model: dict(totals) for model, totals in self.by_model.items()}
+            tokens = self.prompt_tokens + self.completion_tokens
+            costs = [totals["cost_usd"] for totals in by_model.values()]
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "cached": self.cached,
+                "emails": self.emails,
+                "retries": self.retries,
+                "fallbacks": dict(self.fallbacks),
+                "responses": dict(self.responses),
+                "latency_ms": {
+                    "p50": percentile(latencies, 50),
+                    "p95": percentile(latencies, 95),
+                    "p99": percentile(latencies, 99),
+                    "max": self.max_latency
+                },
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "tokens_per_email": {
+                    "mean": round(tokens / self.emails, 1) if self.emails else None,
+                    "p50": percentile(email_tokens, 50),
+                    "p95": percentile(email_tokens, 95),
+                    "p99": percentile(email_tokens, 99)
+                },
+                "cost_usd": None if any(c is None for c in costs) else round(sum(costs), 6),
+                "by_model": by_model
+            }
+
+    def write(self, path: str, extra: Optional[Dict[str, Any]] = None) -> None:
+        """Write the summary (plus `extra` fields) as JSON"""
+        atomic_write_json(path, {**(extra or {}), **self.summary()})
+
@@ -0,0 +1,253 @@
+"""
+manifest.py - Content-Hash Manifest for Incremental Regeneration
+
+A manifest.json next to the generated day files records, for every
+recipient and event, the content hashes it was generated from and on which
+days, plus per day the settings (mode, model, version hashes of the prompt
+bundle in templates.py and the fallback templates in renderer.py) and the
+output format. On an incremental run, a generated email is reused from the
+previous day file only when that day was last generated from the current
+recipient and event contents under the same settings; everything else is
+regenerated. Runs of some days leave the other days' coverage untouched,
+so renaming a recipient, running Day 1, then running Day 3 still
+regenerates Day 3. Day files are rewritten from the current inputs, so
+outputs for deleted recipients/events disappear. Non-incremental runs rewrite
+the day files without hashing, so they remove the manifest
+(remove_manifest) rather than leave one that describes older files.
+
+Eligibility is still decided for every pair on every run (it is cheap and
+depends on the clock); only content generation is skipped.
+
+Usage:
+    state = IncrementalState(output_dir, days, {"use_ai": True, "model": model}, "jsonl")
+    state.track_events(events)
+    state.track(recipient)
+    result = state.reuse(day, recipient, event)   # None → regenerate
+    counters = state.finish()
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from output_writers import atomic_write_json
+import renderer
+
+try:
+    from templates import COMPLETE_PROMPT_BUNDLE
+except ImportError:
+    COMPLETE_PROMPT_BUNDLE = None
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 3
+
+
+def content_hash(obj: Any, sort_keys: bool = True) -> str:
+    """SHA-256 of the canonical JSON encoding"""
+    payload = json.dumps(obj, sort_keys=sort_keys, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def template_versions() -> Dict[str, Optional[str]]:
+    """Version hashes of everything besides the inputs that shapes an email"""
+    # The prompt bundle mixes int and str keys, so it is hashed in source order
+    return {
+        "prompts": content_hash(COMPLETE_PROMPT_BUNDLE, sort_keys=False) if COMPLETE_PROMPT_BUNDLE else None,
+        "fallback": content_hash([
+            renderer.DAY_SUBJECT_TEMPLATES,
+            renderer.DEFAULT_SUBJECT_TEMPLATE,
+            renderer.DAY_BODY_TEMPLATES,
+            renderer.DEFAULT_BODY_TEMPLATE
+        ], sort_keys=False)
+    }
+
+
+def load_manifest(output_dir: str) -> Optional[Dict]:
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def remove_manifest(output_dir: str) -> None:
+    """Invalidate incremental state before day files are rewritten without it"""
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+class PreviousDayResults:
+    """
+    Generated results of the previous run for one day, by (recipient_id, event_id)
+
+    Only the day file of the format the previous run wrote (output_format)
+    is read; one left over in another format is ignored. It is moved aside
+    to *.prev first, so the new writer can reuse its path; a *.prev left by
+    an interrupted run takes precedence. JSON Lines files ("jsonl" and
+    "archive") are indexed by offset and read lazily.
+    """
+
+    def __init__(self, output_dir: str, day: str, output_format: str):
+        self.path = None
+        self.results: Dict[Tuple[str, str], Dict] = {}
+        self.offsets: Dict[Tuple[str, str], int] = {}
+        self._file = None
+
+        ext = "json" if output_format == "json" else "jsonl"
+        path = os.path.join(output_dir, f"day_{day}_emails.{ext}")
+        if os.path.exists(f"{path}.prev"):
+            self.path = f"{path}.prev"
+        elif os.path.exists(path):
+            os.replace(path, f"{path}.prev")
+            self.path = f"{path}.prev"
+        if self.path is None:
+            return
+
+        if self.path.endswith(".jsonl.prev"):
+            self._file = open(self.path, 'rb')
+            offset = 0
+            for line in self._file:
+                meta = json.loads(line).get("meta", {})
+                if meta.get("status") == "generated":
+                    self.offsets[(meta.get("recipient_id"), meta.get("event_id"))] = offset
+                offset += len(line)
+        else:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for result in json.load(f).get("emails", []):
+                    meta = result.get("meta", {})
+                    if meta.get("status") == "generated":
+                        self.results[(meta.get("recipient_id"), meta.get("event_id"))] = result
+
+    def get(self, recipient_id: str, event_id: str) -> Optional[Dict]:
+        key = (recipient_id, event_id)
+        if self._file is None:
+            return self.results.get(key)
+        offset = self.offsets.get(key)
+        if offset is None:
+            return None
+        self._file.seek(offset)
+        return json.loads(self._file.readline())
+
+    def close(self, remove: bool = True) -> None:
+        if self._file is not None:
+            self._file.close()
+        if remove and self.path:
+            os.remove(self.path)
+
+
+class IncrementalState:
+    """Old manifest + previous day results, and the hashes for the new manifest"""
+
+    def __init__(self, output_dir: str, days: Sequence[str], settings: Dict, output_format: str):
+        self.output_dir = output_dir
+        self.days = list(days)
+        self.settings = dict(settings, versions=template_versions())
+        self.output_format = output_format
+        self.use_ai = bool(settings.get("use_ai"))
+        self.recipients: Dict[str, str] = {}
+        self.events: Dict[str, str] = {}
+        self.reused = 0
+        self.regenerated = 0
+
+        os.makedirs(output_dir, exist_ok=True)
+        old = load_manifest(output_dir)
+        if old is not None and old.get("version") != MANIFEST_VERSION:
+            old = None
+            self.reason = "manifest version changed"
+        else:
+            self.reason = "no previous manifest" if old is None else None
+        old = old or {}
+        self.old_days: Dict[str, Dict] = old.get("days", {})
+        # id → content hash → days generated from that content
+        self.old_recipients: Dict[str, Dict[str, List[str]]] = old.get("recipients", {})
+        self.old_events: Dict[str, Dict[str, List[str]]] = old.get("events", {})
+
+        self.previous: Dict[str, Optional[PreviousDayResults]] = {}
+        for day in self.days:
+            entry = self.old_days.get(day)
+            reusable = entry is not None and entry.get("settings") == self.settings
+            self.previous[day] = PreviousDayResults(output_dir, day, entry["output_format"]) if reusable else None
+        if self.reason is None and all(previous is None for previous in self.previous.values()):
+            self.reason = "templates, model or settings changed, or days not generated before"
+
+    def track(self, recipient: Dict) -> None:
+        """Hash a recipient for the new manifest"""
+        recipient_id = recipient.get("recipient_id")
+        if recipient_id is not None and recipient_id not in self.recipients:
+            self.recipients[recipient_id] = content_hash(recipient)
+
+    def track_events(self, events: Sequence[Dict]) -> None:
+        for event in events:
+            event_id = event.get("event_id")
+            if event_id is not None and event_id not in self.events:
+                self.events[event_id] = content_hash(event)
+
+    def reuse(self, day: str, recipient: Dict, event: Dict) -> Optional[Dict]:
+        """Previous result for a pair unchanged since `day` was last generated, or None to regenerate"""
+        previous = self.previous.get(day)
+        recipient_id = recipient.get("recipient_id")
+        event_id = event.get("event_id")
+        result = None
+        if (
+            previous is not None
+            and day in self.old_recipients.get(recipient_id, {}).get(self.recipients.get(recipient_id), ())
+            and day in self.old_events.get(event_id, {}).get(self.events.get(event_id), ())
+        ):
+            result = previous.get(recipient_id, event_id)
+            # A fallback written during an AI run is retried, not kept
+            if result is not None and self.use_ai and (result.get("verification") or {}).get("fallback_used"):
+                result = None
+        if result is None:
+            self.regenerated += 1
+        else:
+            self.reused += 1
+        return result
+
+    def _coverage(self, old: Dict[str, Dict[str, List[str]]], current: Dict[str, str]) -> Dict[str, Dict[str, List[str]]]:
+        """Old coverage minus this run's days, plus this run's days under the current hashes"""
+        run_days = set(self.days)
+        merged: Dict[str, Dict[str, List[str]]] = {}
+        for key, by_hash in old.items():
+            for h, days in by_hash.items():
+                kept = [day for day in days if day not in run_days]
+                if kept:
+                    merged.setdefault(key, {})[h] = kept
+        for key, h in current.items():
+            days = merged.setdefault(key, {}).setdefault(h, [])
+            days.extend(self.days)
+        return merged
+
+    def abort(self) -> None:
+        """Close the previous day files, keeping them (*.prev) for the next run"""
+        for previous in self.previous.values():
+            if previous is not None:
+                previous.close(remove=False)
+
+    def finish(self) -> Dict[str, int]:
+        """Write the new manifest, drop the previous day files; returns run counters"""
+        for previous in self.previous.values():
+            if previous is not None:
+                previous.close()
+        days = dict(self.old_days)
+        for day in self.days:
+            days[day] = {"settings": self.settings, "output_format": self.output_format}
+        atomic_write_json(os.path.join(self.output_dir, MANIFEST_NAME), {
+            "version": MANIFEST_VERSION,
+            "days": days,
+            "recipients": self._coverage(self.old_recipients, self.recipients),
+            "events": self._coverage(self.old_events, self.events)
+        }, indent=None)
+        return {
+            "reused": self.reused,
+            "regenerated": self.regenerated,
+            "changed_recipients": sum(
+                1 for rid, h in self.recipients.items() if h not in self.old_recipients.get(rid, {})
+            ),
+            "changed_events": sum(
+                1 for eid, h in self.events.items() if h not in self.old_events.get(eid, {})
+            ),
+            "removed_recipients": sum(1 for rid in self.old_recipients if rid not in self.recipients),
+            "removed_events": sum(1 for eid in self.old_events if eid not in self.events)
+        }
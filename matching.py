@@ -0,0 +1,112 @@
+"""
+matching.py - Inverted Tag Index for Recipient × Event Matching
+
+Builds a topic → events index once per batch so that each recipient only
+visits the events sharing at least one normalized topic, instead of the
+full recipients × events cross product. Topics are interned to bit
+positions (see records.py): each event keeps a tag bitset and each topic
+an event bitset, so candidate lookup and overlap are integer operations.
+
+Usage:
+    engine = MatchingEngine(events)
+    for event_idx, overlap in engine.candidates(recipient["topics"]):
+        ...
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from records import EventRecord, RecipientRecord, TopicVocabulary, iter_bits, overlap_count
+from validation import VALIDATION_RULES
+
+
+class MatchingEngine:
+    """Inverted index from interned event tags to event bitsets"""
+
+    def __init__(self, events: Sequence[Dict], min_match: Optional[int] = None):
+        self.events = events
+        self.min_match = (
+            VALIDATION_RULES["topic_match_threshold"]["medium"] if min_match is None else min_match
+        )
+        self.vocab = TopicVocabulary()
+        self.records = [EventRecord.from_dict(event, self.vocab) for event in events]
+        # topic id → bitset of event positions carrying that tag
+        self.events_by_topic: List[int] = [0] * len(self.vocab)
+        for idx, record in enumerate(self.records):
+            for topic_id in iter_bits(record.tag_mask):
+                self.events_by_topic[topic_id] |= 1 << idx
+        self._totals: Dict[str, int] = {}
+        self._totals_for: Optional[Sequence[Optional[str]]] = None
+
+    def encode(self, recipient: Dict) -> RecipientRecord:
+        """Compact record for a recipient; topics no event carries get no bit"""
+        return RecipientRecord.from_dict(recipient, self.vocab, grow=False)
+
+    def candidates(self, recipient_topics: Sequence[str]) -> List[Tuple[int, List[str]]]:
+        """
+        List events sharing at least `min_match` topics with the recipient
+        Returns: [(event_idx, overlap)] in event order, overlap sorted like topic_overlap()
+        """
+        return self.candidates_for(self.encode({"topics": recipient_topics}))
+
+    def candidates_for(self, record: RecipientRecord) -> List[Tuple[int, List[str]]]:
+        """candidates() for an already encoded recipient"""
+        hit_events = 0
+        for topic_id in iter_bits(record.topic_mask):
+            hit_events |= self.events_by_topic[topic_id]
+
+        results = []
+        for idx in iter_bits(hit_events):
+            tag_mask = self.records[idx].tag_mask
+            # The sorted tag list is only built for events that pass
+            if record.distinct and overlap_count(record.topic_mask, tag_mask) < self.min_match:
+                continue
+            overlap = record.overlap(tag_mask)
+            if len(overlap) >= self.min_match:
+                results.append((idx, overlap))
+        return results
+
+    def skipped_counts(
+        self,
+        candidate_idxs: Sequence[int],
+        recipient_reason: Optional[str],
+        event_reasons: Sequence[Optional[str]]
+    ) -> Dict[str, int]:
+        """
+        Count block reasons for the pairs candidates() skipped for one recipient
+
+        Mirrors the check order of should_send_email(): validation, opt-out,
+        deadline, then topic match. `recipient_reason` is "validation_failed",
+        "opted_out" or None; `event_reasons` holds "validation_failed",
+        "deadline_passed" or None per event. Runs in O(candidates).
+        """
+        skipped = len(self.events) - len(candidate_idxs)
+        if skipped <= 0:
+            return {}
+        if recipient_reason == "validation_failed":
+            return {"validation_failed": skipped}
+
+        totals = self._reason_totals(event_reasons)
+        picked = {"validation_failed": 0, "deadline_passed": 0}
+        for idx in candidate_idxs:
+            reason = event_reasons[idx]
+            if reason in picked:
+                picked[reason] += 1
+
+        counts = {"validation_failed": totals["validation_failed"] - picked["validation_failed"]}
+        remaining = skipped - counts["validation_failed"]
+        if recipient_reason:
+            counts[recipient_reason] = remaining
+        else:
+            counts["deadline_passed"] = totals["deadline_passed"] - picked["deadline_passed"]
+            counts["no_topic_match"] = remaining - counts["deadline_passed"]
+        return {reason: n for reason, n in counts.items() if n}
+
+    def _reason_totals(self, event_reasons: Sequence[Optional[str]]) -> Dict[str, int]:
+        """Per-reason event totals, computed once per event_reasons list"""
+        if self._totals_for is not event_reasons:
+            self._totals = {"validation_failed": 0, "deadline_passed": 0}
+            for reason in event_reasons:
+                if reason in self._totals:
+                    self._totals[reason] += 1
+            self._totals_for = event_reasons
+        return self._totals
@@ -0,0 +1,163 @@
+"""
+output_writers.py - Day File Writers for Generated Emails
+
+Output formats for data/generated/day_{day}_emails.*:
+
+- json:    one JSON document per day (emails held in memory until close)
+- jsonl:   one result per line, written as it is produced; totals go to a
+           small day_{day}_emails.meta.json sidecar (header + footer), so
+           memory stays flat regardless of the number of recipients
+- archive: jsonl plus a fixed-width offset index (day_{day}_emails.idx)
+           for memory-mapped random access (see archive.py)
+
+Usage:
+    writer = open_day_writer("jsonl", output_dir, day, started_at)
+    writer.write(result)
+    path = writer.close(statistics, finished_at)   # or writer.abort() on failure
+"""
+
+import json
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+FORMATS = ("json", "jsonl", "archive")
+
+
+def atomic_write_json(path: str, data: Dict, indent: Optional[int] = 2) -> None:
+    """Write JSON to a temp file and rename it into place"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class DayWriter(ABC):
+    """Base writer for one day's results"""
+
+    extension = ""
+
+    def __init__(self, output_dir: str, day: str, started_at: str):
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.day = day
+        self.started_at = started_at
+        self.path = os.path.join(output_dir, f"day_{day}_emails.{self.extension}")
+
+    @abstractmethod
+    def write(self, result: Dict) -> None:
+        """Append one result"""
+
+    @abstractmethod
+    def close(self, statistics: Dict, finished_at: str) -> str:
+        """Finish the day file; returns its path"""
+
+    def abort(self) -> None:
+        """Release the day file without finishing it (the run failed)"""
+
+
+class JsonDayWriter(DayWriter):
+    """Original format: a single indented JSON document per day"""
+
+    extension = "json"
+
+    def __init__(self, output_dir: str, day: str, started_at: str):
+        super().__init__(output_dir, day, started_at)
+        self.emails: List[Dict] = []
+
+    def write(self, result: Dict) -> None:
+        self.emails.append(result)
+
+    def close(self, statistics: Dict, finished_at: str) -> str:
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "day": self.day,
+                "generated_at": finished_at,
+                "statistics": statistics,
+                "emails": self.emails
+            }, f, indent=2, ensure_ascii=False)
+        self.emails = []
+        return self.path
+
+    def abort(self) -> None:
+        # Nothing was written; the previous day file stays as it was
+        self.emails = []
+
+
+class JsonlDayWriter(DayWriter):
+    """Streaming format: one result per line plus a header/footer sidecar"""
+
+    extension = "jsonl"
+    format = "jsonl"
+
+    def __init__(self, output_dir: str, day: str, started_at: str):
+        super().__init__(output_dir, day, started_at)
+        self.meta_path = os.path.join(output_dir, f"day_{day}_emails.meta.json")
+        self.count = 0
+        self.header = {
+            "day": day,
+            "format": self.format,
+            "data_file": os.path.basename(self.path),
+            "started_at": started_at
+        }
+        atomic_write_json(self.meta_path, {"header": self.header, "footer": None})
+        self._file = open(self.path, 'wb')
+
+    def write(self, result: Dict) -> None:
+        self._file.write(json.dumps(result, ensure_ascii=False).encode("utf-8") + b"\n")
+        self.count += 1
+
+    def close(self, statistics: Dict, finished_at: str) -> str:
+        self._file.close()
+        atomic_write_json(self.meta_path, {
+            "header": self.header,
+            "footer": {
+                "generated_at": finished_at,
+                "records": self.count,
+                "statistics": statistics
+            }
+        })
+        return self.path
+
+    def abort(self) -> None:
+        # The sidecar keeps footer None, marking the data file incomplete
+        self._file.close()
+
+
+class ArchiveDayWriter(JsonlDayWriter):
+    """jsonl plus an offset/key index written at close, for ArchiveReader"""
+
+    format = "archive"
+
+    def __init__(self, output_dir: str, day: str, started_at: str):
+        from archive import IndexBuilder, index_path_for  # mmap/hashlib only for archive runs
+
+        super().__init__(output_dir, day, started_at)
+        self.index_path = index_path_for(self.path)
+        self.header["index_file"] = os.path.basename(self.index_path)
+        atomic_write_json(self.meta_path, {"header": self.header, "footer": None})
+        self.index = IndexBuilder()
+
+    def write(self, result: Dict) -> None:
+        line = json.dumps(result, ensure_ascii=False).encode("utf-8") + b"\n"
+        meta = result.get("meta") or {}
+        self.index.add(len(line), meta.get("recipient_id"), meta.get("event_id"))
+        self._file.write(line)
+        self.count += 1
+
+    def close(self, statistics: Dict, finished_at: str) -> str:
+        # Index first: the footer marks a day file as complete
+        self._file.flush()
+        self.index.write(self.index_path)
+        return super().close(statistics, finished_at)
+
+
+def open_day_writer(fmt: str, output_dir: str, day: str, started_at: str) -> DayWriter:
+    """Create the writer for an output format ("json", "jsonl" or "archive")"""
+    if fmt == "json":
+        return JsonDayWriter(output_dir, day, started_at)
+    if fmt == "jsonl":
+        return JsonlDayWriter(output_dir, day, started_at)
+    if fmt == "archive":
+        return ArchiveDayWriter(output_dir, day, started_at)
+    raise ValueError(f"Unknown output format: {fmt} (expected one of {', '.join(FORMATS)})")
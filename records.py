@@ -0,0 +1,139 @@
+"""
+records.py - Compact Interned Records with Topic Bitsets
+
+Recipients and events arrive as free-form dicts. For matching, each record
+is reduced once to a slotted object whose topics are interned, normalized
+IDs packed into an integer bitset, so topic overlap is a bitwise AND plus a
+popcount instead of rebuilding lowercased sets for every pair.
+
+Records carry only the fields matching reads (topics and their bits); the
+original dicts stay the source of truth for validation, rendering and
+output.
+
+Usage:
+    vocab = TopicVocabulary()
+    event = EventRecord.from_dict(event_dict, vocab)
+    recipient = RecipientRecord.from_dict(recipient_dict, vocab, grow=False)
+    if overlap_count(recipient.topic_mask, event.tag_mask) >= 1:
+        ...
+"""
+
+import sys
+from typing import Dict, List, Optional, Tuple
+
+if hasattr(int, "bit_count"):
+    popcount = int.bit_count
+else:  # Python < 3.10
+    def popcount(mask: int) -> int:
+        return bin(mask).count("1")
+
+
+def normalize_topic(topic: str) -> str:
+    """Normalize a topic/tag the same way topic_overlap() compares them"""
+    return topic.strip().lower()
+
+
+def overlap_count(mask_a: int, mask_b: int) -> int:
+    """Number of distinct normalized topics two bitsets share"""
+    return popcount(mask_a & mask_b)
+
+
+def iter_bits(mask: int):
+    """Positions of the set bits in ascending order"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class TopicVocabulary:
+    """Interns normalized topics to bit positions (one bit per distinct topic)"""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.topics: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.topics)
+
+    def topic_id(self, topic: str, grow: bool = True) -> Optional[int]:
+        """Bit position for a topic; None for unknown topics when grow=False"""
+        if not isinstance(topic, str):
+            return None
+        key = normalize_topic(topic)
+        topic_id = self.ids.get(key)
+        if topic_id is None and grow:
+            topic_id = self.ids[sys.intern(key)] = len(self.topics)
+            self.topics.append(key)
+        return topic_id
+
+    def bit(self, topic: str, grow: bool = True) -> int:
+        """Single-bit mask for a topic; 0 for unknown topics when grow=False"""
+        topic_id = self.topic_id(topic, grow)
+        return 0 if topic_id is None else 1 << topic_id
+
+    def encode(self, topics, grow: bool = True) -> Tuple[Tuple[int, ...], int]:
+        """Per-topic bits (aligned with `topics`) and their union"""
+        if not isinstance(topics, list):
+            return (), 0
+        bits = tuple(self.bit(t, grow) for t in topics)
+        mask = 0
+        for b in bits:
+            mask |= b
+        return bits, mask
+
+
+def _intern(value) -> Optional[str]:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class RecipientRecord:
+    """
+    Slotted recipient topics and their bitset
+
+    Holds only what the matcher reads; the recipient dict itself is still
+    what gets validated, rendered and written.
+    """
+
+    __slots__ = ("topics", "topic_bits", "topic_mask", "distinct")
+
+    def __init__(self, topics: Tuple[str, ...], topic_bits: Tuple[int, ...], topic_mask: int):
+        self.topics = topics
+        self.topic_bits = topic_bits
+        self.topic_mask = topic_mask
+        # No topic listed twice: overlap_count() then equals len(overlap())
+        self.distinct = popcount(topic_mask) == sum(1 for b in topic_bits if b)
+
+    @classmethod
+    def from_dict(cls, recipient: Dict, vocab: TopicVocabulary, grow: bool = True) -> "RecipientRecord":
+        """
+        Build from a recipient dict
+
+        With grow=False, topics missing from the vocabulary get no bit (they
+        cannot match any event encoded with the same vocabulary).
+        """
+        topics = recipient.get("topics", [])
+        topic_bits, topic_mask = vocab.encode(topics, grow)
+        return cls(
+            topics=tuple(_intern(t) for t in topics) if isinstance(topics, list) else (),
+            topic_bits=topic_bits,
+            topic_mask=topic_mask
+        )
+
+    def overlap(self, mask: int) -> List[str]:
+        """Recipient topics (original spelling, sorted) whose bit is in `mask`"""
+        return sorted(t for t, b in zip(self.topics, self.topic_bits) if b & mask)
+
+
+class EventRecord:
+    """Slotted event tag bitset (the only event field the matcher reads)"""
+
+    __slots__ = ("tag_mask",)
+
+    def __init__(self, tag_mask: int):
+        self.tag_mask = tag_mask
+
+    @classmethod
+    def from_dict(cls, event: Dict, vocab: TopicVocabulary) -> "EventRecord":
+        _, tag_mask = vocab.encode(event.get("tags", []))
+        return cls(tag_mask=tag_mask)
@@ -0,0 +1,341 @@
+"""
+renderer.py - Deterministic Fallback Email Renderer
+
+Client-free renderer for the Russell Brunson 7-day sequence. Used for
+--no-ai runs and whenever AI generation fails; it needs no Groq import or
+API key, so a single instance can be shared across a whole batch.
+
+Subject and body templates are compiled once into literal/field segments
+and rendered with a join. Recipient- and event-derived fields are
+extracted once per entity, not once per email.
+
+Usage:
+    renderer = FallbackRenderer()
+    result = renderer.render(recipient, event, "1", "AI disabled")
+"""
+
+from string import Formatter
+from typing import Dict, List, Tuple
+
+try:
+    from templates import EMAIL_TYPES
+except ImportError:
+    EMAIL_TYPES = {}
+
+
+# =============================
+# Day Templates
+# =============================
+# Fields: {name} {org} {topic_str} {topic_lower} (recipient)
+#         {title} {organizer} {amount} {deadline} (event)
+#         {subject_org} {subject_title} (subject defaults are empty strings)
+DAY_SUBJECT_TEMPLATES = {
+    "0": "You're in! Here's what to expect - {subject_title}",
+    "1": "The #1 mistake that kills 97% of {topic_str} applications",
+    "3": "Proof: Real organizations getting real grant money - {subject_title}",
+    "5": "I get it... you're skeptical (but read this about {subject_title})",
+    "6": "⏰ Tomorrow: Your {topic_str} funding breakthrough",
+    "7a": "🔴 Going LIVE in 6 hours - {subject_title}",
+    "7b": "⏰ Starting in 60 minutes (join now)"
+}
+
+DEFAULT_SUBJECT_TEMPLATE = "{subject_title} - Opportunity for {subject_org}"
+
+DAY_BODY_TEMPLATES = {
+    # Registration Confirmation
+    "0": """Hi {name},
+
+You're officially in! 🎉
+
+I'm excited to welcome you to {title}, happening with {organizer}.
+
+Here's what you can expect:
+• A deep dive into {topic_lower} funding opportunities
+• Real grant amounts: {amount}
+• Application deadline: {deadline}
+• Expert insights and strategies to succeed
+
+Mark your calendar and get ready to take your {org}'s funding efforts to the next level.
+
+More details coming your way tomorrow!
+
+Best regards,
+
+Priya Singh
+Grants Coordinator
+Funding Forward""",
+
+    # Indoctrination - The Big Problem
+    "1": """Hi {name},
+
+In my work with {org}-like organizations, I see the same pattern over and over.
+
+The #1 mistake that kills 97% of {topic_lower} applications isn't lack of merit. It's not even lack of funding sources.
+
+It's applying to opportunities without understanding what funders actually want to see.
+
+Most organizations scramble at the last minute, missing the nuances that make their application stand out. They don't realize that {title} — happening soon — is specifically designed to teach exactly this.
+
+That's why I wanted to personally reach out.
+
+{title} is happening with {organizer}, and they're revealing insider strategies funders use to evaluate applications. Grant amounts: {amount}. Application deadline: {deadline}.
+
+This could be the turning point for your next funding cycle.
+
+Mark your calendar. More details tomorrow.
+
+Best regards,
+
+Priya Singh
+Grants Coordinator
+Funding Forward""",
+
+    # Social Proof
+    "3": """Hi {name},
+
+Proof: Real organizations getting real grant money.
+
+{organizer} has been supporting {topic_lower} initiatives like {org} for years. The numbers speak for themselves: organizations in your space have secured grants ranging from {amount}.
+
+Why? Because they understand what funders look for.
+
+{title} is where that knowledge is shared, and where the next batch of successful applicants get their edge.
+
+Application deadline: {deadline}
+
+Your organization could be next.
+
+Best regards,
+
+Priya Singh
+Grants Coordinator
+Funding Forward""",
+
+    # Objection Handling
+    "5": """Hi {name},
+
+I get it. You're probably thinking: "Another funding opportunity... is it really worth our time?"
+
+Fair question. Here's the honest answer:
+
+Most {topic_lower} funding programs are generic. But {title}? It's different. {organizer} specifically designed this for organizations like {org}.
+
+Common objection: "We don't have time." Reality: The insights from {title} will save you weeks on future applications.
+
+Common objection: "We're not competitive enough." Reality: Grant amounts of {amount} go to organizations that know how to present their work. That's taught here.
+
+Application deadline: {deadline}
+
+The real question isn't whether you have time. It's whether you can afford not to attend.
+
+Best regards,
+
+Priya Singh
+Grants Coordinator
+Funding Forward""",
+
+    # Final Push - Tomorrow
+    "6": """Hi {name},
+
+Tomorrow is the day.
+
+{title} goes live tomorrow, and I wanted to make sure you're ready.
+
+Here's what to prepare:
+✅ Your project details and impact metrics
+✅ Questions about the application process
+✅ A notepad — you'll want to capture the strategies shared
+
+Grants up to {amount}. Application deadline: {deadline}.
+
+This is happening tomorrow with {organizer}.
+
+Set a reminder right now. This could be the breakthrough {org} has been waiting for.
+
+Best regards,
+
+Priya Singh
+Grants Coordinator
+Funding Forward
+
+P.S. – Tomorrow morning, you'll get one final reminder with exact timing and access details. Don't miss it.""",
+
+    # Morning Reminder - Event Day
+    "7a": """Hi {name},
+
+🔴 Going LIVE in 6 hours - {title}
+
+{organizer} is about to share insider strategies for securing {amount} in grants.
+
+Have ready:
+✅ Your laptop/phone and a quiet space
+✅ Your organization's current funding challenges
+✅ A notebook for notes
+
+Application deadline: {deadline}
+
+See you in 6 hours!
+
+Best regards,
+
+Priya Singh
+Grants Coordinator
+Funding Forward""",
+
+    # Final Warning - Last Hour
+    "7b": """Hi {name},
+
+⏰ Starting in 60 minutes!
+
+{title} is about to start. {organizer} is revealing exactly how to get grants up to {amount}.
+
+Application deadline: {deadline}
+
+Join now. This is it.
+
+Priya Singh
+Grants Coordinator
+Funding Forward""",
+}
+
+# Generic fallback for unknown days
+DEFAULT_BODY_TEMPLATE = """Hi {name},
+
+I wanted to share {title} organised by {organizer}.
+
+Grant amount: {amount}
+Application deadline: {deadline}
+
+This may be relevant for your work at {org}.
+
+Best regards,
+
+Priya Singh
+Grants Coordinator
+Funding Forward"""
+
+
+# =============================
+# Template Compilation
+# =============================
+class CompiledTemplate:
+    """Template parsed once into literal segments and field slots"""
+    
+    __slots__ = ("segments", "slots")
+    
+    def __init__(self, template: str):
+        self.segments: List[str] = []
+        self.slots: List[Tuple[int, str]] = []
+        for literal, field_name, _, _ in Formatter().parse(template):
+            if literal:
+                self.segments.append(literal)
+            if field_name is not None:
+                self.slots.append((len(self.segments), field_name))
+                self.segments.append("")
+    
+    def render(self, fields: Dict[str, str]) -> str:
+        parts = self.segments.copy()
+        for pos, name in self.slots:
+            parts[pos] = fields[name]
+        return "".join(parts)
+
+
+class DayTemplates:
+    """Compiled subject/body pair plus the EMAIL_TYPES metadata for one day"""
+    
+    __slots__ = ("subject", "body", "email_type", "principle")
+    
+    def __init__(self, day_number: str):
+        email_config = EMAIL_TYPES.get(day_number, EMAIL_TYPES.get(int(day_number) if day_number.isdigit() else None, {}))
+        self.subject = CompiledTemplate(DAY_SUBJECT_TEMPLATES.get(day_number, DEFAULT_SUBJECT_TEMPLATE))
+        self.body = CompiledTemplate(DAY_BODY_TEMPLATES.get(day_number, DEFAULT_BODY_TEMPLATE))
+        self.email_type = email_config.get("type", "Custom")
+        self.principle = email_config.get("principle", "Personalized outreach")
+
+
+# =============================
+# Renderer
+# =============================
+class FallbackRenderer:
+    """Renders fallback emails from recipient/event JSON only"""
+    
+    def __init__(self):
+        self._days: Dict[str, DayTemplates] = {}
+        # id(entity) -> (entity, fields); the entity is kept to guard against id reuse
+        self._recipient_fields: Dict[int, Tuple[Dict, Dict[str, str]]] = {}
+        self._event_fields: Dict[int, Tuple[Dict, Dict[str, str]]] = {}
+    
+    def render(self, recipient: Dict, event: Dict, day_number: str, error: str) -> Dict:
+        """Deterministic, day-specific email using Russell Brunson framework"""
+        templates = self._day(str(day_number))
+        fields = {**self._fields_for_recipient(recipient), **self._fields_for_event(event)}
+        
+        return {
+            "internal_reasoning": {
+                "email_type": templates.email_type,
+                "error": error,
+                "match_decision": "send",
+                "principle": templates.principle
+            },
+            "email": {
+                "subject": templates.subject.render(fields),
+                "body": templates.body.render(fields)
+            },
+            "verification": {
+                "all_data_from_json": True,
+                "fallback_used": True
+            },
+            "warnings": [f"Used fallback due to: {error}"]
+        }
+    
+    def forget(self, recipient: Dict) -> None:
+        """Drop one recipient's cached fields (long-lived renderers, e.g. brain.py serve)"""
+        self._recipient_fields.pop(id(recipient), None)
+    
+    def clear_recipients(self) -> None:
+        """Drop cached recipient fields; batch runs call this after every chunk so memory stays flat"""
+        self._recipient_fields.clear()
+    
+    def clear(self) -> None:
+        """Drop per-entity field caches (e.g. between batches)"""
+        self._recipient_fields.clear()
+        self._event_fields.clear()
+    
+    def _day(self, day_number: str) -> DayTemplates:
+        templates = self._days.get(day_number)
+        if templates is None:
+            templates = self._days[day_number] = DayTemplates(day_number)
+        return templates
+    
+    def _fields_for_recipient(self, recipient: Dict) -> Dict[str, str]:
+        cached = self._recipient_fields.get(id(recipient))
+        if cached is not None and cached[0] is recipient:
+            return cached[1]
+        
+        topics = recipient.get("topics", ["funding"])
+        topic_str = topics[0].replace("_", " ").title() if topics else "Funding"
+        fields = {
+            "name": str(recipient.get("name", "there")),
+            "org": str(recipient.get("organization", "your organization")),
+            "subject_org": str(recipient.get("organization", "")),
+            "topic_str": topic_str,
+            "topic_lower": topic_str.lower()
+        }
+        self._recipient_fields[id(recipient)] = (recipient, fields)
+        return fields
+    
+    def _fields_for_event(self, event: Dict) -> Dict[str, str]:
+        cached = self._event_fields.get(id(event))
+        if cached is not None and cached[0] is event:
+            return cached[1]
+        
+        metadata = event.get("metadata", {})
+        fields = {
+            "title": str(event.get("title", "this opportunity")),
+            "subject_title": str(event.get("title", "")),
+            "organizer": str(event.get("organizer", "the organizer")),
+            "amount": str(metadata.get("amount_range", "grants available")),
+            "deadline": str(metadata.get("application_deadline", "the deadline"))
+        }
+        self._event_fields[id(event)] = (event, fields)
+        return fields
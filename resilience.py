@@ -0,0 +1,264 @@
+"""
+resilience.py - Retry Policies and Circuit Breaker for LLM Requests
+
+Failed requests are classified (rate_limit, server, timeout, connection,
+parse, client, other) and retried according to that class's RetryPolicy
+with full-jitter exponential backoff; a Retry-After header on the error
+takes precedence over the computed delay. The Groq SDK's own retries are
+disabled so this is the only retry layer.
+
+A circuit breaker counts consecutive failed calls (retries exhausted or not
+retryable). After `threshold` of them it opens: every later call fails fast
+with CircuitOpenError, and callers render the deterministic fallback
+instead of queueing requests against a degraded provider. A parse error
+resets the count, since the provider did answer. Without a `cooldown` the
+breaker stays open for the rest of the batch; with one (the serve daemon),
+a single probe call is let through once `cooldown` seconds have passed
+(half-open): success closes the breaker, failure restarts the cool-down.
+
+Usage:
+    resilience = ResilientCaller(breaker_threshold=5)
+    try:
+        result = resilience.call(lambda: client.chat.completions.create(...))
+    except CircuitOpenError:
+        ...  # deterministic fallback
+    counters = resilience.summary()
+"""
+
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+MAX_RETRY_AFTER = 120.0  # Longest server-requested wait we honor (seconds)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How often and how long to retry one error class"""
+    max_retries: int = 0
+    base_delay: float = 0.5   # Seconds; doubles per attempt
+    max_delay: float = 30.0
+
+
+RETRY_POLICIES: Dict[str, RetryPolicy] = {
+    "rate_limit": RetryPolicy(6, 1.0, 60.0),
+    "server": RetryPolicy(3, 0.5, 20.0),
+    "timeout": RetryPolicy(2, 1.0, 10.0),
+    "connection": RetryPolicy(3, 0.5, 10.0),
+    "parse": RetryPolicy(1, 0.0, 0.0),       # Sampling again often yields valid JSON
+    "client": RetryPolicy(0),                # 4xx other than 429: the request itself is wrong
+    "other": RetryPolicy(0)
+}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling once the circuit breaker is open"""
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def error_class(exc: BaseException) -> str:
+    """
+    Retry class of an exception (works on Groq SDK errors and plain exceptions)
+
+    An exception may name its class in a `retry_class` attribute.
+    """
+    declared = getattr(exc, "retry_class", None)
+    if declared is not None:
+        return declared
+    if isinstance(exc, json.JSONDecodeError):
+        return "parse"
+    status = _status_code(exc)
+    name = type(exc).__name__
+    if status == 429 or "RateLimit" in name:
+        return "rate_limit"
+    if status == 408 or "Timeout" in name or isinstance(exc, TimeoutError):
+        return "timeout"
+    if status is not None and status >= 500:
+        return "server"
+    if status is not None and 400 <= status < 500:
+        return "client"
+    if "Connection" in name or isinstance(exc, ConnectionError):
+        return "connection"
+    return "other"
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Seconds from the error response's Retry-After header (delta or HTTP date), if any"""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    value = headers.get("retry-after") if headers is not None else None
+    if value is None:
+        value = getattr(exc, "retry_after", None)
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    from email.utils import parsedate_to_datetime
+    try:
+        when = parsedate_to_datetime(str(value))
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(
+    policy: RetryPolicy,
+    attempt: int,
+    server_delay: Optional[float] = None,
+    rng: Callable[[], float] = random.random
+) -> float:
+    """
+    Wait before retry number `attempt` (0-based)
+
+    Full jitter: uniform in [0, min(max_delay, base_delay * 2^attempt)].
+    A server-requested delay wins, plus up to one base delay of jitter so
+    concurrent workers don't retry in lockstep.
+    """
+    if server_delay is not None:
+        return min(server_delay, MAX_RETRY_AFTER) + rng() * policy.base_delay
+    return rng() * min(policy.max_delay, policy.base_delay * (2 ** attempt))
+
+
+class ResilientCaller:
+    """Retries calls per error class and trips a shared circuit breaker; thread-safe"""
+
+    def __init__(
+        self,
+        breaker_threshold: int = 5,
+        policies: Optional[Dict[str, RetryPolicy]] = None,
+        sleep: Callable[[float], None] = time.sleep,
+        rng: Callable[[], float] = random.random,
+        cooldown: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.breaker_threshold = breaker_threshold
+        self.policies = policies or RETRY_POLICIES
+        self.sleep = sleep
+        self.rng = rng
+        self.cooldown = cooldown
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Close the breaker and zero the counters (start of a batch)"""
+        self.consecutive_failures = 0
+        self.is_open = False
+        self.opened_at = 0.0
+        self._probing = False
+        self.counters: Dict[str, Any] = {
+            "succeeded": 0,
+            "recovered": 0,       # Succeeded after at least one retry
+            "retries": 0,
+            "failed": 0,          # Retries exhausted or not retryable
+            "short_circuited": 0, # Not attempted: breaker open
+            "breaker_trips": 0,
+            "breaker_closes": 0,  # Half-open probes that succeeded
+            "failures_by_class": {}
+        }
+
+    def _failed(self, kind: str, probe: bool = False) -> None:
+        with self._lock:
+            self.counters["failed"] += 1
+            self.counters["failures_by_class"][kind] = self.counters["failures_by_class"].get(kind, 0) + 1
+            if kind == "parse":
+                # The provider answered; only the content was unusable
+                self.consecutive_failures = 0
+                if probe:
+                    self._close()
+                return
+            self.consecutive_failures += 1
+            if probe:
+                # Still down: wait another cool-down before the next probe
+                self._probing = False
+                self.opened_at = self.clock()
+                return
+            if self.breaker_threshold > 0 and not self.is_open and self.consecutive_failures >= self.breaker_threshold:
+                self.is_open = True
+                self.opened_at = self.clock()
+                self.counters["breaker_trips"] += 1
+                print(f"🔌 Circuit breaker open after {self.consecutive_failures} consecutive failed requests; "
+                      f"remaining emails use deterministic mode")
+
+    def _admit(self) -> Optional[bool]:
+        """False: breaker closed; True: this call probes the open breaker; None: short-circuit"""
+        with self._lock:
+            if not self.is_open:
+                return False
+            if self.cooldown is None or self._probing or self.clock() - self.opened_at < self.cooldown:
+                return None
+            self._probing = True
+            return True
+
+    def _close(self) -> None:
+        """Close an open breaker after a successful probe; caller holds the lock"""
+        if self.is_open:
+            self.is_open = False
+            self._probing = False
+            self.counters["breaker_closes"] += 1
+            print("🔌 Circuit breaker closed: the provider answered again")
+
+    def _short_circuit(self) -> CircuitOpenError:
+        with self._lock:
+            self.counters["short_circuited"] += 1
+        return CircuitOpenError(f"{self.consecutive_failures} consecutive failed requests")
+
+    def call(self, fn: Callable[[], Any], record: Optional[Dict] = None) -> Any:
+        """
+        Run fn() with retries; raises its last error, or CircuitOpenError
+
+        `record` (e.g. an LLM call record) gets its "retries" incremented
+        per retry.
+        """
+        attempt = 0
+        while True:
+            probe = self._admit()
+            if probe is None:
+                raise self._short_circuit()
+            try:
+                result = fn()
+            except Exception as e:
+                kind = error_class(e)
+                policy = self.policies.get(kind, self.policies["other"])
+                # A probe gets no retries; the next one waits for the cool-down
+                if probe or attempt >= policy.max_retries:
+                    self._failed(kind, probe)
+                    raise
+                delay = backoff_delay(policy, attempt, retry_after(e), self.rng)
+                attempt += 1
+                with self._lock:
+                    self.counters["retries"] += 1
+                if record is not None:
+                    record["retries"] = record.get("retries", 0) + 1
+                if delay > 0:
+                    self.sleep(delay)
+                continue
+            with self._lock:
+                self.consecutive_failures = 0
+                self.counters["succeeded"] += 1
+                if attempt:
+                    self.counters["recovered"] += 1
+                if probe:
+                    self._close()
+            return result
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(
+                self.counters,
+                failures_by_class=dict(self.counters["failures_by_class"]),
+                breaker_open=self.is_open
+            )
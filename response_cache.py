@@ -0,0 +1,120 @@
+"""
+response_cache.py - Content-Addressed Cache for AI-Generated Emails
+
+Persists parsed Groq responses in SQLite, keyed by a SHA-256 of everything
+that determines the completion: system prompt, rendered user prompt, model
+and temperature. A warm re-run with unchanged inputs never calls the API.
+
+Eviction:
+- Entries older than `max_age_days` are dropped
+- Beyond `max_entries`, the least recently used entries are dropped
+
+Usage:
+    cache = ResponseCache("./data/cache/responses.sqlite3")
+    key = cache.make_key(SYSTEM_PROMPT, user_prompt, model, 0.7)
+    hit = cache.get(key)
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+
+class ResponseCache:
+    """SQLite-backed response cache with size/age eviction and hit/miss counters"""
+
+    def __init__(self, path: str, max_entries: int = 100_000, max_age_days: float = 30):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 86400
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Shared by worker threads (see async_generation); guarded by a lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " response TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON responses(accessed_at)")
+        self._conn.commit()
+        self.evict()
+
+    @staticmethod
+    def make_key(system_prompt: str, user_prompt: str, model: str, temperature: float) -> str:
+        """Stable content hash of the full request"""
+        payload = json.dumps(
+            [system_prompt, user_prompt, model, temperature],
+            ensure_ascii=False, separators=(",", ":")
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            now = time.time()
+            if row is None or now - row[1] > self.max_age:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, response: Dict) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?)",
+                (key, json.dumps(response, ensure_ascii=False), now, now)
+            )
+            self._conn.commit()
+            self.stores += 1
+
+    def evict(self) -> int:
+        """Drop expired entries, then LRU entries beyond max_entries"""
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM responses WHERE created_at < ?", (time.time() - self.max_age,)
+            )
+            removed = cur.rowcount
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+            if count > self.max_entries:
+                cur = self._conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    " SELECT key FROM responses ORDER BY accessed_at LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+                removed += cur.rowcount
+            self._conn.commit()
+        self.evictions += removed
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions
+        }
+
+    def close(self) -> None:
+        self.evict()
+        with self._lock:
+            self._conn.close()
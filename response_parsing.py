@@ -0,0 +1,226 @@
+"""
+response_parsing.py - Parsing and Schema Check of LLM Responses
+
+Completions are decoded with the fastest available JSON backend (orjson,
+then msgspec, then the standard library). When the text is not clean JSON
+(prose around it, a markdown fence, trailing commas) the largest valid JSON
+object in it is recovered instead of discarding the response.
+
+The decoded object is checked against the OUTPUT FORMAT of SYSTEM_PROMPT
+by a compiled check: a well-formed response costs a few type tests.
+Cheap, safe repairs are applied in place (missing warnings list, missing
+verification block, subject/body at top level); a response without a usable
+subject and body is rejected.
+
+Every response gets a status:
+- valid     parsed directly and matched the schema
+- repaired  usable after extraction or a schema repair (see `repairs`)
+- rejected  nothing usable; the caller retries or falls back
+
+Usage:
+    parsed = parse_email_response(text)
+    if parsed.status == REJECTED:
+        raise ResponseRejected(parsed.error)
+    content = parsed.data
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+_backend: Optional[Tuple[str, Callable[[str], Any], Any]] = None
+
+
+def json_backend() -> Tuple[str, Callable[[str], Any], Any]:
+    """(name, loads, decode error) of the fastest JSON library, imported on first use"""
+    global _backend
+    if _backend is None:
+        try:
+            import orjson
+            _backend = ("orjson", orjson.loads, orjson.JSONDecodeError)
+        except ImportError:
+            try:
+                import msgspec
+                _backend = ("msgspec", msgspec.json.decode, msgspec.DecodeError)
+            except ImportError:
+                _backend = ("json", json.loads, json.JSONDecodeError)
+    return _backend
+
+
+VALID = "valid"
+REPAIRED = "repaired"
+REJECTED = "rejected"
+
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+
+class ResponseRejected(ValueError):
+    """A response with no usable email; retried like a JSON parse error"""
+    retry_class = "parse"
+
+
+@dataclass
+class ParsedResponse:
+    status: str
+    data: Any = None
+    repairs: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+def loads(text: str) -> Any:
+    """Decode JSON with the fast backend; raises json.JSONDecodeError"""
+    _, fast_loads, decode_error = json_backend()
+    try:
+        return fast_loads(text)
+    except decode_error as e:
+        if isinstance(e, json.JSONDecodeError):
+            raise
+        raise json.JSONDecodeError(str(e), text, 0) from None
+
+
+def _strip_fence(text: str) -> str:
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("```")[1]
+        if text.startswith("json"):
+            text = text[4:]
+    return text.strip()
+
+
+def extract_largest_object(text: str) -> Optional[Dict]:
+    """
+    Largest top-level JSON object embedded anywhere in `text`, or None
+
+    Each "{" is tried as a start; after a successful decode the scan resumes
+    past that object, so nested objects are never decoded on their own.
+    """
+    decoder = json.JSONDecoder()
+    best, best_len = None, 0
+    idx = text.find("{")
+    while idx != -1:
+        try:
+            obj, end = decoder.raw_decode(text, idx)
+        except ValueError:
+            idx = text.find("{", idx + 1)
+            continue
+        if isinstance(obj, dict) and end - idx > best_len:
+            best, best_len = obj, end - idx
+        idx = text.find("{", end)
+    return best
+
+
+def decode(text: Any) -> Tuple[Any, List[str]]:
+    """JSON value of a completion plus the repairs needed; raises json.JSONDecodeError"""
+    if not isinstance(text, str):
+        raise json.JSONDecodeError("completion has no text", "", 0)
+    cleaned = _strip_fence(text)
+    try:
+        return loads(cleaned), []
+    except json.JSONDecodeError as e:
+        error = e
+    uncomma = _TRAILING_COMMA.sub(r"\1", cleaned)
+    if uncomma != cleaned:
+        try:
+            return loads(uncomma), ["trailing_commas"]
+        except json.JSONDecodeError:
+            pass
+    # Without the commas first: otherwise a nested object would beat the broken outer one
+    if uncomma != cleaned:
+        obj = extract_largest_object(uncomma)
+        if obj is not None:
+            return obj, ["extracted", "trailing_commas"]
+    obj = extract_largest_object(cleaned)
+    if obj is not None:
+        return obj, ["extracted"]
+    raise error
+
+
+def _nonempty_str(value: Any) -> bool:
+    return isinstance(value, str) and value.strip() != ""
+
+
+def compile_email_check(
+    required: Tuple[str, ...] = ("email", "verification", "warnings")
+) -> Callable[[Any], Tuple[Optional[str], List[str]]]:
+    """
+    Build the schema check for one email object (single or batched response)
+
+    The check returns (error, repairs): error is None when the object is
+    usable; repairs lists the fixes applied to it in place.
+    """
+    required_set = frozenset(required)
+
+    def check(data: Any) -> Tuple[Optional[str], List[str]]:
+        if not isinstance(data, dict):
+            return "response is not a JSON object", []
+        email = data.get("email")
+        # Fast path: everything where SYSTEM_PROMPT puts it
+        if (
+            required_set <= data.keys()
+            and type(email) is dict
+            and _nonempty_str(email.get("subject"))
+            and _nonempty_str(email.get("body"))
+            and type(data["verification"]) is dict
+            and type(data["warnings"]) is list
+            and type(data.get("internal_reasoning", {})) is dict
+        ):
+            return None, []
+
+        repairs: List[str] = []
+        if email is None and _nonempty_str(data.get("subject")) and _nonempty_str(data.get("body")):
+            email = data["email"] = {"subject": data.pop("subject"), "body": data.pop("body")}
+            repairs.append("email_wrapped")
+        if not isinstance(email, dict):
+            return "missing email object", repairs
+        if not (_nonempty_str(email.get("subject")) and _nonempty_str(email.get("body"))):
+            return "email.subject/email.body missing or empty", repairs
+
+        warnings = data.get("warnings")
+        if not isinstance(warnings, list):
+            data["warnings"] = [] if warnings is None else [str(warnings)]
+            repairs.append("warnings")
+        if not isinstance(data.get("verification"), dict):
+            # Never claim verification the model did not give
+            data["verification"] = {"all_data_from_json": False}
+            data["warnings"].append("Response had no verification block")
+            repairs.append("verification")
+        if "internal_reasoning" in data and not isinstance(data["internal_reasoning"], dict):
+            del data["internal_reasoning"]
+            repairs.append("internal_reasoning")
+        return None, repairs
+
+    return check
+
+
+check_email = compile_email_check()
+
+
+def parse_email_response(text: Any) -> ParsedResponse:
+    """Decode and check a single-email completion"""
+    try:
+        data, repairs = decode(text)
+    except json.JSONDecodeError as e:
+        return ParsedResponse(REJECTED, error=f"no JSON object: {e}")
+    error, fixes = check_email(data)
+    if error is not None:
+        return ParsedResponse(REJECTED, repairs=repairs + fixes, error=error)
+    repairs += fixes
+    return ParsedResponse(REPAIRED if repairs else VALID, data, repairs)
+
+
+def parse_batch_response(text: Any) -> ParsedResponse:
+    """
+    Decode a batched completion into its list of items
+
+    Items are not checked here; run check_email() on each, since one bad
+    item must not reject its siblings.
+    """
+    try:
+        data, repairs = decode(text)
+    except json.JSONDecodeError as e:
+        return ParsedResponse(REJECTED, error=f"no JSON object: {e}")
+    items = data.get("emails") if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        return ParsedResponse(REJECTED, repairs=repairs, error="no emails array")
+    return ParsedResponse(REPAIRED if repairs else VALID, items, repairs)
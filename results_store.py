@@ -0,0 +1,212 @@
+"""
+results_store.py - SQLite Results Store for Generated Emails
+
+Every result generate_batch writes to a day file is also stored as one row
+in SQLite (WAL mode), indexed by recipient_id, event_id, day and status, so
+"what did r_002 get on Day 5?" is an index lookup instead of a reparse of
+the day files.
+
+Results are stored as compact JSON (orjson when installed). Rows are
+inserted one transaction per chunk, tagged with the run id. A
+run's rows become visible only when finish_run() points its days at it
+(and drops the rows of the runs it replaces), so queries never see a
+half-written run, the same guarantee the atomic day files give.
+
+Several runs may write to one store at once (serve daemon batches,
+concurrent CLI runs), so each run is registered in a runs table as
+running until finish_run(); abort_run() drops a failed run at once.
+Cleanup only touches rows of this run and of runs still marked running
+after `stale_after` seconds (a killed process never aborts its run).
+
+Usage:
+    store = ResultsStore("./data/generated/results.sqlite3")
+    store.begin_run(run_id)
+    store.add(run_id, {"5": [result, ...]})
+    store.finish_run(run_id, ["5"], finished_at)     # or store.abort_run(run_id)
+    results = store.query(recipient_id="r_002", day="5")
+
+`brain.py query` reads every store find_stores() lists: the output
+directory's own and one per --due window (due_*/).
+"""
+
+import glob
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+try:
+    import orjson
+
+    def _dumps(result: Dict) -> str:
+        return orjson.dumps(result, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+
+    _loads: Callable[[str], Any] = orjson.loads
+except ImportError:
+    def _dumps(result: Dict) -> str:
+        return json.dumps(result, ensure_ascii=False, separators=(",", ":"))
+
+    _loads = json.loads
+
+STORE_FILENAME = "results.sqlite3"
+STALE_RUN_SECONDS = 24 * 3600  # An unfinished run this old is presumed dead
+
+
+def find_stores(output_dir: str) -> List[str]:
+    """Existing stores under output_dir: its own, then each --due window's"""
+    own = os.path.join(output_dir, STORE_FILENAME)
+    windows = sorted(glob.glob(os.path.join(glob.escape(output_dir), "due_*", STORE_FILENAME)))
+    return ([own] if os.path.exists(own) else []) + windows
+
+
+class ResultsStore:
+    """Generated results by run, recipient, event, day and status"""
+
+    def __init__(self, path: str, stale_after: float = STALE_RUN_SECONDS):
+        self.path = path
+        self.stale_after = stale_after
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Shared by the serve daemon's handler and batch threads; guarded by a lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA cache_size=-65536")  # 64 MB: index upkeep on large runs
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " run_id TEXT NOT NULL,"
+            " day TEXT NOT NULL,"
+            " recipient_id TEXT,"
+            " event_id TEXT,"
+            " status TEXT,"
+            " reason TEXT,"
+            " subject TEXT,"
+            " result TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS idx_recipient ON results(recipient_id);"
+            "CREATE INDEX IF NOT EXISTS idx_event ON results(event_id);"
+            "CREATE INDEX IF NOT EXISTS idx_day_status ON results(day, status);"
+            # The run whose results are current for each day
+            "CREATE TABLE IF NOT EXISTS days ("
+            " day TEXT PRIMARY KEY,"
+            " run_id TEXT NOT NULL,"
+            " finished_at TEXT);"
+            # Every run that may still own rows: running or finished
+            "CREATE TABLE IF NOT EXISTS runs ("
+            " run_id TEXT PRIMARY KEY,"
+            " status TEXT NOT NULL,"
+            " started_at REAL NOT NULL);"
+        )
+        self._conn.commit()
+
+    def begin_run(self, run_id: str) -> None:
+        """
+        Register a running run and drop dead leftovers
+
+        Removes rows of an earlier attempt at this run id, of runs still
+        running after stale_after seconds, and of runs the runs table does
+        not know (stores written before it existed). Rows of other live
+        runs are kept.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM runs WHERE run_id = ? OR (status = 'running' AND started_at < ?)",
+                (run_id, now - self.stale_after)
+            )
+            self._conn.execute(
+                "INSERT INTO runs (run_id, status, started_at) VALUES (?, 'running', ?)", (run_id, now)
+            )
+            self._conn.execute(
+                "DELETE FROM results WHERE run_id = ? OR"
+                " (run_id NOT IN (SELECT run_id FROM runs) AND run_id NOT IN (SELECT run_id FROM days))",
+                (run_id,)
+            )
+
+    def add(self, run_id: str, outputs: Dict[str, List[Dict]]) -> None:
+        """Insert one chunk of results (day → results) in a single transaction"""
+        rows = []
+        for day, results in outputs.items():
+            for result in results:
+                meta = result.get("meta") or {}
+                email = result.get("email") or {}
+                rows.append((
+                    run_id, day, meta.get("recipient_id"), meta.get("event_id"),
+                    meta.get("status"), meta.get("reason"), email.get("subject"),
+                    _dumps(result)
+                ))
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def finish_run(self, run_id: str, days: Iterable[str], finished_at: str) -> None:
+        """Make the run current for its days, dropping the finished rows it replaces"""
+        days = list(days)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO days (day, run_id, finished_at) VALUES (?, ?, ?)",
+                [(day, run_id, finished_at) for day in days]
+            )
+            self._conn.execute("UPDATE runs SET status = 'finished' WHERE run_id = ?", (run_id,))
+            self._conn.execute(
+                f"DELETE FROM results WHERE day IN ({', '.join('?' * len(days))}) AND run_id != ?"
+                " AND run_id NOT IN (SELECT run_id FROM runs WHERE status = 'running')",
+                (*days, run_id)
+            )
+            # Finished runs no longer current for any day
+            self._conn.execute(
+                "DELETE FROM runs WHERE status = 'finished' AND run_id NOT IN (SELECT run_id FROM days)"
+            )
+
+    def abort_run(self, run_id: str) -> None:
+        """Drop the rows of a run that failed; it never becomes current"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM results WHERE run_id = ?", (run_id,))
+            self._conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+
+    def query(
+        self,
+        recipient_id: Optional[str] = None,
+        event_id: Optional[str] = None,
+        day: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict]:
+        """Current results matching every given filter, by day then generation order"""
+        clauses, params = [], []
+        for column, value in (
+            ("recipient_id", recipient_id), ("event_id", event_id), ("day", day), ("status", status)
+        ):
+            if value is not None:
+                clauses.append(f"r.{column} = ?")
+                params.append(value)
+        sql = "SELECT r.result FROM results r JOIN days d ON d.day = r.day AND d.run_id = r.run_id"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY r.day, r.rowid"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [_loads(row[0]) for row in rows]
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        """Current result counts: day → status → n"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT r.day, r.status, COUNT(*) FROM results r"
+                " JOIN days d ON d.day = r.day AND d.run_id = r.run_id"
+                " GROUP BY r.day, r.status ORDER BY r.day"
+            ).fetchall()
+        counts: Dict[str, Dict[str, int]] = {}
+        for day, status, n in rows:
+            counts.setdefault(day, {})[status] = n
+        return counts
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,162 @@
+"""
+run_journal.py - Checkpointed Run Journal for Resumable Batches
+
+Every generated (day, recipient, event) result of a run is appended to a
+spool file and recorded in a journal with its byte offset, so a run that
+crashes or is killed can be resumed without paying for the same AI calls
+again. Layout of data/runs/<run_id>/:
+
+- run.json       parameters of the run (inputs, days, options, clock snapshot)
+- results.jsonl  spooled results, one per line
+- journal.jsonl  one checkpoint per line: {"end": spool size, "entries": [[day, r, e, offset], ...]}
+
+Checkpoints are written in batches of `flush_every` results: the spool is
+fsynced first, then the checkpoint line is appended and fsynced. A torn
+last line (or spool bytes past the last checkpoint) is discarded on open.
+
+Usage:
+    journal = RunJournal.create(runs_dir, new_run_id(), params)
+    journal.record(day, recipient_idx, event_idx, result)
+    journal.close(completed=True)
+
+    journal = RunJournal.open(runs_dir, run_id)
+    result = journal.get(day, recipient_idx, event_idx)   # None if not done
+"""
+
+import json
+import os
+import secrets
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from output_writers import atomic_write_json
+
+PairKey = Tuple[str, int, int]
+
+
+def new_run_id() -> str:
+    """Sortable, unique run id, e.g. 20261017-093000-3fa2c1"""
+    return f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(3)}"
+
+
+def input_fingerprint(paths: Sequence[str]) -> Dict[str, List[int]]:
+    """[size, mtime_ns] per input file, to detect inputs edited between resumes"""
+    fingerprint = {}
+    for path in paths:
+        st = os.stat(path)
+        fingerprint[path] = [st.st_size, st.st_mtime_ns]
+    return fingerprint
+
+
+class RunJournal:
+    """Append-only result spool plus batched checkpoints of completed pairs"""
+
+    def __init__(self, run_dir: str, header: Dict, flush_every: int = 100):
+        self.run_dir = run_dir
+        self.header = header
+        self.flush_every = max(1, flush_every)
+        self.header_path = os.path.join(run_dir, "run.json")
+        self.spool_path = os.path.join(run_dir, "results.jsonl")
+        self.journal_path = os.path.join(run_dir, "journal.jsonl")
+        self.offsets: Dict[PairKey, int] = {}
+        self.resumed = 0
+        self._pending: List[list] = []
+
+        end = self._load_checkpoints()
+        self.resumed = len(self.offsets)
+        # Drop results written after the last checkpoint
+        with open(self.spool_path, 'ab') as spool:
+            spool.truncate(end)
+        self._spool = open(self.spool_path, 'ab')
+        self._reader = open(self.spool_path, 'rb')
+        self._journal = open(self.journal_path, 'ab')
+
+    @property
+    def run_id(self) -> str:
+        return self.header["run_id"]
+
+    @classmethod
+    def create(cls, runs_dir: str, run_id: str, params: Dict, flush_every: int = 100) -> "RunJournal":
+        run_dir = os.path.join(runs_dir, run_id)
+        os.makedirs(run_dir, exist_ok=False)
+        header = {
+            "run_id": run_id,
+            "created_at": datetime.now().isoformat(),
+            "status": "running",
+            "params": params
+        }
+        atomic_write_json(os.path.join(run_dir, "run.json"), header)
+        return cls(run_dir, header, flush_every)
+
+    @classmethod
+    def open(cls, runs_dir: str, run_id: str, flush_every: int = 100) -> "RunJournal":
+        run_dir = os.path.join(runs_dir, run_id)
+        header_path = os.path.join(run_dir, "run.json")
+        if not os.path.exists(header_path):
+            raise FileNotFoundError(f"No run journal for run id {run_id} in {runs_dir}")
+        with open(header_path, 'r', encoding='utf-8') as f:
+            header = json.load(f)
+        return cls(run_dir, header, flush_every)
+
+    def _load_checkpoints(self) -> int:
+        """Read complete checkpoint lines; returns the committed spool size"""
+        end = 0
+        good = 0
+        if not os.path.exists(self.journal_path):
+            return end
+        with open(self.journal_path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    checkpoint = json.loads(line)
+                except ValueError:
+                    break
+                for day, r_idx, e_idx, offset in checkpoint["entries"]:
+                    self.offsets[(day, r_idx, e_idx)] = offset
+                end = checkpoint["end"]
+                good += len(line)
+        # Cut a torn trailing checkpoint
+        with open(self.journal_path, 'ab') as f:
+            f.truncate(good)
+        return end
+
+    def get(self, day: str, recipient_idx: int, event_idx: int) -> Optional[Dict]:
+        """Spooled result for a completed pair, or None"""
+        offset = self.offsets.get((day, recipient_idx, event_idx))
+        if offset is None:
+            return None
+        if self._pending:
+            self._spool.flush()
+        self._reader.seek(offset)
+        return json.loads(self._reader.readline())
+
+    def record(self, day: str, recipient_idx: int, event_idx: int, result: Dict) -> None:
+        """Spool a completed result; checkpointed with the next batch"""
+        offset = self._spool.tell()
+        self._spool.write(json.dumps(result, ensure_ascii=False).encode("utf-8") + b"\n")
+        self.offsets[(day, recipient_idx, event_idx)] = offset
+        self._pending.append([day, recipient_idx, event_idx, offset])
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        """Make spooled results durable, then commit them in one checkpoint line"""
+        if not self._pending:
+            return
+        self._spool.flush()
+        os.fsync(self._spool.fileno())
+        checkpoint = {"end": self._spool.tell(), "entries": self._pending}
+        self._journal.write(json.dumps(checkpoint, separators=(",", ":")).encode("utf-8") + b"\n")
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self._pending = []
+
+    def close(self, completed: bool = False) -> None:
+        self.flush()
+        self._spool.close()
+        self._reader.close()
+        self._journal.close()
+        self.header["status"] = "completed" if completed else "interrupted"
+        self.header["updated_at"] = datetime.now().isoformat()
+        atomic_write_json(self.header_path, self.header)
@@ -0,0 +1,178 @@
+"""
+scheduler.py - Send-Time Scheduler for the 7-Day Sequence
+
+Every event's start_date (T) fixes the send time of each day in the
+EMAIL_TYPES cadence, in IST:
+
+- Day 0/1/3/5/6  T minus (7 - day) days, e.g. Day 6 goes out 24h before T
+- Day 7a         T - 6 hours ("Going LIVE in 6 hours")
+- Day 7b         T - 60 minutes ("Starting in 60 minutes")
+
+The send time depends only on the event and the day, so the scheduler keeps
+one slot per (event, day) in a min-heap ordered by send time, not one per
+recipient pair. Popping a window yields the slots due in it; generation
+then renders only those (event, day) combinations for their recipients.
+
+Windows are chained: the end of the last processed window is kept per
+events file in a small state file (schedule.json next to the run
+journals), and the next window starts from it, so a late or skipped run
+catches up instead of losing the slots in between. A slot whose send time
+passed unprocessed is still sent late while its event has not started;
+only then is it expired.
+
+Usage:
+    scheduler = SendScheduler(events)
+    slots = scheduler.pop_due(window_start, window_end, processed_until)
+    by_day = slots_by_day(slots)        # {"7a": {"evt_001", ...}, ...}
+    save_window_end(state_path, events_file, window_end)
+"""
+
+import heapq
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from output_writers import atomic_write_json
+
+try:
+    from templates import EMAIL_TYPES
+    SEQUENCE: Tuple[str, ...] = tuple(str(day) for day in EMAIL_TYPES)
+except ImportError:
+    SEQUENCE = ("0", "1", "3", "5", "6", "7a", "7b")
+
+SCHEDULE_STATE = "schedule.json"  # Last processed window end per events file, under RUNS_DIR
+IST = timezone(timedelta(hours=5, minutes=30), "IST")  # No DST, so a fixed offset (no pytz)
+EVENT_DAY = 7
+
+# Event-day sends are hours before the start; other days are whole days before
+SEND_OFFSETS: Dict[str, timedelta] = {
+    "7a": timedelta(hours=-6),
+    "7b": timedelta(minutes=-60),
+}
+
+
+def send_offset(day: str) -> timedelta:
+    """Offset of a sequence day's send time from the event start"""
+    if day in SEND_OFFSETS:
+        return SEND_OFFSETS[day]
+    if not day.isdigit():
+        raise ValueError(f"Unknown sequence day: {day}")
+    return timedelta(days=int(day) - EVENT_DAY)
+
+
+def parse_start(start_date: str) -> datetime:
+    """Parse an event start_date to an aware IST datetime (naive values are IST)"""
+    if not isinstance(start_date, str):
+        raise ValueError(f"start_date must be a string, got {type(start_date).__name__}")
+    try:
+        dt = datetime.fromisoformat(start_date.replace("Z", "+00:00"))
+    except ValueError:
+        from dateutil import parser as dateparse
+        dt = dateparse.parse(start_date)
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=IST)
+    return dt.astimezone(IST)
+
+
+@dataclass(order=True)
+class SendSlot:
+    """One (event, day) send; ordered by send time"""
+    send_at: datetime
+    event_idx: int
+    day: str
+    event_id: Optional[str] = field(default=None, compare=False)
+    event_start: Optional[datetime] = field(default=None, compare=False)
+
+
+class SendScheduler:
+    """Min-heap of (event, day) slots; events without a usable start_date are listed in `unschedulable`"""
+
+    def __init__(self, events: Sequence[Dict], days: Iterable[str] = SEQUENCE):
+        self.days = tuple(days)
+        offsets = [(day, send_offset(day)) for day in self.days]
+        self.unschedulable: List[Tuple[Optional[str], str]] = []
+        self.expired = 0
+        self.late = 0
+        self.heap: List[SendSlot] = []
+        for event_idx, event in enumerate(events):
+            try:
+                start = parse_start(event.get("start_date"))
+            except (ValueError, OverflowError) as e:
+                self.unschedulable.append((event.get("event_id"), str(e)))
+                continue
+            for day, offset in offsets:
+                self.heap.append(SendSlot(start + offset, event_idx, day, event.get("event_id"), start))
+        heapq.heapify(self.heap)
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+    def peek(self) -> Optional[SendSlot]:
+        """Next slot to go out, without removing it"""
+        return self.heap[0] if self.heap else None
+
+    def pop_due(
+        self,
+        window_start: datetime,
+        window_end: datetime,
+        processed_until: Optional[datetime] = None
+    ) -> List[SendSlot]:
+        """
+        Remove and return the slots due by window_end
+
+        Slots before `processed_until` were handled by an earlier window and
+        are dropped. Other slots before window_start are returned as late
+        sends (counted in `late`) while their event has not started by
+        window_start, and dropped as `expired` once it has.
+        """
+        due = []
+        while self.heap and self.heap[0].send_at < window_end:
+            slot = heapq.heappop(self.heap)
+            if processed_until is not None and slot.send_at < processed_until:
+                continue
+            if slot.send_at < window_start:
+                if slot.event_start <= window_start:
+                    self.expired += 1
+                    continue
+                self.late += 1
+            due.append(slot)
+        return due
+
+
+def slots_by_day(slots: Iterable[SendSlot]) -> Dict[str, Set[str]]:
+    """Event ids due per day, days in sequence order (events without an id cannot be addressed)"""
+    by_day: Dict[str, Set[str]] = {}
+    for slot in slots:
+        if slot.event_id is not None:
+            by_day.setdefault(slot.day, set()).add(slot.event_id)
+    return {day: by_day[day] for day in sorted(by_day, key=_sequence_pos)}
+
+
+def _sequence_pos(day: str) -> int:
+    return SEQUENCE.index(day) if day in SEQUENCE else len(SEQUENCE)
+
+
+def load_window_end(state_path: str, events_file: str) -> Optional[datetime]:
+    """End of the last processed window for an events file (None before the first)"""
+    if not os.path.exists(state_path):
+        return None
+    with open(state_path, 'r', encoding='utf-8') as f:
+        windows = json.load(f).get("windows", {})
+    value = windows.get(os.path.abspath(events_file))
+    return datetime.fromisoformat(value) if value else None
+
+
+def save_window_end(state_path: str, events_file: str, window_end: datetime) -> None:
+    """Record window_end as processed for an events file (never moves backwards)"""
+    state = {"windows": {}}
+    if os.path.exists(state_path):
+        with open(state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    key = os.path.abspath(events_file)
+    previous = state["windows"].get(key)
+    if previous is None or datetime.fromisoformat(previous) < window_end:
+        state["windows"][key] = window_end.isoformat()
+    os.makedirs(os.path.dirname(state_path) or ".", exist_ok=True)
+    atomic_write_json(state_path, state)
@@ -0,0 +1,415 @@
+"""
+server.py - Long-Running Generation Daemon (python brain.py serve)
+
+Keeps everything a CLI run rebuilds on every invocation warm: imports and
+prompt templates, the events file and its validation, the fallback
+renderer's compiled templates and per-event fields, and (in AI mode) the
+Groq client plus response cache. Single pairs are rendered in-process on
+the request thread; batches run one at a time on a background worker and
+report progress after every chunk.
+
+Served over localhost HTTP or a Unix socket, JSON in and out:
+
+    GET  /health          events loaded, mode, uptime, batch counts
+    POST /render          {"recipient": {...}, "event_id": "...", "day": "1"}
+                          → the same result object a day file holds
+    POST /batches         {"recipients": [...]} or {"recipients_file": path under data_dir}, plus
+                          "days": [...] or "due": {"window_start": iso, "hours": 1}
+                          → 202 {"batch_id": ...}
+    GET  /batches         all batches
+    GET  /batches/<id>    status, progress counters, summary when done
+
+Deadlines are judged against a clock snapshot that is refreshed every
+Config.SERVE_REFRESH_SECONDS; the events file is reloaded then if it changed.
+Each batch runs quietly (no per-pair lines) on its own fork of the AI
+generator, so its LLM metrics and circuit breaker are its own; requests can
+only name recipients files inside Config.SERVE_DATA_DIR. The shared
+generator's breaker half-opens after Config.SERVE_BREAKER_COOLDOWN seconds,
+so /render recovers with the provider. Batch statuses are published as
+fresh dicts under a lock and never mutated afterwards, so handler threads
+can serialize them while the worker moves on.
+
+Usage:
+    python brain.py serve --no-ai                  # http://127.0.0.1:8765
+    python brain.py serve --socket /tmp/brain.sock
+    curl -s localhost:8765/render -d '{"recipient": {...}, "event_id": "evt_001", "day": "1"}'
+"""
+
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from brain import (
+    IST, Config, DeadlineCache, EligibilityPlanner, GroqEmailGenerator, decide_pair,
+    generate_batch, generate_due, generate_email_for_pair, utc_now, validate_recipient
+)
+from ingest import iter_records
+from renderer import FallbackRenderer
+from response_cache import ResponseCache
+from run_journal import new_run_id
+from scheduler import SEQUENCE, parse_start
+
+PROGRESS_KEYS = ("recipients", "total", "generated", "blocked", "skipped")
+
+
+class RequestError(ValueError):
+    """Bad request; carries the HTTP status to answer with"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+class GenerationService:
+    """Warm events/planner/renderer/AI client plus a one-at-a-time batch queue"""
+
+    def __init__(
+        self,
+        events_file: Optional[str] = None,
+        use_ai: bool = False,
+        ai_generator: Optional[GroqEmailGenerator] = None,
+        output_dir: Optional[str] = None,
+        clock: Callable[[], datetime] = utc_now,
+        refresh_seconds: Optional[float] = None,
+        data_dir: Optional[str] = None
+    ):
+        self.events_file = events_file or Config.EVENTS_FILE
+        self.output_dir = output_dir or os.path.join(Config.OUTPUT_DIR, "batches")
+        self.data_dir = os.path.realpath(data_dir or Config.SERVE_DATA_DIR)
+        self.clock = clock
+        self.refresh_seconds = Config.SERVE_REFRESH_SECONDS if refresh_seconds is None else refresh_seconds
+        self.started = time.monotonic()
+        self.renderer = FallbackRenderer()
+
+        self.use_ai = use_ai
+        self.ai_gen = ai_generator
+        if use_ai and self.ai_gen is None:
+            try:
+                self.ai_gen = GroqEmailGenerator()
+            except ValueError as e:
+                print(f"⚠️  {e}")
+                print("   Serving deterministic emails only")
+                self.use_ai = False
+        if self.use_ai and self.ai_gen.cache is None:
+            self.ai_gen.cache = ResponseCache(
+                Config.CACHE_PATH, Config.CACHE_MAX_ENTRIES, Config.CACHE_MAX_AGE_DAYS
+            )
+        if self.use_ai:
+            # Batches stay open once tripped; a daemon has to recover on its own
+            self.ai_gen.resilience.cooldown = Config.SERVE_BREAKER_COOLDOWN
+
+        self._lock = threading.Lock()
+        self._load_events()
+
+        self._batches_lock = threading.Lock()
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self._queue: "queue.Queue[Tuple[str, Dict]]" = queue.Queue()
+        self._worker = threading.Thread(target=self._run_batches, name="batch-worker", daemon=True)
+        self._worker.start()
+
+    # -- events -------------------------------------------------------------
+    def _load_events(self) -> None:
+        self._events_mtime = os.stat(self.events_file).st_mtime_ns
+        events = list(iter_records(self.events_file))
+        # Invalid events stay in, so rendering them reports validation_failed
+        planner = EligibilityPlanner(events, skip_unmatched=False, now=self.clock())
+        # Swapped as one tuple so a request never mixes two loads
+        self._state = (planner, {event.get("event_id"): idx for idx, event in enumerate(planner.events)})
+        self._loaded_at = time.monotonic()
+
+    @property
+    def planner(self) -> EligibilityPlanner:
+        return self._state[0]
+
+    def _current(self) -> Tuple[EligibilityPlanner, Dict[str, int]]:
+        """Planner and event_id → index, refreshed every refresh_seconds"""
+        if time.monotonic() - self._loaded_at >= self.refresh_seconds:
+            with self._lock:
+                if time.monotonic() - self._loaded_at >= self.refresh_seconds:
+                    if os.stat(self.events_file).st_mtime_ns != self._events_mtime:
+                        self._load_events()
+                        self.renderer.clear()
+                        print(f"🔄 Reloaded {len(self.planner.events)} events from {self.events_file}")
+                    else:
+                        self.planner.deadlines = DeadlineCache(self.clock())
+                        self._loaded_at = time.monotonic()
+        return self._state
+
+    # -- single pair --------------------------------------------------------
+    def render(self, recipient: Dict, event_id: str, day: str) -> Dict:
+        """Decide and render one pair (AI content in AI mode)"""
+        if not isinstance(recipient, dict):
+            raise RequestError("recipient must be a JSON object")
+        # decide_pair matches topics and picks a tone before validation runs
+        topics = recipient.get("topics", [])
+        if not (isinstance(topics, list) and all(isinstance(t, str) for t in topics)):
+            raise RequestError("recipient.topics must be a list of strings")
+        score = recipient.get("engagement_score", 0.5)
+        if isinstance(score, bool) or not isinstance(score, (int, float)):
+            raise RequestError("recipient.engagement_score must be a number")
+        if day not in SEQUENCE:
+            raise RequestError(f"Unknown day: {day} (expected one of {', '.join(SEQUENCE)})")
+        planner, event_index = self._current()
+        event_idx = event_index.get(event_id)
+        if event_idx is None:
+            raise RequestError(f"Unknown event: {event_id}", 404)
+        event = planner.events[event_idx]
+        decision = decide_pair(
+            recipient, event, 0, event_idx, planner.deadlines,
+            (validate_recipient(recipient), planner.event_errors[event_idx])
+        )
+        try:
+            return generate_email_for_pair(
+                recipient, event, day, self.ai_gen, self.use_ai, decision, renderer=self.renderer
+            )
+        finally:
+            self.renderer.forget(recipient)
+            if self.ai_gen is not None:
+                self.ai_gen.renderer.forget(recipient)
+
+    # -- batches ------------------------------------------------------------
+    def submit(self, request: Dict) -> str:
+        """Queue a batch; returns its id"""
+        batch_id = new_run_id()
+        batch_dir = os.path.join(self.output_dir, batch_id)
+        job: Dict[str, Any] = {"output_dir": batch_dir}
+        if "due" in request:
+            due = request["due"] or {}
+            try:
+                job["due"] = (
+                    parse_start(due["window_start"]) if due.get("window_start") else None,
+                    timedelta(hours=float(due.get("hours", 1)))
+                )
+            except (AttributeError, TypeError, ValueError, OverflowError) as e:
+                raise RequestError(f"Invalid due window: {e}")
+        else:
+            days = request.get("days", ["1"])
+            if not isinstance(days, list) or any(day not in SEQUENCE for day in days):
+                raise RequestError(f"days must be a list of {', '.join(SEQUENCE)}")
+            job["days"] = days
+
+        # Due windows default to Config.RECIPIENTS_FILE; day batches must name their recipients
+        job["recipients_file"] = None
+        if "recipients" in request:
+            if not isinstance(request["recipients"], list):
+                raise RequestError("recipients must be a JSON array")
+            os.makedirs(batch_dir, exist_ok=True)
+            job["recipients_file"] = os.path.join(batch_dir, "recipients.jsonl")
+            with open(job["recipients_file"], 'w', encoding='utf-8') as f:
+                for recipient in request["recipients"]:
+                    f.write(json.dumps(recipient, ensure_ascii=False) + "\n")
+        elif "recipients_file" in request:
+            job["recipients_file"] = self._data_path(request["recipients_file"])
+        elif "due" not in request:
+            raise RequestError("recipients, recipients_file or due is required")
+
+        with self._batches_lock:
+            self.batches[batch_id] = {
+                "batch_id": batch_id,
+                "status": "queued",
+                "submitted_at": datetime.now(IST).isoformat(),
+                "output_dir": batch_dir,
+                "progress": {key: 0 for key in PROGRESS_KEYS}
+            }
+        self._queue.put((batch_id, job))
+        return batch_id
+
+    def _publish(self, batch_id: str, **fields: Any) -> None:
+        """Replace a batch's status with an updated copy (published dicts are never mutated)"""
+        with self._batches_lock:
+            self.batches[batch_id] = dict(self.batches[batch_id], **fields)
+
+    def batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        with self._batches_lock:
+            return self.batches.get(batch_id)
+
+    def list_batches(self) -> List[Dict[str, Any]]:
+        with self._batches_lock:
+            return list(self.batches.values())
+
+    def _data_path(self, path: Any) -> str:
+        """Resolve a requested file inside data_dir (relative paths are relative to it)"""
+        if not isinstance(path, str) or not path:
+            raise RequestError("recipients_file must be a path")
+        resolved = os.path.realpath(os.path.join(self.data_dir, path))
+        if os.path.commonpath([resolved, self.data_dir]) != self.data_dir:
+            raise RequestError(f"recipients_file must be inside {self.data_dir}", 403)
+        if not os.path.isfile(resolved):
+            raise RequestError(f"No such file: {path}", 404)
+        return resolved
+
+    def _run_batches(self) -> None:
+        while True:
+            batch_id, job = self._queue.get()
+            self._publish(batch_id, status="running", started_at=datetime.now(IST).isoformat())
+
+            def progress(stats: Dict[str, Any], batch_id: str = batch_id) -> None:
+                self._publish(batch_id, progress={key: stats[key] for key in PROGRESS_KEYS})
+
+            # A fork per batch: generate_batch resets the generator's metrics and breaker
+            options = dict(
+                events_file=self.events_file, use_ai=self.use_ai,
+                ai_generator=self.ai_gen.fork() if self.use_ai else None,
+                clock=self.clock, progress=progress, verbose=False
+            )
+            try:
+                if "due" in job:
+                    window_start, window = job["due"]
+                    stats = generate_due(
+                        window_start, window, recipients_file=job["recipients_file"],
+                        output_dir=job["output_dir"], **options
+                    )
+                else:
+                    stats = generate_batch(
+                        recipients_file=job["recipients_file"], days=job["days"],
+                        output_dir=job["output_dir"], **options
+                    )
+                progress(stats)
+                outcome = {
+                    "status": "done",
+                    "summary": {
+                        key: value for key, value in stats.items() if key not in PROGRESS_KEYS and key != "results"
+                    }
+                }
+            except Exception as e:
+                outcome = {"status": "failed", "error": str(e)}
+            self._publish(batch_id, finished_at=datetime.now(IST).isoformat(), **outcome)
+
+    def health(self) -> Dict[str, Any]:
+        statuses: Dict[str, int] = {}
+        for batch in self.list_batches():
+            statuses[batch["status"]] = statuses.get(batch["status"], 0) + 1
+        return {
+            "status": "ok",
+            "mode": "ai" if self.use_ai else "deterministic",
+            "events": len(self.planner.events),
+            "uptime_s": round(time.monotonic() - self.started, 1),
+            "batches": statuses
+        }
+
+
+# =============================
+# HTTP Interface
+# =============================
+class _Handler(BaseHTTPRequestHandler):
+    """JSON endpoints over GenerationService; keep-alive (HTTP/1.1)"""
+
+    protocol_version = "HTTP/1.1"
+    service: GenerationService = None
+
+    def setup(self) -> None:
+        super().setup()
+        if self.request.family in (socket.AF_INET, socket.AF_INET6):
+            # Headers and body go out as separate writes; without this,
+            # Nagle + delayed ACK adds ~40 ms to every keep-alive response
+            self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass  # One line per request would dominate the render latency
+
+    def _send(self, status: int, payload: Any) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json_body(self) -> Dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as e:
+            raise RequestError(f"Invalid JSON body: {e}")
+        if not isinstance(body, dict):
+            raise RequestError("Body must be a JSON object")
+        return body
+
+    def _dispatch(self, routes: Dict[str, Callable[[List[str]], Tuple[int, Any]]]) -> None:
+        parts = [part for part in self.path.split("?")[0].split("/") if part]
+        handler = routes.get(parts[0] if parts else "")
+        try:
+            if handler is None:
+                raise RequestError(f"No route for {self.command} {self.path}", 404)
+            self._send(*handler(parts[1:]))
+        except RequestError as e:
+            self._send(e.status, {"error": str(e)})
+        except Exception as e:
+            self._send(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def do_GET(self) -> None:
+        self._dispatch({"health": self._health, "batches": self._get_batches})
+
+    def do_POST(self) -> None:
+        self._dispatch({"render": self._render, "batches": self._post_batch})
+
+    def _health(self, _: List[str]) -> Tuple[int, Any]:
+        return 200, self.service.health()
+
+    def _render(self, _: List[str]) -> Tuple[int, Any]:
+        body = self._json_body()
+        return 200, self.service.render(body.get("recipient"), body.get("event_id"), str(body.get("day", "1")))
+
+    def _post_batch(self, _: List[str]) -> Tuple[int, Any]:
+        batch_id = self.service.submit(self._json_body())
+        return 202, {"batch_id": batch_id, "status": "queued"}
+
+    def _get_batches(self, rest: List[str]) -> Tuple[int, Any]:
+        if not rest:
+            return 200, {"batches": self.service.list_batches()}
+        batch = self.service.batch(rest[0])
+        if batch is None:
+            raise RequestError(f"Unknown batch: {rest[0]}", 404)
+        return 200, batch
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self) -> None:
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)  # Stale socket from a previous daemon
+        super().server_bind()
+
+
+def make_server(
+    service: GenerationService,
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+    socket_path: Optional[str] = None
+) -> socketserver.BaseServer:
+    """HTTP server bound to localhost host:port, or to a Unix socket"""
+    handler = type("Handler", (_Handler,), {"service": service})
+    if socket_path:
+        return UnixHTTPServer(socket_path, handler)
+    server = ThreadingHTTPServer((host or Config.SERVE_HOST, Config.SERVE_PORT if port is None else port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve(
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+    socket_path: Optional[str] = None,
+    **service_options
+) -> None:
+    """Run the daemon until interrupted"""
+    service = GenerationService(**service_options)
+    server = make_server(service, host, port, socket_path)
+    where = f"unix:{socket_path}" if socket_path else f"http://{server.server_address[0]}:{server.server_address[1]}"
+    print(f"🚀 Serving {len(service.planner.events)} events ({service.health()['mode']}) on {where}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Shutting down")
+    finally:
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
@@ -254,6 +254,58 @@ Structure:
 6. Generate email in the specified JSON output format
 7. Verify all facts are from the input data
 
+Begin now. Output only valid JSON.
+""",
+    
+    "batch_user_template": """# TASK: Generate Emails for {count} Recipients Using Russell Brunson Framework
+
+You will generate ONE email for EACH recipient below. Every email is for the
+same event and the same day in the sequence; treat each recipient on its own.
+
+---
+
+## [EMAIL STRATEGY]
+Day {day_number}: {email_type}
+
+Purpose: {purpose}
+Psychological Principle: {principle}
+Subject Formula: {subject_formula}
+Structure:
+{structure}
+
+---
+
+## [RECIPIENTS DATA]
+{recipients_json}
+
+---
+
+## [EVENT DATA]
+{event_json}
+
+---
+
+## [SENDER DETAILS]
+{{
+  "name": "Priya Singh",
+  "title": "Grants Coordinator",
+  "organization": "Funding Forward"
+}}
+
+---
+
+## [INSTRUCTIONS]
+
+1. For each recipient, follow the Internal Monologue process from your system prompt
+2. Validate that the recipient's topics match the event tags
+3. Extract exact values from JSON (no invention, no mixing data between recipients)
+4. Apply the Russell Brunson framework for Day {day_number}
+5. Calibrate tone based on each recipient's engagement_score
+6. Output a single JSON object: {{"emails": [...]}} with one entry per recipient,
+   in the order given. Each entry is the JSON output format from your system
+   prompt plus a "recipient_id" field copied exactly from the recipient data.
+7. Verify all facts are from the input data
+
 Begin now. Output only valid JSON.
 """,
     
@@ -486,6 +538,7 @@ Day: 6 (Final Push)
 
 SYSTEM_PROMPT = COMPLETE_PROMPT_BUNDLE["system"]
 USER_PROMPT_TEMPLATE = COMPLETE_PROMPT_BUNDLE["user_template"]
+BATCH_USER_PROMPT_TEMPLATE = COMPLETE_PROMPT_BUNDLE["batch_user_template"]
 EMAIL_TYPES = COMPLETE_PROMPT_BUNDLE["email_types"]
 FEW_SHOT_EXAMPLES = COMPLETE_PROMPT_BUNDLE["few_shot_examples"]
 VALIDATION_RULES = COMPLETE_PROMPT_BUNDLE["validation_rules"]
\ No newline at end of file
@@ -0,0 +1,103 @@
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+# The modules live at the repository root (no package)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+NOW = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+RECIPIENT = {
+    "recipient_id": "r_1", "name": "Alice", "email": "a@example.org", "organization": "Org",
+    "topics": ["water", "health"], "engagement_score": 0.8, "opt_out": False,
+}
+EVENT = {
+    "event_id": "e_1", "title": "Clean Water Grant", "start_date": "2025-03-01", "tags": ["water", "health"],
+    "organizer": "Water Fund", "metadata": {"amount_range": "$10k", "application_deadline": "2025-02-01"},
+}
+
+
+def make_recipients(n, **changes):
+    """r_0..r_{n-1}: RECIPIENT under other ids, names and addresses"""
+    return [
+        {**RECIPIENT, "recipient_id": f"r_{i}", "name": f"Recipient {i}", "email": f"r{i}@example.org", **changes}
+        for i in range(n)
+    ]
+
+
+def make_events(n, **changes):
+    """e_0..e_{n-1}: EVENT under other ids and titles"""
+    return [{**EVENT, "event_id": f"e_{i}", "title": f"Grant {i}", **changes} for i in range(n)]
+
+
+def email_json(subject="Subject", body="Body"):
+    """A completion the response parser accepts as is"""
+    return json.dumps({
+        "email": {"subject": subject, "body": body},
+        "verification": {"all_data_from_json": True},
+        "warnings": [],
+    })
+
+
+class StubClient:
+    """
+    Stands in for the Groq client (client.chat.completions.create)
+
+    `content(call, prompt)` returns the completion text for the 1-based call
+    number and user prompt, or raises to fail the request; `delay(call)` is
+    slept while the request is in flight. Counts calls and the most
+    requests in flight at once, and keeps every prompt.
+    """
+
+    def __init__(self, content=None, delay=None):
+        self.content = content or (lambda call, prompt: email_json())
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.prompts = []
+        self.chat = self
+        self.completions = self
+
+    def create(self, messages, **_):
+        prompt = messages[-1]["content"]
+        with self.lock:
+            self.calls += 1
+            call = self.calls
+            self.prompts.append(prompt)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            delay = self.delay(call) if self.delay is not None else 0
+        try:
+            if delay:
+                time.sleep(delay)
+            content = self.content(call, prompt)
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+@pytest.fixture
+def unthrottled(monkeypatch):
+    """Rate limits no concurrent test run gets near"""
+    import brain
+    monkeypatch.setattr(brain.Config, "GROQ_RPM", 1_000_000)
+    monkeypatch.setattr(brain.Config, "GROQ_TPM", 1_000_000_000)
+
+
+@pytest.fixture
+def write_inputs(tmp_path):
+    """write_inputs(recipients, events) → (recipients file, events file) under tmp_path"""
+    def write(recipients, events):
+        (tmp_path / "recipients.json").write_text(json.dumps(recipients))
+        (tmp_path / "events.json").write_text(json.dumps(events))
+        return str(tmp_path / "recipients.json"), str(tmp_path / "events.json")
+    return write
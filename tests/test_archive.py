@@ -0,0 +1,92 @@
+"""Archive day files: writer/reader round trip and damaged indexes"""
+
+import os
+import sys
+
+import pytest
+
+import archive
+from archive import ArchiveReader, DayArchives, index_path_for
+from output_writers import open_day_writer
+
+
+def result(n):
+    # Two results share each recipient, and ids are not written in key order
+    return {
+        "meta": {"recipient_id": f"r_{(n * 7) % 11}", "event_id": f"e_{n % 2}", "day": "5", "status": "generated"},
+        "email": {"subject": f"Subject {n} – Zoë", "body": "Body\nline two"},
+    }
+
+
+RESULTS = [result(n) for n in range(22)]
+
+
+def write_archive(directory, results=RESULTS):
+    writer = open_day_writer("archive", str(directory), "5", "2025-01-01T00:00:00")
+    for r in results:
+        writer.write(r)
+    return writer.close({"total": len(results)}, "2025-01-01T00:01:00")
+
+
+@pytest.fixture(params=["numpy", "merge"])
+def sort_backend(request, monkeypatch):
+    if request.param == "merge":
+        # Without NumPy, in runs small enough to need merging
+        monkeypatch.setitem(sys.modules, "numpy", None)
+        monkeypatch.setattr(archive, "SORT_RUN", 4)
+    else:
+        pytest.importorskip("numpy")
+
+
+def test_round_trip_by_index_and_key(tmp_path, sort_backend):
+    path = write_archive(tmp_path)
+
+    with ArchiveReader(path) as reader:
+        assert len(reader) == len(RESULTS)
+        assert list(reader) == RESULTS
+        assert reader[3] == RESULTS[3]
+        assert reader[-1] == RESULTS[-1]
+        for r in RESULTS:
+            assert reader.find(r["meta"]["recipient_id"], r["meta"]["event_id"]) == r
+        assert reader.find("r_404", "e_0") is None
+        with pytest.raises(IndexError):
+            reader[len(RESULTS)]
+
+    archives = DayArchives(str(tmp_path))
+    assert archives.get("r_7", "e_1", "5") == RESULTS[1]
+    archives.close()
+
+
+def test_empty_archive(tmp_path):
+    with ArchiveReader(write_archive(tmp_path, [])) as reader:
+        assert len(reader) == 0
+        assert reader.find("r_1", "e_1") is None
+
+
+def test_truncated_index_is_rejected(tmp_path):
+    index_path = index_path_for(write_archive(tmp_path))
+    size = os.path.getsize(index_path)
+    with open(index_path, 'r+b') as f:
+        f.truncate(size - 8)
+
+    with pytest.raises(ValueError, match="records need"):
+        ArchiveReader(os.path.join(tmp_path, "day_5_emails.jsonl"))
+
+    with open(index_path, 'r+b') as f:
+        f.truncate(10)
+    with pytest.raises(ValueError, match="Not an email archive index"):
+        ArchiveReader(os.path.join(tmp_path, "day_5_emails.jsonl"))
+
+
+def test_corrupt_or_stale_index_is_rejected(tmp_path):
+    path = write_archive(tmp_path)
+    with open(index_path_for(path), 'r+b') as f:
+        f.write(b"NOTANIDX")
+    with pytest.raises(ValueError, match="Not an email archive index"):
+        ArchiveReader(path)
+
+    write_archive(tmp_path)
+    with open(path, 'ab') as f:
+        f.write(b'{"meta": {}}\n')
+    with pytest.raises(ValueError, match="stale or interrupted"):
+        ArchiveReader(path)
@@ -0,0 +1,65 @@
+"""Concurrent AI generation: job order and in-flight limit"""
+
+import asyncio
+import io
+import random
+import re
+from contextlib import redirect_stdout
+
+import brain
+from async_generation import generate_contents
+from conftest import NOW, StubClient, email_json, make_events, make_recipients
+
+EVENTS = make_events(3)
+RECIPIENTS = make_recipients(6)
+
+
+def sleeping_client(seed):
+    """Each completion sleeps a random time; its subject names the pair"""
+    rng = random.Random(seed)
+
+    def content(call, prompt):
+        recipient_id = re.search(r'"recipient_id": "(r_\d+)"', prompt).group(1)
+        event_id = re.search(r'"event_id": "(e_\d+)"', prompt).group(1)
+        return email_json(f"{recipient_id}/{event_id}", f"Hello {recipient_id}")
+
+    return StubClient(content, delay=lambda call: rng.uniform(0, 0.02))
+
+
+def test_results_follow_job_order_within_the_concurrency_limit():
+    jobs = [(r, e, "1") for r in RECIPIENTS for e in EVENTS]
+    for seed in range(3):
+        client = sleeping_client(seed)
+        generator = brain.GroqEmailGenerator(client=client)
+
+        results = asyncio.run(generate_contents(generator, jobs, concurrency=4))
+
+        assert [c["email"]["subject"] for c in results] == [
+            f"{r['recipient_id']}/{e['event_id']}" for r, e, _ in jobs
+        ]
+        assert client.calls == len(jobs)
+        assert 1 < client.max_in_flight <= 4
+
+
+def test_concurrent_batch_matches_sequential_output(tmp_path, unthrottled, write_inputs):
+    recipients_file, events_file = write_inputs(RECIPIENTS, EVENTS)
+
+    def run(concurrency, seed):
+        client = sleeping_client(seed)
+        with redirect_stdout(io.StringIO()):
+            stats = brain.generate_batch(
+                recipients_file, events_file, days=["1", "3"],
+                output_dir=str(tmp_path / f"out_{concurrency}_{seed}"), concurrency=concurrency,
+                ai_generator=brain.GroqEmailGenerator(client=client), use_cache=False, clock=lambda: NOW,
+                checkpoint=False, store_results=False, collect_results=True, verbose=False
+            )
+        assert client.max_in_flight <= concurrency
+        return [
+            (r["meta"]["day"], r["meta"]["recipient_id"], r["meta"]["event_id"], r["email"]["subject"])
+            for day in ("1", "3") for r in stats["results"][day]
+        ]
+
+    sequential = run(1, 0)
+    assert len(sequential) == len(RECIPIENTS) * len(EVENTS) * 2
+    assert run(4, 1) == sequential
+    assert run(4, 2) == sequential
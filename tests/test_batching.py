@@ -0,0 +1,148 @@
+"""Batched multi-recipient prompts: per-item fallback, order, metrics and cache"""
+
+import io
+import json
+import re
+from contextlib import redirect_stdout
+
+import pytest
+
+import brain
+from conftest import EVENT, NOW, StubClient, email_json, make_events, make_recipients
+from response_cache import ResponseCache
+
+DAYS = ["1", "3"]
+EVENTS = make_events(2)
+RECIPIENTS = make_recipients(5)
+PAIRS = len(RECIPIENTS) * len(EVENTS) * len(DAYS)
+
+
+def batch_aware_client(drop=(), invalid=(), ids=None):
+    """
+    Answers single and batched prompts alike, subject "<recipient>/<event>/<day>"
+
+    In batched replies, recipients in `drop` are left out, those in
+    `invalid` get an empty subject, and `ids` renames recipient ids.
+    Bodies say which path produced them.
+    """
+    def content(call, prompt):
+        event_id = re.search(r'"event_id": "(e_\d+)"', prompt).group(1)
+        day = re.search(r"Day (\w+):", prompt).group(1)
+        recipient_ids = re.findall(r'"recipient_id": "(r_\d+)"', prompt)
+        if not prompt.startswith("# TASK: Generate Emails for"):
+            [recipient_id] = recipient_ids
+            return email_json(f"{recipient_id}/{event_id}/{day}", "single")
+        items = [
+            {
+                "recipient_id": (ids or {}).get(recipient_id, recipient_id),
+                "email": {
+                    "subject": "" if recipient_id in invalid else f"{recipient_id}/{event_id}/{day}",
+                    "body": "batched",
+                },
+                "verification": {"all_data_from_json": True},
+                "warnings": [],
+            }
+            for recipient_id in recipient_ids if recipient_id not in drop
+        ]
+        return json.dumps({"emails": items})
+    return StubClient(content)
+
+
+def run(tmp_path, client, batch_size, use_cache=False):
+    with redirect_stdout(io.StringIO()):
+        stats = brain.generate_batch(
+            str(tmp_path / "recipients.json"), str(tmp_path / "events.json"), days=DAYS,
+            output_dir=str(tmp_path / f"out_{batch_size}"), concurrency=1, batch_size=batch_size,
+            ai_generator=brain.GroqEmailGenerator(client=client), use_cache=use_cache, clock=lambda: NOW,
+            checkpoint=False, store_results=False, collect_results=True, verbose=False
+        )
+    return stats, [
+        (meta["day"], meta["recipient_id"], meta["event_id"], r["email"]["subject"], r["email"]["body"])
+        for day in DAYS for r in stats["results"][day] for meta in [r["meta"]]
+    ]
+
+
+@pytest.fixture
+def inputs(tmp_path, write_inputs):
+    write_inputs(RECIPIENTS, EVENTS)
+    return tmp_path
+
+
+def test_missing_and_invalid_items_fall_back_alone(inputs):
+    client = batch_aware_client(drop={"r_1"}, invalid={"r_3"})
+    stats, results = run(inputs, client, batch_size=3)
+    _, single = run(inputs, batch_aware_client(), batch_size=1)
+
+    # Same pairs, order and subjects as one request per pair
+    assert [r[:4] for r in results] == [r[:4] for r in single]
+    # Only the dropped and invalid items were asked for again
+    assert {r[1] for r in results if r[4] == "single"} == {"r_1", "r_3"}
+    assert all(r[4] == "batched" for r in results if r[1] not in ("r_1", "r_3"))
+
+    groups = len(EVENTS) * len(DAYS)
+    fallbacks = 2 * groups
+    assert client.calls == 2 * groups + fallbacks  # [r_0, r_1, r_2] and [r_3, r_4] per event-day
+    llm = stats["llm"]
+    assert (llm["requests"], llm["emails"], llm["errors"]) == (client.calls, PAIRS, 0)
+    assert llm["responses"] == {"valid": PAIRS, "repaired": 0, "rejected": groups}
+    assert llm["fallbacks"] == {}
+
+
+def test_items_are_matched_by_id_not_position():
+    recipients = make_recipients(3)
+    # Right count, wrong ids: nothing may be taken for the requested recipients
+    client = batch_aware_client(ids={"r_0": "r_7", "r_1": "r_8", "r_2": "r_9"})
+    generator = brain.GroqEmailGenerator(client=client)
+
+    assert generator.generate_batch_contents(recipients, EVENT, "1", check_cache=False) == {}
+    summary = generator.metrics.summary()
+    assert (summary["requests"], summary["emails"]) == (1, 0)
+    assert summary["responses"]["rejected"] == 3
+
+    # A repeated id is taken once; the recipient it displaced is missing
+    generator = brain.GroqEmailGenerator(client=batch_aware_client(ids={"r_1": "r_0"}))
+    contents = generator.generate_batch_contents(recipients, EVENT, "1", check_cache=False)
+
+    assert {rid: c["email"]["subject"] for rid, c in contents.items()} == {"r_0": "r_0/e_1/1", "r_2": "r_2/e_1/1"}
+    assert contents["r_0"]["_llm"]["emails"] == 2
+    summary = generator.metrics.summary()
+    assert summary["emails"] == 2
+    assert summary["responses"] == {"valid": 2, "repaired": 0, "rejected": 1}
+
+
+def test_batched_items_are_cached_under_the_single_pair_prompt(tmp_path):
+    recipients = make_recipients(3)
+    generator = brain.GroqEmailGenerator(client=batch_aware_client(invalid={"r_2"}))
+    generator.cache = ResponseCache(str(tmp_path / "responses.sqlite3"))
+
+    contents = generator.generate_batch_contents(recipients, EVENT, "1")
+    assert sorted(contents) == ["r_0", "r_1"]
+    assert generator.cache.stats()["stores"] == 2
+
+    client = StubClient()
+    generator.client = client
+    cached = generator.generate_email_content(recipients[0], EVENT, "1")
+    assert cached["email"] == contents["r_0"]["email"]
+    assert client.calls == 0
+
+    # Only the invalid item is requested again
+    contents = generator.generate_batch_contents(recipients, EVENT, "1")
+    assert client.calls == 1
+    assert sorted(contents) == ["r_0", "r_1", "r_2"]
+    summary = generator.metrics.summary()
+    assert (summary["cached"], summary["emails"]) == (3, 3)
+    generator.cache.close()
+
+
+def test_warm_batched_run_makes_no_calls(inputs, monkeypatch):
+    monkeypatch.setattr(brain.Config, "CACHE_PATH", str(inputs / "cache" / "responses.sqlite3"))
+    cold = batch_aware_client(drop={"r_1"})
+    _, cold_results = run(inputs, cold, batch_size=3, use_cache=True)
+
+    warm = batch_aware_client()
+    stats, warm_results = run(inputs, warm, batch_size=3, use_cache=True)
+
+    assert warm.calls == 0
+    assert warm_results == cold_results
+    assert stats["llm"]["cached"] == PAIRS
+    assert stats["cache"]["hits"] == PAIRS
@@ -0,0 +1,22 @@
+"""Every benchmark subcommand runs end to end on a small sample"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks import BENCHMARKS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# startup is timed against its budget in test_startup.py
+@pytest.mark.parametrize("benchmark", sorted(set(BENCHMARKS) - {"startup"}))
+def test_benchmark_runs(benchmark):
+    result = subprocess.run(
+        [sys.executable, "benchmarks.py", benchmark, "-n", "20"],
+        cwd=ROOT, capture_output=True, text=True, timeout=300
+    )
+
+    assert result.returncode == 0, result.stdout + result.stderr
@@ -0,0 +1,86 @@
+"""Memoized deadline checks: parse once, injected clock, ISO fast path"""
+
+from datetime import timedelta, timezone
+
+import pytest
+from dateutil import parser as dateparse
+
+import brain
+import conftest
+from conftest import NOW, RECIPIENT
+
+DEADLINES = [
+    "2025-02-01",
+    "Feb 1, 2025",
+    "2024-12-31T23:59:59Z",
+    "2025-01-01T05:29:00",  # 23:59 UTC the day before, in IST
+    "2025-01-01 05:31:00+05:30",
+    "31/12/2024",
+    "2025-02-30",
+    "not a date",
+    "",
+]
+
+
+def baseline_is_deadline_passed(deadline_str, now):
+    """The original check: dateutil for every value, naive times in IST"""
+    try:
+        dt = dateparse.parse(deadline_str)
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone(timedelta(hours=5, minutes=30)))
+        return now > dt.astimezone(timezone.utc), None
+    except Exception as e:
+        return False, f"Invalid deadline format: {e}"
+
+
+def event(deadline):
+    return {**conftest.EVENT, "metadata": {**conftest.EVENT["metadata"], "application_deadline": deadline}}
+
+
+def test_each_deadline_is_parsed_once(monkeypatch):
+    parsed = []
+    parse_deadline = brain.parse_deadline
+    monkeypatch.setattr(brain, "parse_deadline", lambda value: parsed.append(value) or parse_deadline(value))
+    deadlines = brain.DeadlineCache(NOW)
+
+    for _ in range(3):
+        for value in ("2025-02-01", "Feb 1, 2025", "2025-02-01"):
+            deadlines.is_passed(value)
+
+    assert parsed == ["2025-02-01", "Feb 1, 2025"]
+
+
+def test_deadlines_are_judged_against_the_injected_clock():
+    calls = []
+    deadlines = brain.DeadlineCache(clock=lambda: calls.append(1) or NOW)
+
+    # Long past by the wall clock, still open at NOW
+    assert deadlines.is_passed("2025-02-01") == (False, None)
+    assert deadlines.is_passed("2024-12-31") == (True, None)
+    assert deadlines.now == NOW
+    assert len(calls) == 1
+
+
+def test_iso_dates_skip_dateutil(monkeypatch):
+    def no_dateutil(*args, **kwargs):
+        raise AssertionError("dateutil used for an ISO date")
+    monkeypatch.setattr(dateparse, "parse", no_dateutil)
+
+    assert brain.parse_deadline("2025-02-01") == brain.parse_deadline("2025-02-01T00:00:00+05:30")
+    assert brain.parse_deadline("2025-01-31T18:30:00Z") == brain.parse_deadline("2025-02-01")
+
+
+def test_iso_and_free_form_dates_agree():
+    assert brain.parse_deadline("2025-02-01") == brain.parse_deadline("Feb 1, 2025")
+    assert brain.DeadlineCache(NOW).is_passed("Feb 1, 2025") == (False, None)
+
+
+@pytest.mark.parametrize("deadline", DEADLINES)
+def test_decisions_match_the_baseline_parser(deadline):
+    # An empty deadline is never checked
+    passed, error = baseline_is_deadline_passed(deadline, NOW) if deadline else (False, None)
+
+    send, reason, warnings = brain.should_send_email(RECIPIENT, event(deadline), brain.DeadlineCache(NOW))
+
+    assert (send, reason) == ((False, "deadline_passed") if passed else (True, "approved"))
+    assert any(w.startswith("Invalid deadline format") for w in warnings) == (error is not None)
@@ -0,0 +1,65 @@
+"""Per-pair decision plan: the original should_send_email reasons and tones"""
+
+import pytest
+
+import brain
+from conftest import EVENT, NOW, RECIPIENT
+
+
+def without(record, field):
+    return {k: v for k, v in record.items() if k != field}
+
+
+RECIPIENTS = [
+    RECIPIENT,
+    {**RECIPIENT, "recipient_id": "r_2", "opt_out": True},
+    without({**RECIPIENT, "recipient_id": "r_3"}, "email"),
+    {**RECIPIENT, "recipient_id": "r_4", "topics": ["Health ", "youth"], "engagement_score": 0.2},
+    {**RECIPIENT, "recipient_id": "r_5", "topics": ["arts"], "engagement_score": 0.6},
+]
+EVENTS = [
+    {**EVENT, "metadata": {"amount_range": "$10k", "application_deadline": "2099-02-01"}},
+    {**EVENT, "event_id": "e_2", "metadata": {"amount_range": "$10k", "application_deadline": "2020-01-01"}},
+    {**EVENT, "event_id": "e_3", "tags": ["youth", "arts"],
+     "metadata": {"amount_range": "$10k", "application_deadline": "2099-02-01"}},
+    {**EVENT, "event_id": "e_4", "metadata": {"amount_range": "$10k", "application_deadline": "someday"}},
+    without({**EVENT, "event_id": "e_5"}, "organizer"),
+]
+
+# (reason, tone, number of warnings) per recipient × event, as the original
+# should_send_email() and tone_from_engagement() decided them
+DEADLINE = ("deadline_passed", None, 1)
+NO_MATCH = ("no_topic_match", None, 1)
+INVALID = ("validation_failed", None, 1)
+OPTED_OUT = ("opted_out", None, 1)
+EXPECTED = {
+    "r_1": [("approved", "enthusiastic", 0), DEADLINE, NO_MATCH, ("approved", "enthusiastic", 1), INVALID],
+    "r_2": [OPTED_OUT] * 4 + [INVALID],
+    "r_3": [INVALID] * 4 + [("validation_failed", None, 2)],
+    "r_4": [("approved", "gentle", 0), DEADLINE, ("approved", "gentle", 0), ("approved", "gentle", 1), INVALID],
+    "r_5": [NO_MATCH, DEADLINE, ("approved", "professional", 0), NO_MATCH, INVALID],
+}
+
+
+def test_every_pair_is_decided_in_recipient_then_event_order():
+    decisions = brain.decide_pairs(RECIPIENTS, EVENTS, NOW)
+
+    assert [(d.recipient_idx, d.event_idx) for d in decisions] == [
+        (r_idx, e_idx) for r_idx in range(len(RECIPIENTS)) for e_idx in range(len(EVENTS))
+    ]
+
+
+@pytest.mark.parametrize("r_idx", range(len(RECIPIENTS)))
+def test_decisions_match_the_original_checks(r_idx):
+    decisions = brain.decide_pairs(RECIPIENTS, EVENTS, NOW)
+    row = [(d.reason, d.tone, len(d.warnings)) for d in decisions if d.recipient_idx == r_idx]
+
+    assert row == EXPECTED[RECIPIENTS[r_idx]["recipient_id"]]
+    for d in decisions:
+        assert d.approved == (d.status == "approved") == (d.reason == "approved")
+
+
+def test_overlap_keeps_the_recipient_spelling():
+    [decision] = brain.decide_pairs([RECIPIENTS[3]], EVENTS[:1], NOW)
+
+    assert decision.overlap == ("Health ",)
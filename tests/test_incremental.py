@@ -0,0 +1,43 @@
+"""Incremental regeneration across partial (per-day) runs"""
+
+import io
+import json
+import os
+from contextlib import redirect_stdout
+
+import brain
+from conftest import EVENT, NOW, RECIPIENT
+
+
+def run(tmp_path, name, day):
+    (tmp_path / "recipients.json").write_text(json.dumps([{**RECIPIENT, "name": name}]))
+    (tmp_path / "events.json").write_text(json.dumps([EVENT]))
+    with redirect_stdout(io.StringIO()):
+        brain.generate_batch(
+            str(tmp_path / "recipients.json"), str(tmp_path / "events.json"), days=[day],
+            output_dir=str(tmp_path / "out"), use_ai=False, clock=lambda: NOW, incremental=True, output_format="jsonl",
+            checkpoint=False, store_results=False
+        )
+    with open(os.path.join(tmp_path, "out", f"day_{day}_emails.jsonl"), encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_rename_then_partial_runs_regenerates_every_day(tmp_path):
+    run(tmp_path, "Alice", "1")
+    run(tmp_path, "Alice", "3")
+    run(tmp_path, "Bob", "1")
+
+    [day_3] = run(tmp_path, "Bob", "3")
+
+    assert day_3["meta"]["status"] == "generated"
+    assert "Hi Bob" in day_3["email"]["body"]
+    assert "Alice" not in day_3["email"]["body"]
+
+
+def test_unchanged_day_is_reused(tmp_path):
+    [first] = run(tmp_path, "Alice", "3")
+    run(tmp_path, "Bob", "1")
+
+    [again] = run(tmp_path, "Alice", "3")
+
+    assert again == first
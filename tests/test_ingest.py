@@ -0,0 +1,43 @@
+"""Streaming JSON array ingestion: errors surface without reading on"""
+
+import io
+import json
+
+import pytest
+
+from ingest import IngestError, iter_json_array
+
+
+class CountingReader(io.StringIO):
+    """StringIO that records how many characters were read"""
+
+    def __init__(self, text):
+        super().__init__(text)
+        self.consumed = 0
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.consumed += len(chunk)
+        return chunk
+
+
+def test_malformed_element_raises_before_the_rest_is_read():
+    good = json.dumps({"recipient_id": "r_1", "name": "Zoë"})
+    tail = ", ".join(json.dumps({"recipient_id": f"r_{i}"}) for i in range(10_000))
+    text = f"[{good}, {{\"recipient_id\": oops}}, {tail}]"
+    reader = CountingReader(text)
+
+    records = iter_json_array(reader, "r.json", chunk_size=64)
+    assert next(records)["name"] == "Zoë"
+    with pytest.raises(IngestError) as e:
+        next(records)
+
+    bad_at = len(text[:text.index("oops")].encode("utf-8"))
+    assert str(e.value).startswith(f"r.json: byte {bad_at}: invalid JSON in element 1")
+    assert reader.consumed < 256
+
+
+def test_elements_spanning_reads_still_decode():
+    records = [{"recipient_id": f"r_{i}", "topics": ["water"] * i, "score": 12345.678} for i in range(50)]
+
+    assert list(iter_json_array(io.StringIO(json.dumps(records)), chunk_size=7)) == records
@@ -0,0 +1,52 @@
+"""LLM call accounting for failed and fallen-back requests"""
+
+import io
+from contextlib import redirect_stdout
+
+import brain
+from conftest import EVENT, RECIPIENT, StubClient
+from llm_metrics import LLMMetrics
+from resilience import ResilientCaller
+
+
+class ServerError(Exception):
+    status_code = 503
+
+
+def failing_client():
+    """Every completion request raises"""
+    def content(call, prompt):
+        raise ServerError("upstream down")
+    return StubClient(content)
+
+
+def test_failed_call_counts_as_error_not_email():
+    metrics = LLMMetrics()
+    call = metrics.new_call("llama-3.3-70b-versatile")
+    metrics.failed(call, 0.0, ServerError("down"))
+    call["fallback_reason"] = "API error: down"
+    metrics.record(call)
+
+    summary = metrics.summary()
+    assert summary["requests"] == 1
+    assert summary["errors"] == 1
+    assert summary["emails"] == 0
+    assert summary["fallbacks"] == {"API error": 1}
+    assert summary["by_model"]["llama-3.3-70b-versatile"]["emails"] == 0
+
+
+def test_generator_fallbacks_deliver_no_ai_emails():
+    client = failing_client()
+    generator = brain.GroqEmailGenerator(client=client)
+    generator.resilience = ResilientCaller(0, sleep=lambda _: None)
+
+    with redirect_stdout(io.StringIO()):
+        for _ in range(3):
+            result = generator.generate_email_content(RECIPIENT, EVENT, "1", check_cache=False)
+            assert result["_llm"]["fallback_reason"]
+
+    summary = generator.metrics.summary()
+    assert summary["requests"] == client.calls
+    assert summary["errors"] == 3
+    assert summary["emails"] == 0
+    assert summary["tokens_per_email"]["mean"] is None
@@ -0,0 +1,106 @@
+"""The tag index, NumPy and full-matrix matchers decide every pair alike"""
+
+import io
+import json
+import random
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+
+import pytest
+
+import brain
+from bulk_matching import HAS_NUMPY
+from matching import MatchingEngine
+
+NOW = datetime(2025, 1, 1, tzinfo=timezone.utc)
+TOPICS = ["water", "Health", "climate", "education", "youth", "arts", "housing", "food"]
+MATCHERS = {
+    "index": {"matcher": "index"},
+    "numpy": {"matcher": "numpy"},
+    "full-matrix": {"skip_unmatched": False},
+}
+
+
+@pytest.fixture(scope="module")
+def inputs(tmp_path_factory):
+    rng = random.Random(3)
+    recipients = [
+        {
+            "recipient_id": f"r_{i}", "name": f"Recipient {i}", "email": f"r{i}@example.org", "organization": "Org",
+            # Duplicate and differently cased topics count like topic_overlap() counts them
+            "topics": rng.sample(TOPICS, rng.randint(0, 3)) + (["water", " Water"] if i % 5 == 0 else []),
+            "engagement_score": rng.random(), "opt_out": i % 7 == 0,
+        }
+        for i in range(40)
+    ]
+    recipients[3]["topics"] = "water"  # Invalid
+    events = [
+        {
+            "event_id": f"e_{i}", "title": f"Grant {i}", "start_date": "2025-03-01",
+            "tags": rng.sample(TOPICS, rng.randint(1, 3)), "organizer": "Fund",
+            "metadata": {"amount_range": "$10k", "application_deadline": "2024-12-01" if i == 2 else "2025-02-01"},
+        }
+        for i in range(8)
+    ]
+    directory = tmp_path_factory.mktemp("matchers")
+    (directory / "recipients.json").write_text(json.dumps(recipients))
+    (directory / "events.json").write_text(json.dumps(events))
+    return directory
+
+
+def run(directory, name):
+    if name == "numpy" and not HAS_NUMPY:
+        pytest.skip("numpy is not installed")
+    with redirect_stdout(io.StringIO()):
+        stats = brain.generate_batch(
+            str(directory / "recipients.json"), str(directory / "events.json"), days=["1", "5"],
+            output_dir=str(directory / name), use_ai=False, clock=lambda: NOW, checkpoint=False,
+            store_results=False, collect_results=True, verbose=False, **MATCHERS[name]
+        )
+    pairs = {}
+    for day, results in stats["results"].items():
+        for result in results:
+            result["meta"].pop("generated_at", None)
+            pairs[(day, result["meta"]["recipient_id"], result["meta"]["event_id"])] = result
+    return stats, pairs
+
+
+@pytest.mark.parametrize("name", ["index", "numpy"])
+def test_matcher_matches_full_matrix(inputs, name):
+    full_stats, full_pairs = run(inputs, "full-matrix")
+    stats, pairs = run(inputs, name)
+
+    # Pairs a matcher skips are exactly the blocked pairs it never rendered
+    for key, result in full_pairs.items():
+        if key in pairs:
+            assert pairs[key] == result
+        else:
+            assert result["meta"]["status"] == "blocked"
+    assert set(pairs) <= set(full_pairs)
+    assert stats["generated"] > 0
+    for key in ("total", "generated", "blocked", "by_reason"):
+        assert stats[key] == full_stats[key]
+
+
+def test_index_and_numpy_render_the_same_pairs(inputs):
+    index_stats, index_pairs = run(inputs, "index")
+    numpy_stats, numpy_pairs = run(inputs, "numpy")
+
+    assert list(numpy_pairs.items()) == list(index_pairs.items())
+    assert numpy_stats["skipped"] == index_stats["skipped"]
+
+
+@pytest.mark.parametrize("min_match", [1, 2, 3])
+def test_index_candidates_match_topic_overlap(min_match):
+    rng = random.Random(min_match)
+    events = [{"tags": rng.sample(TOPICS, rng.randint(1, 4))} for _ in range(20)]
+    engine = MatchingEngine(events, min_match)
+    for _ in range(200):
+        topics = rng.sample(TOPICS, rng.randint(0, 4))
+        topics += [t.upper() for t in rng.sample(topics, min(len(topics), rng.randint(0, 1)))]
+
+        expected = [
+            (idx, overlap) for idx, event in enumerate(events)
+            for overlap in [brain.topic_overlap(topics, event["tags"])] if len(overlap) >= min_match
+        ]
+        assert engine.candidates(topics) == expected
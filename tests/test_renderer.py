@@ -0,0 +1,48 @@
+"""Compiled fallback templates render what the original if/elif renderer did"""
+
+import json
+import os
+
+import pytest
+
+import brain
+from conftest import EVENT, RECIPIENT
+from renderer import FallbackRenderer
+
+# Rendered by the original GroqEmailGenerator._fallback_email for the
+# recipient and event below; pinned so template edits show up as diffs
+with open(os.path.join(os.path.dirname(__file__), "data", "fallback_emails.json"), encoding="utf-8") as f:
+    EXPECTED = json.load(f)
+
+TONES = {"enthusiastic": 0.9, "professional": 0.5, "gentle": 0.1}
+PINNED_RECIPIENT = {**RECIPIENT, "topics": ["clean_water", "health"]}
+PINNED_EVENT = {
+    **EVENT,
+    "start_date": "2099-03-01",
+    "tags": ["clean_water", "health"],
+    "metadata": {"amount_range": "$10k", "application_deadline": "2099-02-01"},
+}
+
+
+@pytest.mark.parametrize("tone", TONES)
+@pytest.mark.parametrize("day", EXPECTED)
+def test_fallback_matches_the_original_renderer(day, tone):
+    recipient = {**PINNED_RECIPIENT, "engagement_score": TONES[tone]}
+
+    assert FallbackRenderer().render(recipient, PINNED_EVENT, day, "AI disabled") == EXPECTED[day]
+
+    result = brain.generate_email_for_pair(recipient, PINNED_EVENT, day, None, False)
+    meta = result.pop("meta")
+    assert result == EXPECTED[day]
+    assert (meta["status"], meta["tone"]) == ("generated", tone)
+
+
+def test_cached_fields_follow_the_recipient():
+    renderer = FallbackRenderer()
+    renderer.render(PINNED_RECIPIENT, PINNED_EVENT, "1", "AI disabled")
+
+    bob = {**PINNED_RECIPIENT, "name": "Bob", "topics": ["youth_arts"]}
+    email = renderer.render(bob, PINNED_EVENT, "1", "AI disabled")["email"]
+
+    assert email["subject"] == "The #1 mistake that kills 97% of Youth Arts applications"
+    assert email["body"].startswith("Hi Bob,")
@@ -0,0 +1,140 @@
+"""Retries with backoff and the circuit breaker's open/half-open/closed cycle"""
+
+import io
+from contextlib import redirect_stdout
+
+import pytest
+
+from resilience import CircuitOpenError, ResilientCaller, RetryPolicy
+
+
+class ServerError(Exception):
+    status_code = 503
+
+
+class BadRequest(Exception):
+    status_code = 400
+
+
+class FlakyClient:
+    """Fails its first `failures` calls with `error`, then answers"""
+
+    def __init__(self, failures, error=ServerError):
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error("upstream down")
+        return "ok"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def caller(threshold=5, retries=3, **kwargs):
+    policies = {"server": RetryPolicy(retries, 0.5, 20.0), "client": RetryPolicy(0), "other": RetryPolicy(0)}
+    sleeps = []
+    resilience = ResilientCaller(threshold, policies, sleep=sleeps.append, rng=lambda: 0.5, **kwargs)
+    return resilience, sleeps
+
+
+def test_retries_with_jittered_exponential_backoff():
+    resilience, sleeps = caller()
+    client = FlakyClient(3)
+    record = {}
+
+    assert resilience.call(client, record) == "ok"
+
+    # rng() * base_delay * 2^attempt
+    assert sleeps == [0.25, 0.5, 1.0]
+    assert record["retries"] == 3
+    counters = resilience.summary()
+    assert (counters["succeeded"], counters["recovered"], counters["failed"]) == (1, 1, 0)
+
+
+def test_retry_after_wins_over_backoff():
+    error = ServerError("slow down")
+    error.retry_after = "3"
+    resilience, sleeps = caller()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) == 1:
+            raise error
+        return "ok"
+
+    assert resilience.call(fn) == "ok"
+    assert sleeps == [3.25]
+
+
+def test_exhausted_and_non_retryable_errors_raise():
+    resilience, sleeps = caller(retries=2)
+    with pytest.raises(ServerError):
+        resilience.call(FlakyClient(10))
+    assert len(sleeps) == 2
+
+    client = FlakyClient(1, BadRequest)
+    with pytest.raises(BadRequest):
+        resilience.call(client)
+    assert client.calls == 1
+    assert resilience.summary()["failures_by_class"] == {"server": 1, "client": 1}
+
+
+def test_breaker_trips_after_consecutive_failures():
+    resilience, _ = caller(threshold=3, retries=0)
+    client = FlakyClient(100)
+
+    with redirect_stdout(io.StringIO()):
+        for _ in range(3):
+            with pytest.raises(ServerError):
+                resilience.call(client)
+    with pytest.raises(CircuitOpenError):
+        resilience.call(client)
+
+    assert client.calls == 3
+    counters = resilience.summary()
+    assert counters["breaker_open"] is True
+    assert (counters["breaker_trips"], counters["short_circuited"]) == (1, 1)
+
+
+def test_half_open_probe_reopens_then_closes():
+    clock = Clock()
+    resilience, sleeps = caller(threshold=2, retries=3, cooldown=10.0, clock=clock)
+    client = FlakyClient(9)
+
+    with redirect_stdout(io.StringIO()):
+        for _ in range(2):
+            with pytest.raises(ServerError):
+                resilience.call(client)
+        assert resilience.is_open and client.calls == 8
+
+        clock.now = 5.0
+        with pytest.raises(CircuitOpenError):
+            resilience.call(client)
+
+        # The probe gets no retries; failing restarts the cool-down
+        clock.now = 10.0
+        with pytest.raises(ServerError):
+            resilience.call(client)
+        assert client.calls == 9 and resilience.is_open
+        clock.now = 15.0
+        with pytest.raises(CircuitOpenError):
+            resilience.call(client)
+
+        clock.now = 20.0
+        assert resilience.call(client) == "ok"
+
+    assert not resilience.is_open
+    assert resilience.call(client) == "ok"
+    counters = resilience.summary()
+    assert (counters["breaker_trips"], counters["breaker_closes"], counters["short_circuited"]) == (1, 1, 2)
+    assert len(sleeps) == 6
@@ -0,0 +1,86 @@
+"""Response cache keys, hits and warm re-runs without API calls"""
+
+import io
+from contextlib import redirect_stdout
+
+import pytest
+
+import brain
+from conftest import NOW, StubClient, email_json, make_events, make_recipients
+from response_cache import ResponseCache
+
+MODEL = "llama-3.3-70b-versatile"
+EVENTS = make_events(2)
+RECIPIENTS = make_recipients(3)
+
+
+def counting_client():
+    return StubClient(lambda call, prompt: email_json(f"Subject {call}"))
+
+
+def test_key_is_stable_and_covers_every_input():
+    key = ResponseCache.make_key("system", "user", MODEL, 0.7)
+
+    # Pinned: a changed key silently invalidates every cached response
+    assert key == "f4dff170641bbc5841a3227ce4714ade3d73397ecd0b5d73b6fcb811040de666"
+    assert len({
+        key,
+        ResponseCache.make_key("system!", "user", MODEL, 0.7),
+        ResponseCache.make_key("system", "user!", MODEL, 0.7),
+        ResponseCache.make_key("system", "user", "other-model", 0.7),
+        ResponseCache.make_key("system", "user", MODEL, 0.2),
+    }) == 5
+
+
+def test_hits_survive_reopening(tmp_path):
+    path = str(tmp_path / "cache" / "responses.sqlite3")
+    cache = ResponseCache(path)
+    key = cache.make_key("system", "user", MODEL, 0.7)
+    assert cache.get(key) is None
+    cache.put(key, {"email": {"subject": "Zoë", "body": "Body"}})
+    cache.close()
+
+    cache = ResponseCache(path)
+    assert cache.get(key) == {"email": {"subject": "Zoë", "body": "Body"}}
+    assert cache.stats() == {"hits": 1, "misses": 0, "stores": 0, "evictions": 0}
+    cache.close()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite3"), max_entries=2)
+    for n in range(3):
+        cache.put(str(n), {"n": n})
+    cache.get("0")
+
+    assert cache.evict() == 1
+    assert cache.get("1") is None
+    assert cache.get("0") == {"n": 0} and cache.get("2") == {"n": 2}
+    cache.close()
+
+
+@pytest.mark.parametrize("concurrency", [1, 4])
+def test_warm_run_makes_no_calls(tmp_path, monkeypatch, unthrottled, write_inputs, concurrency):
+    monkeypatch.setattr(brain.Config, "CACHE_PATH", str(tmp_path / "cache" / "responses.sqlite3"))
+    recipients_file, events_file = write_inputs(RECIPIENTS, EVENTS)
+
+    def run(client):
+        with redirect_stdout(io.StringIO()):
+            stats = brain.generate_batch(
+                recipients_file, events_file, days=["1", "3"],
+                output_dir=str(tmp_path / "out"), concurrency=concurrency, clock=lambda: NOW,
+                ai_generator=brain.GroqEmailGenerator(client=client), checkpoint=False,
+                store_results=False, collect_results=True, verbose=False
+            )
+        return stats, [r["email"]["subject"] for day in ("1", "3") for r in stats["results"][day]]
+
+    cold = counting_client()
+    cold_stats, cold_subjects = run(cold)
+    warm = counting_client()
+    warm_stats, warm_subjects = run(warm)
+
+    pairs = len(RECIPIENTS) * len(EVENTS) * 2
+    assert cold.calls == pairs
+    assert warm.calls == 0
+    assert warm_subjects == cold_subjects
+    assert warm_stats["cache"]["hits"] == pairs
+    assert warm_stats["llm"]["cached"] == pairs
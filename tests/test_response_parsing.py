@@ -0,0 +1,75 @@
+"""Decoding, repair and schema check of LLM completions"""
+
+import json
+
+import pytest
+
+import brain
+from conftest import EVENT, RECIPIENT, StubClient
+from response_parsing import REJECTED, REPAIRED, VALID, json_backend, loads, parse_email_response
+
+EMAIL = {
+    "email": {"subject": "Clean water, funded", "body": "Hi Alice,\n\nThe grant is open."},
+    "verification": {"all_data_from_json": True},
+    "warnings": [],
+}
+TEXT = json.dumps(EMAIL)
+
+
+def test_clean_json_is_valid():
+    parsed = parse_email_response(TEXT)
+
+    assert (parsed.status, parsed.repairs, parsed.data) == (VALID, [], EMAIL)
+
+
+def test_fast_backend_errors_surface_as_json_decode_errors():
+    assert json_backend()[0] in ("orjson", "msgspec", "json")
+    with pytest.raises(json.JSONDecodeError):
+        loads("{not json")
+
+
+@pytest.mark.parametrize("text, repairs", [
+    (f"```json\n{TEXT}\n```", []),
+    (f"```\n{TEXT}\n```", []),
+    (TEXT.replace("[]", "[],").replace("true}", "true,}"), ["trailing_commas"]),
+    (f"Sure! Here is the email:\n{TEXT}\nLet me know if you need changes.", ["extracted"]),
+    (f"Here you go: {TEXT.replace('[]', '[],')} Thanks", ["extracted", "trailing_commas"]),
+])
+def test_recoverable_text_is_repaired(text, repairs):
+    parsed = parse_email_response(text)
+
+    assert parsed.data == EMAIL
+    assert parsed.repairs == repairs
+    assert parsed.status == (REPAIRED if repairs else VALID)
+
+
+def test_schema_repairs_never_claim_verification():
+    parsed = parse_email_response(json.dumps({"subject": "Hello", "body": "World"}))
+
+    assert parsed.status == REPAIRED
+    assert parsed.repairs == ["email_wrapped", "warnings", "verification"]
+    assert parsed.data["verification"] == {"all_data_from_json": False}
+
+
+@pytest.mark.parametrize("text", [
+    "I'm sorry, I can't help with that.",
+    '{"email": {"subject": "Hello"',
+    json.dumps({"email": {"subject": "", "body": "Body"}}),
+    json.dumps(["not", "an", "object"]),
+    None,
+])
+def test_unusable_text_is_rejected(text):
+    assert parse_email_response(text).status == REJECTED
+
+
+def test_rejected_response_falls_back_to_the_deterministic_email(capsys):
+    client = StubClient(lambda call, prompt: "No JSON today.")
+    generator = brain.GroqEmailGenerator(client=client)
+
+    result = generator.generate_email_content(RECIPIENT, EVENT, "1", check_cache=False)
+
+    assert client.calls == 2  # The parse policy samples once more
+    assert result["_llm"]["fallback_reason"].startswith("Rejected response")
+    assert result["_llm"]["parse"] == REJECTED
+    assert "Hi Alice" in result["email"]["body"]
+    assert generator.metrics.summary()["emails"] == 0
@@ -0,0 +1,40 @@
+"""Concurrent runs sharing one results store"""
+
+from results_store import ResultsStore
+
+
+def result(recipient_id, run):
+    return {"meta": {"recipient_id": recipient_id, "event_id": "e_1", "status": "generated", "run": run}}
+
+
+def rows(store, run_id):
+    return store._conn.execute("SELECT COUNT(*) FROM results WHERE run_id = ?", (run_id,)).fetchone()[0]
+
+
+def test_begin_run_keeps_other_live_runs(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.sqlite3"))
+    store.begin_run("a")
+    store.add("a", {"1": [result("r_1", "a")]})
+
+    store.begin_run("b")
+    store.add("b", {"1": [result("r_2", "b")]})
+    store.finish_run("b", ["1"], "t1")
+
+    assert rows(store, "a") == 1
+    store.finish_run("a", ["1"], "t2")
+    assert [r["meta"]["run"] for r in store.query(day="1")] == ["a"]
+    assert rows(store, "b") == 0
+
+
+def test_stale_and_aborted_runs_are_dropped(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.sqlite3"), stale_after=0)
+    store.begin_run("killed")
+    store.add("killed", {"1": [result("r_1", "killed")]})
+    store.begin_run("failed")
+    store.add("failed", {"1": [result("r_1", "failed")]})
+    store.abort_run("failed")
+
+    store.begin_run("next")
+
+    assert rows(store, "killed") == 0
+    assert rows(store, "failed") == 0
@@ -0,0 +1,78 @@
+"""Interrupted journaled runs resume without repeating AI calls"""
+
+import io
+import json
+import os
+from contextlib import redirect_stdout
+
+import pytest
+
+import brain
+from conftest import NOW, StubClient, email_json, make_events, make_recipients
+
+DAYS = ["1", "3"]
+EVENTS = make_events(4)
+RECIPIENTS = make_recipients(10)
+PAIRS = len(RECIPIENTS) * len(EVENTS) * len(DAYS)
+
+
+class Interrupted(KeyboardInterrupt):
+    pass
+
+
+def interrupting_client(after):
+    """Answers `after` calls, then raises KeyboardInterrupt"""
+    def content(call, prompt):
+        if call > after:
+            raise Interrupted()
+        return email_json()
+    return StubClient(content)
+
+
+@pytest.fixture
+def inputs(tmp_path, monkeypatch, write_inputs):
+    monkeypatch.setattr(brain.Config, "RUNS_DIR", str(tmp_path / "runs"))
+    monkeypatch.setattr(brain.Config, "JOURNAL_FLUSH_EVERY", 1)
+    write_inputs(RECIPIENTS, EVENTS)
+    return tmp_path
+
+
+def run(tmp_path, client, resume=None):
+    with redirect_stdout(io.StringIO()):
+        return brain.generate_batch(
+            str(tmp_path / "recipients.json"), str(tmp_path / "events.json"), days=DAYS,
+            output_dir=str(tmp_path / "out"), concurrency=1, use_cache=False, clock=lambda: NOW,
+            ai_generator=brain.GroqEmailGenerator(client=client), checkpoint=True, resume=resume,
+            store_results=False, verbose=False
+        )
+
+
+def interrupt(tmp_path, after):
+    with pytest.raises(Interrupted):
+        run(tmp_path, interrupting_client(after))
+    [run_id] = os.listdir(tmp_path / "runs")
+    return run_id
+
+
+def test_resume_only_makes_the_remaining_calls(inputs):
+    run_id = interrupt(inputs, 30)
+
+    client = StubClient()
+    stats = run(inputs, client, resume=run_id)
+
+    assert client.calls == PAIRS - 30
+    assert stats["generated"] == PAIRS
+    assert stats["run_id"] == run_id
+    for day in DAYS:
+        with open(inputs / "out" / f"day_{day}_emails.json", encoding="utf-8") as f:
+            assert len(json.load(f)["emails"]) == PAIRS // len(DAYS)
+
+
+def test_resume_refuses_changed_inputs(inputs):
+    run_id = interrupt(inputs, 30)
+    (inputs / "recipients.json").write_text(json.dumps(RECIPIENTS[:5]))
+
+    client = StubClient()
+    with pytest.raises(ValueError, match="changed since it started"):
+        run(inputs, client, resume=run_id)
+    assert client.calls == 0
@@ -0,0 +1,95 @@
+"""Chained --due windows: persisted window end, late sends and expiry"""
+
+import argparse
+import io
+import json
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+
+import pytest
+
+import brain
+import conftest
+from conftest import RECIPIENT
+from scheduler import IST, SendScheduler
+
+# Event starts 2025-03-08 10:00 IST: Day 0 at 03-01 10:00, Day 6 at 03-07 10:00, 7a at 03-08 04:00
+EVENT = {
+    **conftest.EVENT,
+    "start_date": "2025-03-08T10:00:00",
+    "metadata": {"amount_range": "$10k", "application_deadline": "2025-03-01"},
+}
+
+
+def at(day, hour):
+    return datetime(2025, 3, day, hour, tzinfo=IST)
+
+
+def due(tmp_path, now, window_hours=1, store_results=False):
+    with redirect_stdout(io.StringIO()):
+        stats = brain.generate_due(
+            window=timedelta(hours=window_hours),
+            events_file=str(tmp_path / "events.json"),
+            recipients_file=str(tmp_path / "recipients.json"),
+            output_dir=str(tmp_path / "out"),
+            clock=lambda: now, use_ai=False, checkpoint=False, store_results=store_results
+        )
+    return [(slot["day"], slot["event_id"]) for slot in stats["schedule"]["slots"]], stats["schedule"]
+
+
+@pytest.fixture
+def inputs(tmp_path, monkeypatch, write_inputs):
+    monkeypatch.setattr(brain.Config, "RUNS_DIR", str(tmp_path / "runs"))
+    write_inputs([RECIPIENT], [EVENT])
+
+
+def test_next_window_starts_where_the_last_one_ended(tmp_path, inputs):
+    assert due(tmp_path, at(1, 10))[0] == [("0", "e_1")]
+
+    # The next run comes a week late: nothing sent in between is lost
+    slots, schedule = due(tmp_path, at(8, 5))
+
+    assert slots == [("1", "e_1"), ("3", "e_1"), ("5", "e_1"), ("6", "e_1"), ("7a", "e_1")]
+    assert schedule["window_start"] == at(1, 11).isoformat()
+    assert schedule["expired"] == 0
+
+
+def test_covered_slots_are_not_sent_twice(tmp_path, inputs):
+    due(tmp_path, at(1, 10))
+
+    assert due(tmp_path, at(1, 10))[0] == []
+
+
+def query(tmp_path, monkeypatch, **filters):
+    monkeypatch.setattr(brain.Config, "OUTPUT_DIR", str(tmp_path / "out"))
+    args = argparse.Namespace(db=None, recipient=None, event=None, day=None, status=None, limit=None, json=True)
+    for name, value in filters.items():
+        setattr(args, name, value)
+    out = io.StringIO()
+    with redirect_stdout(out):
+        assert brain.query_results(args) == 0
+    return out.getvalue().splitlines()
+
+
+def test_query_finds_results_of_every_window(tmp_path, monkeypatch, inputs):
+    due(tmp_path, at(1, 10), store_results=True)
+    due(tmp_path, at(3, 10), store_results=True)
+
+    results = [json.loads(line) for line in query(tmp_path, monkeypatch, recipient="r_1")]
+    assert [(r["meta"]["day"], r["meta"]["event_id"]) for r in results] == [("0", "e_1"), ("1", "e_1")]
+    assert len(query(tmp_path, monkeypatch, recipient="r_1", limit=1)) == 1
+
+    counts = query(tmp_path, monkeypatch, json=False)
+    assert [line.split(":")[0].strip() for line in counts] == ["Day 0", "Day 1"]
+
+
+def test_slot_expires_only_once_its_event_started():
+    scheduler = SendScheduler([EVENT], days=("6", "7b"))
+
+    # Both send times passed; the event has not started yet
+    assert [slot.day for slot in scheduler.pop_due(at(8, 9) + timedelta(minutes=30), at(8, 10))] == ["6", "7b"]
+    assert (scheduler.late, scheduler.expired) == (2, 0)
+
+    scheduler = SendScheduler([EVENT], days=("6", "7b"))
+    assert scheduler.pop_due(at(8, 11), at(8, 12)) == []
+    assert scheduler.expired == 2
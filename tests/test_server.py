@@ -0,0 +1,50 @@
+"""/render: malformed recipients are 400s, not tracebacks"""
+
+import json
+
+import pytest
+
+import conftest
+from conftest import RECIPIENT
+from server import GenerationService, RequestError
+
+# The daemon judges deadlines against the real clock
+EVENT = {
+    **conftest.EVENT,
+    "start_date": "2099-03-08T10:00:00",
+    "metadata": {"amount_range": "$10k", "application_deadline": "2099-03-01"},
+}
+
+
+@pytest.fixture
+def service(tmp_path):
+    (tmp_path / "events.json").write_text(json.dumps([EVENT]))
+    return GenerationService(
+        events_file=str(tmp_path / "events.json"), output_dir=str(tmp_path / "out"), data_dir=str(tmp_path)
+    )
+
+
+def test_render_generates_for_a_valid_recipient(service):
+    result = service.render(dict(RECIPIENT), "e_1", "1")
+    assert result["meta"]["status"] == "generated"
+
+
+def test_render_reports_missing_fields_as_blocked(service):
+    recipient = {k: v for k, v in RECIPIENT.items() if k != "email"}
+    result = service.render(recipient, "e_1", "1")
+    assert (result["meta"]["status"], result["meta"]["reason"]) == ("blocked", "validation_failed")
+
+
+@pytest.mark.parametrize("field, value", [
+    ("topics", ["water", 3]),
+    ("topics", [None]),
+    ("topics", 5),
+    ("topics", None),
+    ("engagement_score", "high"),
+    ("engagement_score", None),
+])
+def test_render_rejects_malformed_fields(service, field, value):
+    with pytest.raises(RequestError) as exc:
+        service.render({**RECIPIENT, field: value}, "e_1", "1")
+    assert exc.value.status == 400
+    assert field in str(exc.value)
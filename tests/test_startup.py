@@ -0,0 +1,16 @@
+"""`import brain` stays within the startup budget"""
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_import_brain_within_budget():
+    result = subprocess.run(
+        [sys.executable, "benchmarks.py", "startup", "-n", "9"],
+        cwd=ROOT, capture_output=True, text=True
+    )
+
+    assert result.returncode == 0, result.stdout + result.stderr
@@ -0,0 +1,88 @@
+"""Compiled validators reject what the original per-field checks rejected"""
+
+import copy
+
+import pytest
+
+from conftest import EVENT, RECIPIENT
+from templates import VALIDATION_RULES
+from validation import merge_reports, new_report, record_result, validate_event_fields, validate_recipient_fields
+
+
+def legacy_validate_recipient(recipient):
+    errors = []
+    for field in VALIDATION_RULES["required_recipient_fields"]:
+        if field not in recipient:
+            errors.append(f"Missing recipient field: {field}")
+    if "topics" in recipient and not isinstance(recipient["topics"], list):
+        errors.append("recipient.topics must be a list")
+    return errors
+
+
+def legacy_validate_event(event):
+    errors = []
+    for field in VALIDATION_RULES["required_event_fields"]:
+        if field not in event:
+            errors.append(f"Missing event field: {field}")
+    if "metadata" in event:
+        for m in VALIDATION_RULES["required_metadata_fields"]:
+            if m not in event["metadata"]:
+                errors.append(f"Missing event.metadata field: {m}")
+    if "tags" in event and not isinstance(event["tags"], list):
+        errors.append("event.tags must be a list")
+    return errors
+
+
+def variant(base, drop=(), **changes):
+    record = copy.deepcopy(base)
+    for field in drop:
+        record.pop(field)
+    record.update(changes)
+    return record
+
+
+RECIPIENTS = [
+    RECIPIENT,
+    variant(RECIPIENT, drop=["email"]),
+    variant(RECIPIENT, drop=["recipient_id", "opt_out", "topics"]),
+    variant(RECIPIENT, topics="water"),
+    variant(RECIPIENT, topics=None),
+    variant(RECIPIENT, drop=["name"], topics=("water",)),
+    {},
+]
+EVENTS = [
+    EVENT,
+    variant(EVENT, drop=["start_date"]),
+    variant(EVENT, drop=["metadata"]),
+    variant(EVENT, metadata={"amount_range": "$10k"}),
+    variant(EVENT, metadata={}),
+    variant(EVENT, metadata=["application_deadline"]),
+    variant(EVENT, metadata="amount_range"),
+    variant(EVENT, tags="water"),
+    variant(EVENT, drop=["title", "organizer"], tags={"water"}, metadata={"application_deadline": "x"}),
+    {},
+]
+
+
+@pytest.mark.parametrize("recipient", RECIPIENTS)
+def test_recipient_errors_match_legacy_checks(recipient):
+    assert [message for _, message in validate_recipient_fields(recipient)] == legacy_validate_recipient(recipient)
+
+
+@pytest.mark.parametrize("event", EVENTS)
+def test_event_errors_match_legacy_checks(event):
+    assert [message for _, message in validate_event_fields(event)] == legacy_validate_event(event)
+
+
+def test_reports_count_records_and_fields():
+    report, other = new_report(), new_report()
+    for event in EVENTS[:4]:
+        record_result(report, validate_event_fields(event))
+    for event in EVENTS[4:]:
+        record_result(other, validate_event_fields(event))
+    merge_reports(report, other)
+
+    assert report["checked"] == len(EVENTS)
+    assert report["invalid"] == len(EVENTS) - 1
+    assert report["fields"]["tags"] == 3
+    assert report["fields"]["metadata.application_deadline"] == 3
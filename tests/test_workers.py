@@ -0,0 +1,83 @@
+"""Worker-process sharding: same day files and stats as one process"""
+
+import io
+import json
+import random
+from contextlib import redirect_stdout
+
+import pytest
+
+import brain
+from conftest import NOW, StubClient, make_events, make_recipients
+
+DAYS = ["1", "5"]
+TOPICS = ["water", "health", "climate", "education", "youth"]
+
+
+@pytest.fixture
+def inputs(tmp_path, monkeypatch, write_inputs):
+    rng = random.Random(9)
+    recipients = make_recipients(45)
+    for i, recipient in enumerate(recipients):
+        recipient.update(topics=rng.sample(TOPICS, rng.randint(0, 3)), opt_out=i % 9 == 0)
+    del recipients[4]["email"]  # Invalid
+    events = make_events(4)
+    for event in events:
+        event["tags"] = rng.sample(TOPICS, 2)
+    events[1]["metadata"] = {**events[1]["metadata"], "application_deadline": "2024-12-01"}
+    write_inputs(recipients, events)
+    # Several shards per worker
+    monkeypatch.setattr(brain.Config, "CHUNK_SIZE", 4)
+    monkeypatch.setattr(brain.Config, "RUNS_DIR", str(tmp_path / "runs"))
+    return tmp_path
+
+
+def run(tmp_path, workers, name, **kwargs):
+    options = dict(use_ai=False, checkpoint=False, store_results=False)
+    options.update(kwargs)
+    out = io.StringIO()
+    with redirect_stdout(out):
+        stats = brain.generate_batch(
+            str(tmp_path / "recipients.json"), str(tmp_path / "events.json"), days=DAYS,
+            output_dir=str(tmp_path / name), workers=workers, clock=lambda: NOW, **options
+        )
+    return stats, out.getvalue()
+
+
+def day_file(tmp_path, name, day):
+    with open(tmp_path / name / f"day_{day}_emails.json", encoding="utf-8") as f:
+        document = json.load(f)
+    del document["generated_at"]
+    for result in document["emails"]:
+        result["meta"].pop("generated_at", None)
+    return document
+
+
+def test_sharded_run_matches_one_process(inputs):
+    single, _ = run(inputs, 1, "single")
+    sharded, log = run(inputs, 2, "sharded")
+
+    assert "2 worker processes" in log
+    assert sharded == single
+    assert single["generated"] and single["blocked"]
+    for day in DAYS:
+        assert day_file(inputs, "sharded", day) == day_file(inputs, "single", day)
+
+
+@pytest.mark.parametrize("mode, warning", [
+    ("ai", "--workers applies to deterministic runs"),
+    ("journaled", "--workers is not used for journaled or incremental runs"),
+    ("incremental", "--workers is not used for journaled or incremental runs"),
+])
+def test_workers_fall_back_to_one_process(inputs, mode, warning):
+    options = {
+        "ai": lambda: {"use_ai": True, "ai_generator": brain.GroqEmailGenerator(client=StubClient()),
+                       "use_cache": False, "concurrency": 1},
+        "journaled": lambda: {"checkpoint": True},
+        "incremental": lambda: {"incremental": True},
+    }[mode]()
+    stats, log = run(inputs, 2, "out", **options)
+
+    assert warning in log
+    assert "worker processes" not in log
+    assert stats["total"]
@@ -0,0 +1,112 @@
+"""
+validation.py - Compiled Schema Validators for Recipients and Events
+
+VALIDATION_RULES field lists are compiled once into validator callables.
+The common case (every required field present) is a single set inclusion
+test; per-field messages are only built for records that fail.
+
+Each record is validated once per run, and its errors are kept next to it
+rather than written into it: events by position in the planner
+(EligibilityPlanner.event_errors), recipients as (recipient, errors) while
+their chunk is decided. The record dicts themselves stay untouched: they
+are content-hashed for the incremental manifest (manifest.py) and may
+belong to the caller (serve /render).
+
+Usage:
+    errors = validate_recipient_fields(recipient)     # [(field, message)]
+    report = new_report()
+    record_result(report, errors)                     # as in stats["validation"]["recipients"]
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    from templates import VALIDATION_RULES
+except ImportError:
+    # The one embedded copy; brain.py and the matchers import the rules from here
+    VALIDATION_RULES = {
+        "required_recipient_fields": ["recipient_id", "name", "email", "organization", "topics", "engagement_score", "opt_out"],
+        "required_event_fields": ["event_id", "title", "start_date", "tags", "organizer", "metadata"],
+        "required_metadata_fields": ["amount_range", "application_deadline"],
+        "topic_match_threshold": {"high": 2, "medium": 1, "none": 0},
+        "engagement_thresholds": {"high": 0.7, "low": 0.5}
+    }
+
+FieldErrors = List[Tuple[str, str]]
+Validator = Callable[[Dict], FieldErrors]
+
+
+def compile_validator(
+    kind: str,
+    required: Sequence[str],
+    list_field: Optional[str] = None,
+    nested: Optional[Tuple[str, Sequence[str]]] = None
+) -> Validator:
+    """
+    Build a validator returning [(field, message)] for one entity kind
+
+    Checks, in order: required top-level fields, required fields of the
+    `nested` (name, fields) object when present, and that `list_field`
+    is a list when present.
+    """
+    required = tuple(required)
+    required_set = frozenset(required)
+    nested_name, nested_fields = nested if nested else (None, ())
+    nested_fields = tuple(nested_fields)
+    nested_set = frozenset(nested_fields)
+
+    def validate(entity: Dict) -> FieldErrors:
+        errors: FieldErrors = []
+        if not required_set <= entity.keys():
+            for field in required:
+                if field not in entity:
+                    errors.append((field, f"Missing {kind} field: {field}"))
+        if nested_name is not None and nested_name in entity:
+            inner = entity[nested_name]
+            if not (isinstance(inner, dict) and nested_set <= inner.keys()):
+                for field in nested_fields:
+                    if field not in inner:
+                        errors.append((
+                            f"{nested_name}.{field}",
+                            f"Missing {kind}.{nested_name} field: {field}"
+                        ))
+        if list_field is not None and list_field in entity and not isinstance(entity[list_field], list):
+            errors.append((list_field, f"{kind}.{list_field} must be a list"))
+        return errors
+
+    return validate
+
+
+validate_recipient_fields = compile_validator(
+    "recipient",
+    VALIDATION_RULES["required_recipient_fields"],
+    list_field="topics"
+)
+
+validate_event_fields = compile_validator(
+    "event",
+    VALIDATION_RULES["required_event_fields"],
+    list_field="tags",
+    nested=("metadata", VALIDATION_RULES["required_metadata_fields"])
+)
+
+
+def new_report() -> Dict:
+    """Empty validation report: records checked, invalid, failures per field"""
+    return {"checked": 0, "invalid": 0, "fields": {}}
+
+
+def record_result(report: Dict, errors: FieldErrors) -> None:
+    report["checked"] += 1
+    if errors:
+        report["invalid"] += 1
+        for field, _ in errors:
+            report["fields"][field] = report["fields"].get(field, 0) + 1
+
+
+def merge_reports(report: Dict, other: Dict) -> None:
+    report["checked"] += other["checked"]
+    report["invalid"] += other["invalid"]
+    for field, count in other["fields"].items():
+        report["fields"][field] = report["fields"].get(field, 0) + count
+